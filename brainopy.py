@@ -19,100 +19,507 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 '''
+import csv
+import functools
+import os
 import random
 import sqlite3
-import uuid
+import time
+
+def profiled(function):
+    """!
+    Decorator to record the wall time and number of SQL statements executed by a method of brainopy class, when profiling is started (see startProfiling() method). The transfer functions, modulating functions, maintenance functions and runBrain() method are profiled; including the functions overridden in a subclass of brainopy class (an overridden function calling the function of brainopy class is recorded once). Times and SQL statement counts are inclusive of the profiled methods called within; for example, neuronFunction() method includes the transfer and modulating functions.
+
+    @param function Function: Method of brainopy class
+    @return: Decorated method
+    """
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        if not getattr(self, "profiling", False) or function.__name__ in self._profiled: 
+            return function(self, *args, **kwargs)
+        self._profiled.add(function.__name__)
+        start = time.perf_counter()
+        count = self._SQLcount
+        try:
+            return function(self, *args, **kwargs)
+        finally:
+            self._profiled.discard(function.__name__)
+            self._recordProfile(function.__name__, time.perf_counter() - start, self._SQLcount - count)
+    wrapper.profiled = True
+    return wrapper
 
 class brainopy(object):
     """!
     Class to encapsulate the brain (neural network), which is persisted as a SQLite database.
     """
 
-    def __init__(self, brainDB=None):
+    statetypes = ["axon_state", "dendrite_state", "neuron_state", "synapse_state"]
+
+    _indexes = [("ID_table_index", "ID_table", "ID, table_name"),
+                ("ID_table_table", "ID_table", "table_name"),
+                ("neuron_state_ID", "neuron_state", "ID"),
+                ("dendrite_state_ID", "dendrite_state", "ID"),
+                ("axon_state_ID", "axon_state", "ID"),
+                ("synapse_state_ID", "synapse_state", "ID"),
+                ("neuron_body_ID", "neuron_body", "ID"),
+                ("neuron_body_axon", "neuron_body", "axon_state_ID"),
+                ("neuron_body_neuron_state", "neuron_body", "neuron_state_ID"),
+                ("neuron_dendrite_ID", "neuron_dendrite", "ID"),
+                ("neuron_dendrite_dendrite", "neuron_dendrite", "dendrite_state_ID"),
+                ("neuron_neuron_ID", "neuron", "neuron_ID"),
+                ("synapse_dendrite_neuron_ID", "synapse_dendrite", "neuron_ID"),
+                ("synapse_dendrite_dendrite", "synapse_dendrite", "dendrite_state_ID"),
+                ("synapse_dendrite_synapse", "synapse_dendrite", "synapse_state_ID"),
+                ("axon_synapse_neuron_ID", "axon_synapse", "neuron_ID"),
+                ("axon_synapse_axon", "axon_synapse", "axon_state_ID")]
+
+    _links = {"neuron_body": ["ID", "neuron_state_ID", "axon_state_ID"],
+              "neuron_dendrite": ["ID", "dendrite_state_ID"],
+              "axon_synapse_link": ["axon_state_ID", "synapse_state_ID"],
+              "synapse_dendrite_link": ["synapse_state_ID", "dendrite_state_ID"]}
+
+    _adjacency = {"neuron": (["neuron_ID", "dendrite_state_ID", "neuron_state_ID", "axon_state_ID"],
+                             "SELECT nd.ID, nd.dendrite_state_ID, nb.neuron_state_ID, nb.axon_state_ID FROM %(neuron_dendrite)s nd INNER JOIN %(neuron_body)s nb ON nd.ID = nb.ID",
+                             {"neuron_dendrite": ("nd", {"ID": "neuron_ID", "dendrite_state_ID": "dendrite_state_ID"}),
+                              "neuron_body": ("nb", {"ID": "neuron_ID", "neuron_state_ID": "neuron_state_ID", "axon_state_ID": "axon_state_ID"})},
+                             "nd.rowid, nb.rowid"),
+                  "synapse_dendrite": (["neuron_ID", "dendrite_state_ID", "synapse_state_ID"],
+                                       "SELECT nd.ID, sdl.dendrite_state_ID, sdl.synapse_state_ID FROM %(neuron_dendrite)s nd INNER JOIN %(synapse_dendrite_link)s sdl ON nd.dendrite_state_ID = sdl.dendrite_state_ID",
+                                       {"neuron_dendrite": ("nd", {"ID": "neuron_ID", "dendrite_state_ID": "dendrite_state_ID"}),
+                                        "synapse_dendrite_link": ("sdl", {"synapse_state_ID": "synapse_state_ID", "dendrite_state_ID": "dendrite_state_ID"})},
+                                       "nd.rowid, sdl.rowid"),
+                  "axon_synapse": (["neuron_ID", "axon_state_ID", "synapse_state_ID"],
+                                   "SELECT nb.ID, nb.axon_state_ID, asl.synapse_state_ID FROM %(neuron_body)s nb INNER JOIN %(axon_synapse_link)s asl ON nb.axon_state_ID = asl.axon_state_ID",
+                                   {"neuron_body": ("nb", {"ID": "neuron_ID", "axon_state_ID": "axon_state_ID"}),
+                                    "axon_synapse_link": ("asl", {"axon_state_ID": "axon_state_ID", "synapse_state_ID": "synapse_state_ID"})},
+                                   "nb.rowid, asl.rowid")}
+
+    _profiledFunctions = ["tfSynapseDendrite", "mfDendrite", "tfDendriteNeuron", "mfNeuron", "tfNeuronAxon", "mfAxon", "tfAxonSynapse", "mfSynapse", "tfSynapseAxon", "neuronFunction", "mtNeuronGrowth", "mtSynapseGrowth", "mtNeuronPrune", "mtSynapsePrune", "mtGlobal", "maintenanceFunction", "runBrain"]
+
+    def __init_subclass__(cls, **kwargs):
+        """!
+        Subclass initialization method to profile the transfer, modulating and maintenance functions overridden in a subclass of brainopy class (see profiled() decorator).
+        """
+        super().__init_subclass__(**kwargs)
+        for function in brainopy._profiledFunctions:
+            if function in cls.__dict__ and not getattr(cls.__dict__[function], "profiled", False):
+                setattr(cls, function, profiled(cls.__dict__[function]))
+
+    def __init__(self, brainDB=None, journal_mode="WAL", synchronous="NORMAL", layout="long", mode="file", backup_interval=0):
         """!
         Initialization method. If the Brain database file given as brainDB, the brain (neural network) will be connected using connectBrain() method.
 
         @param brainDB String: Path to Brain database file. Default = None.
+        @param journal_mode String: SQLite journal mode (see connectBrain() method). Default = "WAL".
+        @param synchronous String: SQLite synchronous setting (see connectBrain() method). Default = "NORMAL".
+        @param layout String: Layout of state tables for new brain database (see connectBrain() method). Default = "long".
+        @param mode String: Mode of connection (see connectBrain() method). Default = "file".
+        @param backup_interval Integer: Number of cycles between backups in memory mode (see connectBrain() method). Default = 0.
         """
         self.neurotransmitter_axon_variation = 0.005
         self.neurotransmitter_dendrite_variation = 0.005
         self.neurotransmitter_neuron_variation = 0.005
         self.neurotransmitter_synapse_variation = 0.005
         self.logging = False
+        self.log_buffer_size = 10000
+        self.log_flush_interval = 5.0
+        self._logBuffer = []
+        self._logFlushed = time.time()
+        self.profiling = False
+        self.profile = {}
+        self.profileCycles = []
+        self._cycleProfile = {}
+        self._SQLcount = 0
+        self._profiled = set()
+        self.engine = None
+        self.scheduler = "full"
+        self._dirtySynapses = set()
+        self._dirtyNeuronStates = set()
+        self.bulk = False
+        self.ID_block_size = 1000
+        self._IDblock = [0, 0]
+        self.layout = layout
+        self._columns = {}
+        self.brainDB = brainDB
+        self.mode = mode
+        self.backup_interval = backup_interval
+        self._cycles = 0
+        self.clearCache()
         if brainDB == None:
             self.con = None
             self.cur = None 
         else:
-            self.connectBrain(brainDB)
+            self.connectBrain(brainDB, journal_mode, synchronous, layout, mode, backup_interval)
 
-    def connectBrain(self, brainDB):
+    def connectBrain(self, brainDB, journal_mode="WAL", synchronous="NORMAL", layout="long", mode="file", backup_interval=0):
         """!
         Connects to the brain database specified by the brainDB, which is a SQLite database. If the brain database does not exist, the database will be created.
 
+        Changes are committed once per bulk operation (such as addNeuron() and linkRandomAxonSynapse() methods) or per runBrain() cycle, rather than per statement. Write-ahead logging (WAL) with synchronous = NORMAL is used by default, which is safe against application crashes but may lose the last committed cycles on power loss; use synchronous = "FULL" for full durability.
+
+        In memory mode (mode = "memory"), the brain database file (if exists) is loaded into an in-memory SQLite database using SQLite backup API, and all operations are executed in memory. The in-memory database is written (backed up) into the brain database file by backupBrain() method, which is called every backup_interval cycles (see runBrain() method) and by disconnectBrain() method. Changes after the last backup will be lost if the program ends without disconnectBrain() method. Hence, memory mode is suitable for brains that fit in memory.
+
         @param brainDB String: Path to Brain database file
+        @param journal_mode String: SQLite journal mode. Allowable values are "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", and "OFF". Default = "WAL".
+        @param synchronous String: SQLite synchronous setting. Allowable values are "OFF", "NORMAL", "FULL", and "EXTRA". Default = "NORMAL".
+        @param layout String: Layout of state tables (neuron_state, dendrite_state, axon_state, synapse_state) if the brain database is created. Allowable values are "long" (one row per state ID and neurotransmitter) and "wide" (one row per state ID, with one column per neurotransmitter). The layout of an existing brain database is kept and can be changed using migrateStateLayout() method. Default = "long".
+        @param mode String: Mode of connection. Allowable values are "file" (operations on the brain database file) and "memory" (operations on an in-memory copy of the brain database file). Default = "file".
+        @param backup_interval Integer: Number of cycles between backups of the in-memory database into the brain database file in memory mode. Default = 0 (only backed up by disconnectBrain() method).
         """
-        self.con = sqlite3.connect(brainDB)
+        if str(journal_mode).upper() not in ["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"]:
+            raise ValueError("Unknown journal_mode: " + str(journal_mode))
+        if str(synchronous).upper() not in ["OFF", "NORMAL", "FULL", "EXTRA"]:
+            raise ValueError("Unknown synchronous setting: " + str(synchronous))
+        if layout not in ["long", "wide"]:
+            raise ValueError("Unknown state layout: " + str(layout))
+        if mode not in ["file", "memory"]:
+            raise ValueError("Unknown connection mode: " + str(mode))
+        self.brainDB = brainDB
+        self.mode = mode
+        self.backup_interval = int(backup_interval)
+        self._cycles = 0
+        self._journal = (str(journal_mode).upper(), str(synchronous).upper())
+        if mode == "memory":
+            self.con = sqlite3.connect(":memory:")
+            if os.path.exists(brainDB):
+                source = sqlite3.connect(brainDB)
+                source.backup(self.con)
+                source.close()
+        else:
+            self.con = sqlite3.connect(brainDB)
         self.cur = self.con.cursor()
+        self._IDblock = [0, 0]
+        self.clearCache()
+        self.cur.execute("PRAGMA journal_mode = %s" % str(journal_mode).upper())
+        self.cur.execute("PRAGMA synchronous = %s" % str(synchronous).upper())
         # CREATE TABLE statements
         self.cur.execute("CREATE TABLE IF NOT EXISTS ID_table (ID text primary key, table_name text)")
         self.cur.execute("CREATE TABLE IF NOT EXISTS name_ID (ID text primary key, name text, description text)")
         self.cur.execute("CREATE TABLE IF NOT EXISTS neurotransmitter (neurotransmitter text primary key, description text)")
-        self.cur.execute("CREATE TABLE IF NOT EXISTS neuron_state (ID text, neurotransmitter text, value real)")
-        self.cur.execute("CREATE TABLE IF NOT EXISTS dendrite_state (ID text, neurotransmitter text, value real)")
-        self.cur.execute("CREATE TABLE IF NOT EXISTS axon_state (ID text, neurotransmitter text, value real)")
-        self.cur.execute("CREATE TABLE IF NOT EXISTS synapse_state (ID text, neurotransmitter text, value real)")
         self.cur.execute("CREATE TABLE IF NOT EXISTS neuron_body (ID text, neuron_state_ID text, axon_state_ID text)")
         self.cur.execute("CREATE TABLE IF NOT EXISTS neuron_dendrite (ID text, dendrite_state_ID text)")
         self.cur.execute("CREATE TABLE IF NOT EXISTS axon_synapse_link (axon_state_ID text, synapse_state_ID text)")
         self.cur.execute("CREATE TABLE IF NOT EXISTS synapse_dendrite_link (synapse_state_ID text, dendrite_state_ID text)")
         self.cur.execute("CREATE TABLE IF NOT EXISTS log (ID integer primary key autoincrement, function text, message text)")
-        # CREATE INDEX statements
-        self.cur.execute("CREATE INDEX IF NOT EXISTS ID_table_index ON ID_table (ID, table_name)")
-        self.cur.execute("CREATE INDEX IF NOT EXISTS ID_table_table ON ID_table (table_name)")
-        self.cur.execute("CREATE INDEX IF NOT EXISTS neuron_state_ID ON neuron_state (ID)")
-        self.cur.execute("CREATE INDEX IF NOT EXISTS dendrite_state_ID ON dendrite_state (ID)")
-        self.cur.execute("CREATE INDEX IF NOT EXISTS axon_state_ID ON axon_state (ID)")
-        self.cur.execute("CREATE INDEX IF NOT EXISTS synapse_state_ID ON synapse_state (ID)")
-        self.cur.execute("CREATE INDEX IF NOT EXISTS neuron_body_ID ON neuron_body (ID)")
-        self.cur.execute("CREATE INDEX IF NOT EXISTS neuron_dendrite_ID ON neuron_dendrite (ID)")
-        self.cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS axon_synapse_link_axon ON axon_synapse_link (axon_state_ID)")
-        self.cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS axon_synapse_link_synapse ON axon_synapse_link (synapse_state_ID)")
-        self.cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS synapse_dendrite_link_synapse ON synapse_dendrite_link (synapse_state_ID)")
-        self.cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS synapse_dendrite_link_dendrite ON synapse_dendrite_link (dendrite_state_ID)")
+        self.cur.execute("CREATE TABLE IF NOT EXISTS ID_counter (name text primary key, value integer)")
+        self.cur.execute("CREATE TABLE IF NOT EXISTS ID_alias (alias text primary key, ID text)")
+        self._columns = {}
+        self._createStateTables(layout)
+        self.cur.execute("INSERT OR IGNORE INTO ID_counter (name, value) SELECT 'ID', COALESCE(MAX(CAST(ID AS INTEGER)), 0) + 1 FROM ID_table WHERE CAST(CAST(ID AS INTEGER) AS TEXT) = ID")
+        self._createAdjacency()
+        self._createIndexes()
         # CREATE VIEW statements
-        self.cur.execute("CREATE VIEW IF NOT EXISTS synapse_dendrite (neuron_ID, dendrite_state_ID, synapse_state_ID) AS SELECT nd.ID, sdl.dendrite_state_ID, sdl.synapse_state_ID FROM neuron_dendrite nd INNER JOIN synapse_dendrite_link sdl WHERE nd.dendrite_state_ID = sdl.dendrite_state_ID")
-        self.cur.execute("CREATE VIEW IF NOT EXISTS neuron (neuron_ID, dendrite_state_ID, neuron_state_ID, axon_state_ID) AS SELECT neuron_dendrite.ID, neuron_dendrite.dendrite_state_ID, neuron_body.neuron_state_ID, neuron_body.axon_state_ID FROM neuron_dendrite INNER JOIN neuron_body WHERE neuron_dendrite.ID = neuron_body.ID")
-        self.cur.execute("CREATE VIEW IF NOT EXISTS axon_synapse (neuron_ID, axon_state_ID, synapse_state_ID) AS SELECT nb.ID, nb.axon_state_ID, asl.synapse_state_ID FROM neuron_body nb INNER JOIN axon_synapse_link asl WHERE nb.axon_state_ID = asl.axon_state_ID")
         self.cur.execute("CREATE VIEW IF NOT EXISTS axon_synapse_dendrite (axon_state_ID, synapse_state_ID, dendrite_state_ID) AS SELECT asl.axon_state_ID, asl.synapse_state_ID, sdl.dendrite_state_ID FROM axon_synapse_link asl LEFT JOIN synapse_dendrite_link sdl WHERE asl.synapse_state_ID = sdl.synapse_state_ID")
         self.cur.execute("CREATE VIEW IF NOT EXISTS name_ID_table (ID, name, description, table_name) AS SELECT name_ID.ID, name_ID.name, name_ID.description, ID_table.table_name FROM name_ID INNER JOIN ID_table WHERE name_ID.ID = ID_table.ID")
         self.cur.execute("CREATE VIEW IF NOT EXISTS name_neuron_body (ID, name, description, neuron_state_ID, axon_state_ID) AS SELECT name_ID.ID, name_ID.name, name_ID.description, neuron_body.neuron_state_ID, neuron_body.axon_state_ID FROM name_ID INNER JOIN neuron_body WHERE name_ID.ID = neuron_body.ID")
-        self.cur.execute("CREATE VIEW IF NOT EXISTS name_neuron_state (ID, name, description, neurotransmitter, value) AS SELECT name_ID.ID, name_ID.name, name_ID.description, neuron_state.neurotransmitter, neuron_state.value FROM neuron_state INNER JOIN name_ID WHERE neuron_state.ID = name_ID.ID")        
-        self.cur.execute("CREATE VIEW IF NOT EXISTS name_dendrite_state (ID, name, description, neurotransmitter, value) AS SELECT name_ID.ID, name_ID.name, name_ID.description, dendrite_state.neurotransmitter, dendrite_state.value FROM dendrite_state INNER JOIN name_ID WHERE dendrite_state.ID = name_ID.ID")
-        self.cur.execute("CREATE VIEW IF NOT EXISTS name_axon_state (ID, name, description, neurotransmitter, value) AS SELECT name_ID.ID, name_ID.name, name_ID.description, axon_state.neurotransmitter, axon_state.value FROM axon_state INNER JOIN name_ID WHERE axon_state.ID = ID_table.ID")
-        self.cur.execute("CREATE VIEW IF NOT EXISTS name_synapse_state (ID, name, description, neurotransmitter, value) AS SELECT name_ID.ID, name_ID.name, name_ID.description, synapse_state.neurotransmitter, synapse_state.value FROM synapse_state INNER JOIN name_ID WHERE synapse_state.ID = name_ID.ID")
+        self._createStateViews()
         self.con.commit()
         if self.logging: self.logger("connectBrain", "connectBrain")
 
-    def disconnectBrain(self):
+    def _createStateTables(self, layout):
+        """!
+        Internal method to create the state tables, if they do not exist, and to set the layout of state tables (self.layout) from the existing neuron_state table.
+
+        @param layout String: Layout of state tables to create. Allowable values are "long" and "wide".
+        """
+        for statetype in self.statetypes:
+            if layout == "long":
+                self.cur.execute("CREATE TABLE IF NOT EXISTS %s (ID text, neurotransmitter text, value real)" % statetype)
+            else:
+                columns = "".join([", %s real" % self._quote(neurotransmitter) for neurotransmitter in self.getNeurotransmitters()])
+                self.cur.execute("CREATE TABLE IF NOT EXISTS %s (ID text primary key%s)" % (statetype, columns))
+        self.cur.execute("PRAGMA table_info(neuron_state)")
+        if "neurotransmitter" in [x[1] for x in self.cur.fetchall()]:
+            self.layout = "long"
+        else:
+            self.layout = "wide"
+
+    def _createStateViews(self):
+        """!
+        Internal method to create the views of state tables with name labels, if they do not exist.
+        """
+        self.cur.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'name_axon_state'")
+        view = self.cur.fetchone()
+        if view != None and "ID_table.ID" in view[0]:
+            self.cur.execute("DROP VIEW name_axon_state")
+        if self.layout == "long":
+            self.cur.execute("CREATE VIEW IF NOT EXISTS name_neuron_state (ID, name, description, neurotransmitter, value) AS SELECT name_ID.ID, name_ID.name, name_ID.description, neuron_state.neurotransmitter, neuron_state.value FROM neuron_state INNER JOIN name_ID WHERE neuron_state.ID = name_ID.ID")
+            self.cur.execute("CREATE VIEW IF NOT EXISTS name_dendrite_state (ID, name, description, neurotransmitter, value) AS SELECT name_ID.ID, name_ID.name, name_ID.description, dendrite_state.neurotransmitter, dendrite_state.value FROM dendrite_state INNER JOIN name_ID WHERE dendrite_state.ID = name_ID.ID")
+            self.cur.execute("CREATE VIEW IF NOT EXISTS name_axon_state (ID, name, description, neurotransmitter, value) AS SELECT name_ID.ID, name_ID.name, name_ID.description, axon_state.neurotransmitter, axon_state.value FROM axon_state INNER JOIN name_ID WHERE axon_state.ID = name_ID.ID")
+            self.cur.execute("CREATE VIEW IF NOT EXISTS name_synapse_state (ID, name, description, neurotransmitter, value) AS SELECT name_ID.ID, name_ID.name, name_ID.description, synapse_state.neurotransmitter, synapse_state.value FROM synapse_state INNER JOIN name_ID WHERE synapse_state.ID = name_ID.ID")
+        else:
+            for statetype in self.statetypes:
+                self.cur.execute("CREATE VIEW IF NOT EXISTS name_%s AS SELECT name_ID.name, name_ID.description, %s.* FROM %s INNER JOIN name_ID WHERE %s.ID = name_ID.ID" % (statetype, statetype, statetype, statetype))
+
+    def _createIndexes(self):
+        """!
+        Internal method to create the indexes of the brain database, if they do not exist.
+        """
+        for (index, table, columns) in self._indexes:
+            if self.layout == "wide" and table in self.statetypes: continue
+            self.cur.execute("CREATE INDEX IF NOT EXISTS %s ON %s (%s)" % (index, table, columns))
+        self.cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS axon_synapse_link_axon ON axon_synapse_link (axon_state_ID)")
+        self.cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS axon_synapse_link_synapse ON axon_synapse_link (synapse_state_ID)")
+        self.cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS synapse_dendrite_link_synapse ON synapse_dendrite_link (synapse_state_ID)")
+        self.cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS synapse_dendrite_link_dendrite ON synapse_dendrite_link (dendrite_state_ID)")
+
+    def _createAdjacency(self):
+        """!
+        Internal method to create the adjacency tables (neuron, synapse_dendrite, axon_synapse), if they do not exist. Adjacency tables materialize the joins of neuron_body, neuron_dendrite, axon_synapse_link and synapse_dendrite_link tables, and are maintained by triggers when neurons, dendrites and links are added, updated or deleted; hence, topology lookups in transfer functions are index seeks instead of joins. Adjacency views from earlier versions of brain database are replaced by adjacency tables.
+        """
+        rebuild = False
+        for adjacency in self._adjacency:
+            self.cur.execute("SELECT type FROM sqlite_master WHERE name = ?", (adjacency,))
+            existing = self.cur.fetchone()
+            if existing != None and existing[0] == "view":
+                self.cur.execute("DROP VIEW %s" % adjacency)
+                existing = None
+            if existing == None:
+                self.cur.execute("CREATE TABLE %s (%s)" % (adjacency, ", ".join(["%s text" % column for column in self._adjacency[adjacency][0]])))
+                rebuild = True
+        if rebuild: 
+            self._rebuildAdjacency()
+        else:
+            self._createAdjacencyTriggers()
+
+    def _adjacencySelect(self, adjacency, link=None, row=None):
+        """!
+        Internal method to generate the SELECT statement of an adjacency table.
+
+        @param adjacency String: Name of adjacency table
+        @param link String: Name of link table to be replaced by a single row. Default = None (no replacement).
+        @param row String: Trigger row ("new" or "old") to replace the link table with. Default = None.
+        @return: SELECT statement
+        """
+        tables = dict([(table, table) for table in self._links])
+        if link != None:
+            tables[link] = "(SELECT %s)" % ", ".join(["%s.%s AS %s" % (row, column, column) for column in self._links[link]])
+        return self._adjacency[adjacency][1] % tables
+
+    def _adjacencySlice(self, adjacency, link, row):
+        """!
+        Internal method to generate the conditions for the rows in an adjacency table derived from the values of a trigger row in a link table.
+
+        @param adjacency String: Name of adjacency table
+        @param link String: Name of link table
+        @param row String: Trigger row ("new" or "old")
+        @return: (conditions on adjacency table, conditions on SELECT statement of adjacency table)
+        """
+        (alias, columns) = self._adjacency[adjacency][2][link]
+        target = " AND ".join(["%s IS %s.%s" % (columns[column], row, column) for column in columns])
+        source = " AND ".join(["%s.%s IS %s.%s" % (alias, column, row, column) for column in columns])
+        return (target, source)
+
+    def _createAdjacencyTriggers(self):
         """!
-        Disconnects and closes the brain database file.
+        Internal method to create the triggers to maintain adjacency tables, if they do not exist. An insertion into a link table inserts the derived adjacency rows; a deletion or update of a link table recomputes the affected adjacency rows from the link tables.
         """
+        for adjacency in self._adjacency:
+            columns = ", ".join(self._adjacency[adjacency][0])
+            for link in self._adjacency[adjacency][2]:
+                (old_target, old_source) = self._adjacencySlice(adjacency, link, "old")
+                (new_target, new_source) = self._adjacencySlice(adjacency, link, "new")
+                select = self._adjacencySelect(adjacency)
+                self.cur.execute("CREATE TRIGGER IF NOT EXISTS %s_%s_insert AFTER INSERT ON %s BEGIN INSERT INTO %s (%s) %s; END" % (adjacency, link, link, adjacency, columns, self._adjacencySelect(adjacency, link, "new")))
+                self.cur.execute("CREATE TRIGGER IF NOT EXISTS %s_%s_delete AFTER DELETE ON %s BEGIN DELETE FROM %s WHERE %s; INSERT INTO %s (%s) %s WHERE %s; END" % (adjacency, link, link, adjacency, old_target, adjacency, columns, select, old_source))
+                self.cur.execute("CREATE TRIGGER IF NOT EXISTS %s_%s_update AFTER UPDATE ON %s BEGIN DELETE FROM %s WHERE (%s) OR (%s); INSERT INTO %s (%s) %s WHERE (%s) OR (%s); END" % (adjacency, link, link, adjacency, old_target, new_target, adjacency, columns, select, old_source, new_source))
+
+    def _dropAdjacencyTriggers(self):
+        """!
+        Internal method to drop the triggers maintaining adjacency tables, before a bulk load or migration.
+        """
+        for adjacency in self._adjacency:
+            for link in self._adjacency[adjacency][2]:
+                for event in ["insert", "delete", "update"]:
+                    self.cur.execute("DROP TRIGGER IF EXISTS %s_%s_%s" % (adjacency, link, event))
+
+    def _rebuildAdjacency(self):
+        """!
+        Internal method to rebuild the adjacency tables from link tables and to (re)create the triggers maintaining them.
+        """
+        for adjacency in self._adjacency:
+            self.cur.execute("DELETE FROM %s" % adjacency)
+            self.cur.execute("INSERT INTO %s (%s) %s ORDER BY %s" % (adjacency, ", ".join(self._adjacency[adjacency][0]), self._adjacencySelect(adjacency), self._adjacency[adjacency][3]))
+        self._createAdjacencyTriggers()
+
+    def _adjacencyQuery(self, adjacency, statement):
+        """!
+        Internal method to prepare a SELECT statement on an adjacency table. During a bulk load, the triggers maintaining adjacency tables are suspended (see beginBulkLoad() method); hence, the adjacency table is replaced by a common table expression deriving the adjacency from the link tables, and lookups during a bulk load see the additions of the bulk load.
+
+        @param adjacency String: Name of adjacency table
+        @param statement String: SELECT statement on the adjacency table
+        @return: SELECT statement
+        """
+        if not self.bulk: return statement
+        return "WITH %s (%s) AS (%s) %s" % (adjacency, ", ".join(self._adjacency[adjacency][0]), self._adjacencySelect(adjacency), statement)
+
+    def _dropIndexes(self):
+        """!
+        Internal method to drop the (non-unique) indexes of the brain database before a bulk load. The unique indexes on links are kept as they prevent duplicated links.
+        """
+        for (index, table, columns) in self._indexes:
+            self.cur.execute("DROP INDEX IF EXISTS %s" % index)
+
+    def beginBulkLoad(self):
+        """!
+        Method to start a bulk load of the brain, such as adding a large number of neurons and synapses, and linking them. During a bulk load, all additions (from addNeuron(), addSynapse(), addDendrite(), linkAxonSynapse(), linkSynapseDendrite(), linkRandomAxonSynapse(), and linkRandomSynapseDendrite() methods) are written in a single transaction, and the (non-unique) indexes and adjacency tables are dropped / suspended to be recreated after the load by endBulkLoad() method. Topology lookups during a bulk load (such as stapleNeurons() and getStateIDFromNeuronID() methods, and runBrain() method) derive the adjacency from the link tables instead.
+
+        Usage:
+
+            brain.beginBulkLoad()
+            brain.addNeuron(10000)
+            brain.addSynapse(20000)
+            brain.linkRandomAxonSynapse(20000)
+            brain.linkRandomSynapseDendrite(20000)
+            brain.endBulkLoad()
+        """
+        self._dropIndexes()
+        self._dropAdjacencyTriggers()
+        self.bulk = True
+        if self.logging: self.logger("beginBulkLoad", "beginBulkLoad")
+
+    def endBulkLoad(self):
+        """!
+        Method to end a bulk load of the brain (see beginBulkLoad() method). The indexes and adjacency tables are rebuilt and the additions are committed.
+        """
+        self.bulk = False
+        self._rebuildAdjacency()
+        self.clearCache()
+        self._createIndexes()
+        if self.logging: self.logger("endBulkLoad", "endBulkLoad")
         self.con.commit()
+
+    def _commit(self):
+        """!
+        Internal method to commit the additions of a construction method, unless a bulk load is in progress (see beginBulkLoad() method).
+        """
+        if not self.bulk: self.con.commit()
+
+    def disconnectBrain(self):
+        """!
+        Disconnects and closes the brain database file. If the in-memory engine is active, the engine will be stopped and its states written into the brain database.
+        """
+        if self.engine != None: self.stopEngine()
+        if self.bulk: self.endBulkLoad()
         if self.logging: self.logger("disconnectBrain", "disconnectBrain")
+        self.flushLog()
+        self.con.commit()
+        if self.mode == "memory": self.backupBrain()
         self.con.close()
 
+    def backupBrain(self, brainDB=None):
+        """!
+        Method to write (back up) the brain database into a brain database file using SQLite backup API. This is used in memory mode (see connectBrain() method) to write the in-memory database into the brain database file. If the in-memory engine is active, the states in the engine are written into the brain database before the backup.
+
+        @param brainDB String: Path to brain database file. Default = None (the connected brain database file).
+        """
+        if brainDB == None: brainDB = self.brainDB
+        if self.engine != None: self.engine.save()
+        self.flushLog()
+        self.con.commit()
+        target = sqlite3.connect(brainDB)
+        target.execute("PRAGMA synchronous = %s" % self._journal[1])
+        self.con.backup(target)
+        target.execute("PRAGMA journal_mode = %s" % self._journal[0])
+        target.close()
+        if self.logging: self.logger("backupBrain", "backupBrain/" + str(brainDB))
+
     def logger(self, function, message):
         """!
-        Method to write information into log table - used for internal logging if self.logging == True.
+        Method to write information into log table - used for internal logging if self.logging == True. Log messages are buffered in memory and written into log table by flushLog() method when self.log_buffer_size messages are buffered or self.log_flush_interval seconds have passed since the last flush, and when the brain is disconnected. Log messages are written in the transaction of the brain; hence, they are committed together with the changes that they describe.
 
         @param function String: Function / method name initiating the log message
         @param message String: Message to be logged
         """
+        self._logBuffer.append((function, message))
+        if len(self._logBuffer) >= self.log_buffer_size or (time.time() - self._logFlushed) >= self.log_flush_interval:
+            self.flushLog()
+
+    def flushLog(self):
+        """!
+        Method to write buffered log messages into log table.
+
+        @return: Number of log messages written
+        """
+        messages = self._logBuffer
+        self._logBuffer = []
+        self._logFlushed = time.time()
+        if len(messages) == 0: return 0
         try: 
-            self.cur.execute("INSERT INTO log (function , message) VALUES ('%s', '%s')" % (function , message))
+            self.cur.executemany("INSERT INTO log (function, message) VALUES (?, ?)", messages)
         except sqlite3.OperationalError:
-            print("INSERT INTO log (function , message) VALUES ('%s', '%s')" % (function , message))
-        self.con.commit()
+            for (function, message) in messages:
+                print("INSERT INTO log (function, message) VALUES ('%s', '%s')" % (function, message))
+        return len(messages)
+
+    def _traceSQL(self, statement):
+        """!
+        Internal method to count the SQL statements executed, as SQLite trace callback while profiling is started.
+
+        @param statement String: SQL statement
+        """
+        self._SQLcount = self._SQLcount + 1
+
+    def startProfiling(self):
+        """!
+        Method to start profiling of the transfer, modulating and maintenance functions, and runBrain() method (see profiled() decorator). Wall time (in seconds) and number of SQL statements executed are recorded into self.profile dictionary as {function name: {"calls": number of calls, "time": wall time, "sql": number of SQL statements}} and for each cycle (runBrain() method) into self.profileCycles list as {function name: {"calls": number of calls, "time": wall time, "sql": number of SQL statements}}. Previous profiles are cleared.
+        """
+        self.profile = {}
+        self.profileCycles = []
+        self._cycleProfile = {}
+        self._SQLcount = 0
+        self._profiled = set()
+        self.con.set_trace_callback(self._traceSQL)
+        self.profiling = True
+
+    def stopProfiling(self):
+        """!
+        Method to stop profiling (see startProfiling() method).
+
+        @return: Profile dictionary (self.profile)
+        """
+        self.profiling = False
+        self.con.set_trace_callback(None)
+        return self.profile
+
+    def _recordProfile(self, function, elapsed, count):
+        """!
+        Internal method to record the wall time and number of SQL statements of a profiled function call (see profiled() decorator).
+
+        @param function String: Function / method name
+        @param elapsed Float: Wall time in seconds
+        @param count Integer: Number of SQL statements executed
+        """
+        for profile in [self.profile, self._cycleProfile]:
+            if function not in profile:
+                profile[function] = {"calls": 0, "time": 0.0, "sql": 0}
+            profile[function]["calls"] = profile[function]["calls"] + 1
+            profile[function]["time"] = profile[function]["time"] + elapsed
+            profile[function]["sql"] = profile[function]["sql"] + count
+        if function == "runBrain":
+            self.profileCycles.append(self._cycleProfile)
+            self._cycleProfile = {}
+
+    def writeProfile(self, output="log"):
+        """!
+        Method to write the profile of each cycle (self.profileCycles; see startProfiling() method) into log table or a CSV file, with cycle number, function name, number of calls, wall time (in seconds) and number of SQL statements.
+
+        @param output String: "log" to write into log table, or path of CSV file to write. Default = "log".
+        @return: Number of profile records written
+        """
+        records = [(cycle + 1, function, profile[function]["calls"], profile[function]["time"], profile[function]["sql"])
+                   for cycle, profile in enumerate(self.profileCycles)
+                   for function in profile]
+        if output == "log":
+            for record in records:
+                self.logger("profile", "cycle=%s/function=%s/calls=%s/time=%s/sql=%s" % record)
+            self.flushLog()
+        else:
+            with open(output, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["cycle", "function", "calls", "time", "sql"])
+                writer.writerows(records)
+        return len(records)
 
     def nameID(self, ID, name, description=""):
         """!
@@ -122,9 +529,97 @@ class brainopy(object):
         @param name String: Label
         @param description String: Descriptive text of the label
         """
-        self.cur.execute("INSERT INTO name_ID (ID, name, description) VALUES ('%s', '%s', '%s')" % (ID, name, description))
+        self.cur.execute("INSERT INTO name_ID (ID, name, description) VALUES (?, ?, ?)", (ID, name, description))
+        self._nameCache.pop(name, None)
         if self.logging: self.logger("nameID", "ID=" + str(ID) + "/name=" + str(name) + "/description=" + str(description))
 
+    def _checkName(self, name, allowed):
+        """!
+        Internal method to check a table or column name before it is used in a SQL statement, as table and column names cannot be given as parameters.
+
+        @param name String: Table or column name
+        @param allowed List: Allowable names
+        @return: name
+        """
+        if name not in allowed:
+            raise ValueError("Unknown table or column name: " + str(name))
+        return name
+
+    def clearCache(self):
+        """!
+        Method to clear the caches of name labels, ID tables and neuron topology. The caches are maintained by the methods of this class; hence, this method is only needed after changing name_ID, ID_table, neuron_body or neuron_dendrite tables directly in SQL.
+        """
+        self._nameCache = {}
+        self._tableCache = {}
+        self._aliasCache = {}
+        self._neuronCache = {}
+
+    def _lookupName(self, name):
+        """!
+        Internal method to get the ID and table name of a name label, using the cache of name labels. If the name label is not found in name_ID, it is looked up as an alias of an ID (old ID from migrateIDs() method) in ID_alias.
+
+        @param name String: Name label or alias
+        @return: (ID, table_name)
+        """
+        if name not in self._nameCache:
+            self.cur.execute("SELECT ID, table_name FROM name_ID_table WHERE name = ?", (name,))
+            row = self.cur.fetchone()
+            if row == None:
+                self.cur.execute("SELECT ID_alias.ID, ID_table.table_name FROM ID_alias INNER JOIN ID_table ON ID_alias.ID = ID_table.ID WHERE ID_alias.alias = ?", (name,))
+                row = self.cur.fetchone()
+            if row == None:
+                raise ValueError("Unknown name label: " + str(name))
+            (ID, table_name) = row
+            self._nameCache[name] = (ID, table_name)
+            self._tableCache[ID] = table_name
+        return self._nameCache[name]
+
+    def _lookupID(self, ID):
+        """!
+        Internal method to get the table name of an ID, using the cache of ID tables. If the ID is not found in ID_table, it is looked up as an alias of an ID (old ID from migrateIDs() method) in ID_alias.
+
+        @param ID String: ID or alias
+        @return: (ID, table_name)
+        """
+        if ID in self._aliasCache: ID = self._aliasCache[ID]
+        if ID not in self._tableCache:
+            self.cur.execute("SELECT table_name FROM ID_table WHERE ID = ?", (ID,))
+            row = self.cur.fetchone()
+            if row == None:
+                self.cur.execute("SELECT ID_alias.ID, ID_table.table_name FROM ID_alias INNER JOIN ID_table ON ID_alias.ID = ID_table.ID WHERE ID_alias.alias = ?", (ID,))
+                row = self.cur.fetchone()
+                if row == None:
+                    raise ValueError("Unknown ID: " + str(ID))
+                self._aliasCache[ID] = row[0]
+                ID = row[0]
+                row = row[1:]
+            self._tableCache[ID] = row[0]
+        return (ID, self._tableCache[ID])
+
+    def _lookupNeuron(self, ID, state_type):
+        """!
+        Internal method to get dendrite state IDs, neuron state ID or axon state ID of a neuron, using the cache of neuron topology. An old ID from migrateIDs() method is resolved through ID_alias, and ValueError is raised for an unknown ID.
+
+        @param ID String: ID of neuron / neuron body
+        @param state_type String: Type of ID to return. Allowable values are "dendrite_state_ID", "neuron_state_ID", or "axon_state_ID".
+        @return: ID if state_type is "neuron_state_ID", or "axon_state_ID", [IDs] if state_type is "dendrite_state_ID".
+        """
+        state_type = self._checkName(state_type, ["dendrite_state_ID", "neuron_state_ID", "axon_state_ID"])
+        if ID not in self._neuronCache:
+            self.cur.execute(self._adjacencyQuery("neuron", "SELECT dendrite_state_ID, neuron_state_ID, axon_state_ID FROM neuron WHERE neuron_ID = ?"), (ID,))
+            rows = self.cur.fetchall()
+            if len(rows) == 0:
+                (current_ID, table_name) = self._lookupID(ID)
+                if current_ID != ID: return self._lookupNeuron(current_ID, state_type)
+                if state_type == "dendrite_state_ID": return []
+                raise TypeError("No neuron with ID " + str(ID))
+            self._neuronCache[ID] = {"dendrite_state_ID": [x[0] for x in rows], 
+                                     "neuron_state_ID": rows[0][1], 
+                                     "axon_state_ID": rows[0][2]}
+        state_ID = self._neuronCache[ID][state_type]
+        if state_type == "dendrite_state_ID": state_ID = list(state_ID)
+        return state_ID
+
     def getStateIDFromNeuronID(self, ID, state_type="neuron_state_ID"):
         """!
         Method to get dendrite state ID, neuron state ID or axon state ID from neuron ID / neuron body ID.
@@ -133,12 +628,7 @@ class brainopy(object):
         @param state_type String: Type of ID to return. Allowable values are "dendrite_state_ID", "neuron_state_ID", or "axon_state_ID". Default = "neuron_state_ID"
         @return: ID if state_type is "neuron_state_ID", or "axon_state_ID", [IDs] if state_type is "dendrite_state_ID".
         """
-        self.cur.execute("SELECT %s FROM neuron WHERE neuron_ID = '%s'" % (state_type, ID))
-        if state_type in ["neuron_state_ID", "axon_state_ID"]:
-            state_ID = self.cur.fetchone()[0]
-        elif state_type == "dendrite_state_ID":
-            state_ID = [x[0] for x in self.cur.fetchall()]
-        return state_ID
+        return self._lookupNeuron(ID, state_type)
 
     def getStateIDFromNeuronName(self, name, state_type="neuron_state_ID"):
         """!
@@ -148,45 +638,28 @@ class brainopy(object):
         @param state_type String: Type of ID to return. Allowable values are "dendrite_state_ID", "neuron_state_ID", or "axon_state_ID".Default = "neuron_state_ID"
         @return: ID if state_type is "neuron_state_ID", or "axon_state_ID", [IDs] if state_type is "dendrite_state_ID".
         """
-        #print("SELECT ID FROM name_ID_table WHERE name = '%s'" % name)
-        self.cur.execute("SELECT ID FROM name_ID_table WHERE name = '%s'" % name)
-        neuron_ID = self.cur.fetchone()[0]
-        self.cur.execute("SELECT %s FROM neuron WHERE neuron_ID = '%s'" % (state_type, neuron_ID))
-        if state_type in ["neuron_state_ID", "axon_state_ID"]:
-            state_ID = self.cur.fetchone()[0]
-        elif state_type == "dendrite_state_ID":
-            state_ID = [x[0] for x in self.cur.fetchall()]
-        return state_ID
+        return self._lookupNeuron(self._lookupName(name)[0], state_type)
 
     def readNeurotransmitters(self, identifier, identifier_type="name"):
         """!
-        Method to read neurotransmitter values using an identifier (ID or name label tagged by nameID method). This can be used to read dendrite state, neuron state, axon state, or synapse state. If the identifier is a neuron body ID or name label of a neuron body, the neuron state of the neuron body will be returned. 
+        Method to read neurotransmitter values using an identifier (ID or name label tagged by nameID method). This can be used to read dendrite state, neuron state, axon state, or synapse state. If the identifier is a neuron body ID or name label of a neuron body, the neuron state of the neuron body will be returned. Name labels, tables of IDs and neuron topology are cached; and if the in-memory engine is active, the values are read from the engine.
 
         @param identifier String: ID or name label
         @param identifier_type String: Type of identifier. Allowable values are "ID" (the identifier is an ID) and "name" (the identifier is a name label). Default = "name"
         @return: Dictionary of neurotransmitter values - {<neurotransmitter>: <value>}
         """
         if identifier_type.lower() == "name":
-            self.cur.execute("SELECT table_name FROM name_ID_table WHERE name = '%s'" % identifier)
-            table_name = self.cur.fetchone()[0]
-            if table_name == "neuron_body": 
-                identifier = self.getStateIDFromNeuronName(identifier, "neuron_state_ID")
-                self.cur.execute("SELECT neurotransmitter, value FROM neuron_state WHERE ID = '%s'" % identifier)
-            else: 
-                self.cur.execute("SELECT neurotransmitter, value FROM name_%s WHERE name = '%s'" % (table_name, identifier))
+            (identifier, table_name) = self._lookupName(identifier)
         elif identifier_type.lower() == "id":
-            self.cur.execute("SELECT table_name FROM ID_table WHERE ID = '%s'" % identifier)
-            table_name = self.cur.fetchone()[0]
-            if table_name == "neuron_body":
-                identifier = self.getStateIDFromNeuronID(identifier, "neuron_state_ID")
-                self.cur.execute("SELECT neurotransmitter, value FROM neuron_state WHERE ID = '%s'" % identifier)
-            else:
-                self.cur.execute("SELECT neurotransmitter, value FROM %s WHERE ID = '%s'" % (table_name, identifier))
+            (identifier, table_name) = self._lookupID(identifier)
         else: return {}
-        neurotransmitters = {}
-        for neurotransmitter in [(x[0], x[1]) for x in self.cur.fetchall()]:
-            neurotransmitters[neurotransmitter[0]] = neurotransmitter[1]
-        return neurotransmitters
+        if table_name == "neuron_body":
+            identifier = self._lookupNeuron(identifier, "neuron_state_ID")
+            table_name = "neuron_state"
+        table_name = self._checkName(table_name, self.statetypes)
+        if self.engine != None:
+            return self.engine.readState(table_name, identifier)
+        return dict(self._readState(table_name, identifier))
 
     def addNeurotransmitters(self, neurotransmitters):
         """!
@@ -196,23 +669,86 @@ class brainopy(object):
         """
         for key in neurotransmitters:
             try: 
-                self.cur.execute("INSERT INTO neurotransmitter (neurotransmitter, description) VALUES ('%s', '%s')" % (key, neurotransmitters[key]))
-                if self.logging: self.logger("addNeurotransmitters", "neurotransmitter=" + str(key) + "/value=" + str(value))
+                self.cur.execute("INSERT INTO neurotransmitter (neurotransmitter, description) VALUES (?, ?)", (key, neurotransmitters[key]))
+                if self.layout == "wide":
+                    for statetype in self.statetypes:
+                        self.cur.execute("ALTER TABLE %s ADD COLUMN %s real" % (statetype, self._quote(key)))
+                    self._columns = {}
+                if self.logging: self.logger("addNeurotransmitters", "neurotransmitter=" + str(key) + "/value=" + str(neurotransmitters[key]))
             except: 
                 pass
         self.con.commit()
 
+    def _reserveIDs(self, n):
+        """!
+        Internal method to reserve a block of n sequential integer IDs from the ID counter in the brain database.
+
+        @param n Integer: Number of IDs to reserve
+        @return: [start, end), the block of reserved IDs
+        """
+        n = int(n)
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            self.cur.execute("UPDATE ID_counter SET value = value + ? WHERE name = 'ID' RETURNING value", (n,))
+        else:
+            self.cur.execute("UPDATE ID_counter SET value = value + ? WHERE name = 'ID'", (n,))
+            self.cur.execute("SELECT value FROM ID_counter WHERE name = 'ID'")
+        end = self.cur.fetchone()[0]
+        return [end - n, end]
+
+    def _getUniqueIDs(self, n):
+        """!
+        Internal method to get n new unique IDs for objects / states. IDs are sequential integers (as text), which are handed out from blocks of self.ID_block_size IDs reserved from the brain database; hence, IDs do not need to be checked against ID_table. IDs reserved but not used (when the brain is disconnected) are skipped.
+
+        @param n Integer: Number of IDs
+        @return: List of IDs
+        """
+        n = int(n)
+        IDs = []
+        while len(IDs) < n:
+            if self._IDblock[0] >= self._IDblock[1]:
+                self._IDblock = self._reserveIDs(max(self.ID_block_size, n - len(IDs)))
+            count = min(n - len(IDs), self._IDblock[1] - self._IDblock[0])
+            IDs = IDs + [str(ID) for ID in range(self._IDblock[0], self._IDblock[0] + count)]
+            self._IDblock[0] = self._IDblock[0] + count
+        return IDs
+
     def _getUniqueID(self):
         """!
         Internal method to get a new unique ID for object / state.
         """
-        exist = True
-        while exist:
-            ID = str(uuid.uuid4())
-            self.cur.execute("SELECT 1 FROM ID_table WHERE ID = '%s'" % ID)
-            if self.cur.fetchone() == None: 
-                exist = False
-        return ID
+        return self._getUniqueIDs(1)[0]
+
+    def migrateIDs(self):
+        """!
+        Method to migrate a brain created with text (UUID) IDs to sequential integer IDs. All IDs are renumbered in one transaction. To keep the old IDs readable, each old ID is added into ID_alias table as an alias of the new ID, regardless of the name label of the new ID; hence, the old ID can still be used where IDs or name labels are accepted, such as readNeurotransmitters(), getStateIDFromNeuronID() and getStateIDFromNeuronName() methods.
+
+        @return: Dictionary of {<old ID>: <new ID>}
+        """
+        if self.engine != None:
+            raise RuntimeError("Stop the in-memory engine before migrating IDs")
+        self.cur.execute("SELECT ID FROM ID_table WHERE CAST(CAST(ID AS INTEGER) AS TEXT) != ID ORDER BY rowid")
+        oldIDs = [x[0] for x in self.cur.fetchall()]
+        newIDs = self._getUniqueIDs(len(oldIDs))
+        mapping = dict(zip(oldIDs, newIDs))
+        self.cur.execute("CREATE TEMP TABLE IF NOT EXISTS ID_map (old text primary key, new text)")
+        self.cur.execute("DELETE FROM ID_map")
+        self.cur.executemany("INSERT INTO ID_map (old, new) VALUES (?, ?)", list(mapping.items()))
+        self._dropAdjacencyTriggers()
+        columns = [("ID_table", "ID"), ("name_ID", "ID"), 
+                   ("neuron_state", "ID"), ("dendrite_state", "ID"), ("axon_state", "ID"), ("synapse_state", "ID"),
+                   ("neuron_body", "ID"), ("neuron_body", "neuron_state_ID"), ("neuron_body", "axon_state_ID"),
+                   ("neuron_dendrite", "ID"), ("neuron_dendrite", "dendrite_state_ID"),
+                   ("axon_synapse_link", "axon_state_ID"), ("axon_synapse_link", "synapse_state_ID"),
+                   ("synapse_dendrite_link", "synapse_state_ID"), ("synapse_dendrite_link", "dendrite_state_ID")]
+        for (table, column) in columns:
+            self.cur.execute("UPDATE %s SET %s = (SELECT new FROM ID_map WHERE old = %s) WHERE %s IN (SELECT old FROM ID_map)" % (table, column, column, column))
+        self.cur.execute("INSERT OR REPLACE INTO ID_alias (alias, ID) SELECT old, new FROM ID_map")
+        self.cur.execute("DROP TABLE ID_map")
+        self._rebuildAdjacency()
+        self.clearCache()
+        self.con.commit()
+        if self.logging: self.logger("migrateIDs", "IDs=" + str(len(mapping)))
+        return mapping
 
     def getIDs(self, table):
         """!
@@ -221,7 +757,7 @@ class brainopy(object):
         @param table String: Name of database table
         @return: List of IDs
         """
-        self.cur.execute("SELECT DISTINCT ID from ID_table WHERE table_name = '%s'" % table)
+        self.cur.execute("SELECT ID from ID_table WHERE table_name = ? ORDER BY rowid", (table,))
         return [x[0] for x in self.cur.fetchall()]
 
     def getNeurotransmitters(self):
@@ -233,19 +769,155 @@ class brainopy(object):
         self.cur.execute("SELECT neurotransmitter from neurotransmitter")
         return [x[0] for x in self.cur.fetchall()]
 
+    @staticmethod
+    def _quote(name):
+        """!
+        Internal method to quote a neurotransmitter as a column name of state tables in "wide" layout.
+        """
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _stateColumns(self, statetype):
+        """!
+        Internal method to get the neurotransmitter columns of a state table in "wide" layout.
+
+        @param statetype String: Type of state
+        @return: List of neurotransmitters
+        """
+        if statetype not in self._columns:
+            self.cur.execute("PRAGMA table_info(%s)" % self._checkName(statetype, self.statetypes))
+            self._columns[statetype] = [x[1] for x in self.cur.fetchall() if x[1] != "ID"]
+        return self._columns[statetype]
+
+    def _readState(self, statetype, state_ID):
+        """!
+        Internal method to read the neurotransmitter values of a state, regardless of the layout of state tables.
+
+        @param statetype String: Type of state
+        @param state_ID String: ID of state
+        @return: [(neurotransmitter, value)]
+        """
+        statetype = self._checkName(statetype, self.statetypes)
+        if self.layout == "long":
+            self.cur.execute("SELECT neurotransmitter, value FROM %s WHERE ID = ?" % statetype, (state_ID,))
+            return [(x[0], x[1]) for x in self.cur.fetchall()]
+        columns = self._stateColumns(statetype)
+        self.cur.execute("SELECT %s FROM %s WHERE ID = ?" % (", ".join(["ID"] + [self._quote(c) for c in columns]), statetype), (state_ID,))
+        row = self.cur.fetchone()
+        if row == None: return []
+        return [(columns[i], row[i+1]) for i in range(len(columns)) if row[i+1] != None]
+
+    def _readStates(self, statetype, IDs="all"):
+        """!
+        Internal method to read the neurotransmitter values of states in a state table, regardless of the layout of state tables. If a list of state IDs is given, only the requested states are selected (in chunks, using _selectIn() method) instead of reading the whole state table.
+
+        @param statetype String: Type of state
+        @param IDs List: List of state IDs, or "all" for all states of statetype. Default = "all".
+        @return: [(state_ID, neurotransmitter, value)] in the order of the state table
+        """
+        statetype = self._checkName(statetype, self.statetypes)
+        if self.layout == "long":
+            if IDs == "all":
+                self.cur.execute("SELECT ID, neurotransmitter, value FROM %s ORDER BY rowid" % statetype)
+                return self.cur.fetchall()
+            rows = sorted(self._selectIn("SELECT rowid, ID, neurotransmitter, value FROM %s WHERE ID IN (%%s)" % statetype, set(IDs)))
+            return [row[1:] for row in rows]
+        columns = self._stateColumns(statetype)
+        selection = ", ".join(["ID"] + [self._quote(c) for c in columns])
+        if IDs == "all":
+            self.cur.execute("SELECT %s FROM %s ORDER BY rowid" % (selection, statetype))
+            rows = self.cur.fetchall()
+        else:
+            rows = sorted(self._selectIn("SELECT rowid, %s FROM %s WHERE ID IN (%%s)" % (selection.replace("%", "%%"), statetype), set(IDs)))
+            rows = [row[1:] for row in rows]
+        return [(row[0], columns[i], row[i+1]) for row in rows for i in range(len(columns)) if row[i+1] != None]
+
+    def _writeStates(self, statetype, updates):
+        """!
+        Internal method to update neurotransmitter values of states, regardless of the layout of state tables. In "long" layout, one row is updated per neurotransmitter value; in "wide" layout, one row is updated per state. Neurotransmitters not present in a state are not added.
+
+        @param statetype String: Type of state
+        @param updates List: [(value, state_ID, neurotransmitter)]
+        """
+        statetype = self._checkName(statetype, self.statetypes)
+        if self.layout == "long":
+            self.cur.executemany("UPDATE %s SET value = ? WHERE ID = ? AND neurotransmitter = ?" % statetype, updates)
+            return
+        columns = self._stateColumns(statetype)
+        states = {}
+        for (value, state_ID, neurotransmitter) in updates:
+            if neurotransmitter in columns:
+                if state_ID not in states: states[state_ID] = {}
+                states[state_ID][neurotransmitter] = value
+        groups = {}
+        for state_ID in states:
+            key = tuple(states[state_ID].keys())
+            if key not in groups: groups[key] = []
+            groups[key].append(tuple(states[state_ID].values()) + (state_ID,))
+        for key in groups:
+            assignments = ", ".join(["%s = CASE WHEN %s IS NULL THEN NULL ELSE ? END" % (self._quote(c), self._quote(c)) for c in key])
+            self.cur.executemany("UPDATE %s SET %s WHERE ID = ?" % (statetype, assignments), groups[key])
+
+    def migrateStateLayout(self, layout="wide"):
+        """!
+        Method to migrate the state tables (neuron_state, dendrite_state, axon_state, synapse_state) to another layout in one transaction. In "long" layout, each state is stored as one row per neurotransmitter; in "wide" layout, each state is stored as one row with one column per neurotransmitter, which reduces the number of rows and index entries by the number of neurotransmitters.
+
+        @param layout String: Layout of state tables. Allowable values are "long" and "wide". Default = "wide".
+        @return: Number of neurotransmitter values migrated
+        """
+        if layout not in ["long", "wide"]:
+            raise ValueError("Unknown state layout: " + str(layout))
+        if self.engine != None:
+            raise RuntimeError("Stop the in-memory engine before migrating state layout")
+        if layout == self.layout: return 0
+        states = dict([(statetype, self._readStates(statetype)) for statetype in self.statetypes])
+        for statetype in self.statetypes:
+            self.cur.execute("DROP VIEW IF EXISTS name_%s" % statetype)
+            self.cur.execute("DROP TABLE %s" % statetype)
+        self._columns = {}
+        self._createStateTables(layout)
+        count = 0
+        for statetype in self.statetypes:
+            if self.layout == "long":
+                self.cur.executemany("INSERT INTO %s (ID, neurotransmitter, value) VALUES (?, ?, ?)" % statetype, states[statetype])
+            else:
+                columns = self._stateColumns(statetype)
+                rows = {}
+                for (state_ID, neurotransmitter, value) in states[statetype]:
+                    if state_ID not in rows: rows[state_ID] = [None] * len(columns)
+                    if neurotransmitter in columns: rows[state_ID][columns.index(neurotransmitter)] = value
+                self.cur.executemany("INSERT INTO %s VALUES (%s)" % (statetype, ", ".join(["?"] * (len(columns) + 1))), [tuple([state_ID] + rows[state_ID]) for state_ID in rows])
+            count = count + len(states[statetype])
+        self._createStateViews()
+        self._createIndexes()
+        self.con.commit()
+        if self.logging: self.logger("migrateStateLayout", "layout=" + str(layout) + "/values=" + str(count))
+        return count
+
+    def _addStates(self, statetype, IDs):
+        """!
+        Internal method to add new states, which is one of ["axon_state", "dendrite_state", "neuron_body", "neuron_state", "synapse_state"]. The states (with all registered neurotransmitters) are written using one executemany() per table.
+
+        @param statetype String: Type of state
+        @param IDs List: IDs of the new states
+        @return: IDs
+        """
+        statetype = self._checkName(statetype, self.statetypes)
+        neurotransmitters = self.getNeurotransmitters()
+        self.cur.executemany("INSERT INTO ID_table (ID, table_name) VALUES (?, ?)", [(ID, statetype) for ID in IDs])
+        if self.layout == "long":
+            self.cur.executemany("INSERT INTO %s VALUES (?, ?, ?)" % statetype, [(ID, ntrans, 0.0) for ID in IDs for ntrans in neurotransmitters])
+        else:
+            columns = [ntrans for ntrans in self._stateColumns(statetype) if ntrans in neurotransmitters]
+            self.cur.executemany("INSERT INTO %s (%s) VALUES (%s)" % (statetype, ", ".join(["ID"] + [self._quote(c) for c in columns]), ", ".join(["?"] * (len(columns) + 1))), [tuple([ID] + [0.0] * len(columns)) for ID in IDs])
+        return IDs
+
     def _addState(self, statetype):
         """!
         Internal method to add a new state, which is one of ["axon_state", "dendrite_state", "neuron_body", "neuron_state", "synapse_state"].
 
         @param statetype String: Type of state
         """
-        neurotransmitters = self.getNeurotransmitters()
-        ID = self._getUniqueID()
-        self.cur.execute("INSERT INTO ID_table (ID, table_name) VALUES ('%s', '%s')" % (ID, statetype))
-        for ntrans in neurotransmitters:
-            self.cur.execute("INSERT INTO %s VALUES ('%s', '%s', %f)" % (statetype, ID, ntrans, 0.0))
-        self.con.commit()
-        return ID
+        return self._addStates(statetype, self._getUniqueIDs(1))[0]
 
     def addNamedNeuron(self, name, description=""):
         """!
@@ -266,24 +938,23 @@ class brainopy(object):
         @param n Integer: Number of neuron(s) to add. Default = 1
         @return: [(neuron_ID, dendrite_state_ID, neuron_state_ID, axon_state_ID)] representing the added neuron(s)
         """
-        IDList = []
-        for i in range(int(n)):
-            neurotransmitters = self.getNeurotransmitters()
-            neuron_ID = self._getUniqueID()
-            if self.logging: self.logger("addNeuron", "1/neuron_ID=" + str(neuron_ID))
-            dendrite_state_ID = self._addState("dendrite_state")
-            if self.logging: self.logger("addNeuron", "2/new_dendrite_state/dendrite_state_ID=" + str(dendrite_state_ID))
-            neuron_state_ID = self._addState("neuron_state")
-            if self.logging: self.logger("addNeuron", "3/new_neuron_state/neuron_state_ID=" + str(neuron_state_ID))
-            axon_state_ID = self._addState("axon_state")
-            if self.logging: self.logger("addNeuron", "4/new_axon_state/axon_state_ID=" + str(axon_state_ID))
-            self.cur.execute("INSERT INTO ID_table (ID, table_name) VALUES ('%s', '%s')" % (neuron_ID, 'neuron_body'))
-            self.cur.execute("INSERT INTO neuron_body (ID, neuron_state_ID, axon_state_ID) VALUES ('%s', '%s', '%s')" % (neuron_ID, neuron_state_ID, axon_state_ID))
-            self.cur.execute("INSERT INTO neuron_dendrite (ID, dendrite_state_ID) VALUES ('%s', '%s')" % (neuron_ID, dendrite_state_ID))
-            self.con.commit()
-            if self.logging: self.logger("addNeuron", "5/insert_tables")
-            IDs = (neuron_ID, dendrite_state_ID, neuron_state_ID, axon_state_ID)
-            IDList.append(IDs)
+        n = int(n)
+        IDs = self._getUniqueIDs(4 * n)
+        IDList = [tuple(IDs[i:i+4]) for i in range(0, 4 * n, 4)]
+        self._addStates("dendrite_state", [x[1] for x in IDList])
+        self._addStates("neuron_state", [x[2] for x in IDList])
+        self._addStates("axon_state", [x[3] for x in IDList])
+        self.cur.executemany("INSERT INTO ID_table (ID, table_name) VALUES (?, 'neuron_body')", [(x[0],) for x in IDList])
+        self.cur.executemany("INSERT INTO neuron_body (ID, neuron_state_ID, axon_state_ID) VALUES (?, ?, ?)", [(x[0], x[2], x[3]) for x in IDList])
+        self.cur.executemany("INSERT INTO neuron_dendrite (ID, dendrite_state_ID) VALUES (?, ?)", [(x[0], x[1]) for x in IDList])
+        if self.logging:
+            for (neuron_ID, dendrite_state_ID, neuron_state_ID, axon_state_ID) in IDList:
+                self.logger("addNeuron", "1/neuron_ID=" + str(neuron_ID))
+                self.logger("addNeuron", "2/new_dendrite_state/dendrite_state_ID=" + str(dendrite_state_ID))
+                self.logger("addNeuron", "3/new_neuron_state/neuron_state_ID=" + str(neuron_state_ID))
+                self.logger("addNeuron", "4/new_axon_state/axon_state_ID=" + str(axon_state_ID))
+                self.logger("addNeuron", "5/insert_tables")
+        self._commit()
         return IDList
 
     def addNamedSynapse(self, name, description=""):
@@ -305,11 +976,11 @@ class brainopy(object):
         @param n Integer: Number of synapse(s) to add. Default = 1
         @return: [synapse_state_ID] representing the added synapse(s)
         """
-        synapse_state_IDs = []
-        for i in range(int(n)):
-            synapse_state_ID = self._addState("synapse_state")
-            if self.logging: self.logger("addSynapse", "new_synapse_state/synapse_state_ID=" + str(synapse_state_ID))
-            synapse_state_IDs.append(synapse_state_ID)
+        synapse_state_IDs = self._addStates("synapse_state", self._getUniqueIDs(n))
+        if self.logging:
+            for synapse_state_ID in synapse_state_IDs:
+                self.logger("addSynapse", "new_synapse_state/synapse_state_ID=" + str(synapse_state_ID))
+        self._commit()
         return synapse_state_IDs
 
     def addDendrite(self, neuron_ID):
@@ -319,11 +990,11 @@ class brainopy(object):
         @param neuron_ID String: ID of neuron
         @return: dendrite_state_ID, representing the added dendrite
         """
-        neurotransmitters = self.getNeurotransmitters()
         dendrite_state_ID = self._addState("dendrite_state")
         if self.logging: self.logger("addDendrite", "1/new_dendrite_state/dendrite_state_ID=" + str(dendrite_state_ID))
-        self.cur.execute("INSERT INTO neuron_dendrite (ID, dendrite_state_ID) VALUES ('%s', '%s')" % (neuron_ID, dendrite_state_ID))
-        self.con.commit()
+        self.cur.execute("INSERT INTO neuron_dendrite (ID, dendrite_state_ID) VALUES (?, ?)", (neuron_ID, dendrite_state_ID))
+        self._neuronCache.pop(neuron_ID, None)
+        self._commit()
         if self.logging: self.logger("addDendrite", "2/insert_tables")
         return dendrite_state_ID
 
@@ -355,9 +1026,16 @@ class brainopy(object):
         @param synapse_state_ID String: ID of synapse
         @return: (axon_state_ID, synapse_state_ID), which are the parameters and the connection to register
         """
+        link = self._linkAxonSynapse(axon_state_ID, synapse_state_ID)
+        self._commit()
+        return link
+
+    def _linkAxonSynapse(self, axon_state_ID, synapse_state_ID):
+        """!
+        Internal method to register a connection between an axon and a synapse without committing. See linkAxonSynapse() method.
+        """
         try:
-            self.cur.execute("INSERT INTO axon_synapse_link (axon_state_ID, synapse_state_ID) VALUES ('%s', '%s')" % (axon_state_ID, synapse_state_ID))
-            self.con.commit()
+            self.cur.execute("INSERT INTO axon_synapse_link (axon_state_ID, synapse_state_ID) VALUES (?, ?)", (axon_state_ID, synapse_state_ID))
             if self.logging: self.logger("linkAxonSynapse", "new_axon_synapse/axon_state_ID=" + str(axon_state_ID) + "/synapse_state_ID=" + str(synapse_state_ID))
         except sqlite3.IntegrityError: pass
         return (axon_state_ID, synapse_state_ID)
@@ -373,10 +1051,12 @@ class brainopy(object):
         synapse_state_IDs = self.getIDs("synapse_state")
         linkages = []
         for i in range(int(n)):
-            axon_state_ID = random.choice(axon_state_IDs)
-            synapse_state_ID = random.choice(synapse_state_IDs)
-            link = self.linkAxonSynapse(axon_state_ID, synapse_state_ID)
-            linkages.append(link)
+            linkages.append((random.choice(axon_state_IDs), random.choice(synapse_state_IDs)))
+        if self.logging:
+            for link in linkages: self._linkAxonSynapse(*link)
+        else:
+            self.cur.executemany("INSERT OR IGNORE INTO axon_synapse_link (axon_state_ID, synapse_state_ID) VALUES (?, ?)", linkages)
+        self._commit()
         return linkages
 
     def linkSynapseDendrite(self, synapse_state_ID, dendrite_state_ID):
@@ -387,9 +1067,16 @@ class brainopy(object):
         @param dendrite_state_ID String: ID of dendrite
         @return: (synapse_state_ID, dendrite_state_ID), which are the parameters and the connection to register
         """
+        link = self._linkSynapseDendrite(synapse_state_ID, dendrite_state_ID)
+        self._commit()
+        return link
+
+    def _linkSynapseDendrite(self, synapse_state_ID, dendrite_state_ID):
+        """!
+        Internal method to register a connection between a synapse and a dendrite without committing. See linkSynapseDendrite() method.
+        """
         try:
-            self.cur.execute("INSERT INTO synapse_dendrite_link (synapse_state_ID, dendrite_state_ID) VALUES ('%s', '%s')" % (synapse_state_ID, dendrite_state_ID))
-            self.con.commit()
+            self.cur.execute("INSERT INTO synapse_dendrite_link (synapse_state_ID, dendrite_state_ID) VALUES (?, ?)", (synapse_state_ID, dendrite_state_ID))
             if self.logging: self.logger("linkSynapseDendrite", "new_synapse_dendrite/dendrite_state_ID=" + str(dendrite_state_ID) + "/synapse_state_ID=" + str(synapse_state_ID))
         except sqlite3.IntegrityError: pass
         return (synapse_state_ID, dendrite_state_ID)
@@ -406,9 +1093,12 @@ class brainopy(object):
         linkages = []
         for i in range(int(n)):
             dendrite_state_ID = random.choice(dendrite_state_IDs)
-            synapse_state_ID = random.choice(synapse_state_IDs)
-            link = self.linkSynapseDendrite(synapse_state_ID, dendrite_state_ID)
-            linkages.append(link)
+            linkages.append((random.choice(synapse_state_IDs), dendrite_state_ID))
+        if self.logging:
+            for link in linkages: self._linkSynapseDendrite(*link)
+        else:
+            self.cur.executemany("INSERT OR IGNORE INTO synapse_dendrite_link (synapse_state_ID, dendrite_state_ID) VALUES (?, ?)", linkages)
+        self._commit()
         return linkages
 
     def randomState(self, statetype, state_ID, variation=0.01):
@@ -422,16 +1112,49 @@ class brainopy(object):
         variation = float(variation)
         lower_limit = 1000000 - (1000000 * variation)
         upper_limit = 1000000 + (1000000 * variation)
-        self.cur.execute("SELECT neurotransmitter, value FROM %s WHERE ID = '%s'" % (statetype, state_ID))
-        stateList = [[x[0], x[1]] for x in self.cur.fetchall()]
+        statetype = self._checkName(statetype, self.statetypes)
+        stateList = self._readState(statetype, state_ID)
+        updates = []
         for state in stateList:
             multiplier = random.randint(lower_limit, upper_limit) / 1000000
             neurotransmitter = state[0]
             value = float(state[1])
-            value = str(value * multiplier)
-            self.cur.execute("UPDATE %s SET value = '%s' WHERE ID = '%s' AND neurotransmitter = '%s'" % (statetype, value, state_ID, neurotransmitter))
+            value = value * multiplier
+            updates.append((value, state_ID, neurotransmitter))
             if self.logging: self.logger("randomState", "update_state/state_type=" + str(statetype) + "/state_ID=" + str(state_ID) + "/neurotransmitter=" + str(neurotransmitter) + "/value=" + str(value))
+        self._writeStates(statetype, updates)
+
+    def randomizeStates(self, statetype, IDs="all", variation=0.01, seed=None):
+        """!
+        Method to perform random variation to the neurotransmitter values of many states in bulk, which is equivalent to randomState() method for each state; where the multipliers are drawn as an array and the states are updated in one executemany. If the in-memory engine is active, the states in the engine are varied. This can be used to initialize the states of a large brain.
 
+        @param statetype String: Type of state
+        @param IDs List: List of state IDs, or "all" for all states of statetype. Default = "all".
+        @param variation Float: Variation limit. Default = 0.01 (1% variation)
+        @param seed Integer: Seed for random variations. Default = None.
+        @return: Number of neurotransmitter values varied
+        """
+        statetype = self._checkName(statetype, self.statetypes)
+        if self.engine != None:
+            count = self.engine.randomizeStates(statetype, IDs, variation, seed)
+        else:
+            import numpy as np
+            states = self._readStates(statetype, IDs)
+            variation = float(variation)
+            lower_limit = int(1000000 - (1000000 * variation))
+            upper_limit = int(1000000 + (1000000 * variation))
+            multipliers = np.random.default_rng(seed).integers(lower_limit, upper_limit + 1, size=len(states)) / 1000000
+            values = np.array([float(state[2]) for state in states], dtype=float) * multipliers
+            self._writeStates(statetype, [(float(values[i]), states[i][0], states[i][1]) for i in range(len(states))])
+            self._commit()
+            count = len(states)
+            changed = set([state[0] for state in states])
+            if statetype == "synapse_state": self._dirtySynapses.update(changed)
+            if statetype == "neuron_state": self._dirtyNeuronStates.update(changed)
+        if self.logging: self.logger("randomizeStates", "state_type=" + str(statetype) + "/variation=" + str(variation) + "/values=" + str(count))
+        return count
+
+    @profiled
     def tfSynapseDendrite(self, neuron_ID):
         """!
         Default Synapse to Dendrite Transfer Function (SDTF), which should be overridden based on specific usage. SDTF is based on individual neuron, represented by neuron_ID. This default SDTF averages the synapse state(s) into dendrite state.
@@ -439,7 +1162,7 @@ class brainopy(object):
         @param neuron_ID String: ID of neuron
         """
         neurotransmitters = self.getNeurotransmitters()
-        self.cur.execute("SELECT DISTINCT s.dendrite_state_ID, s.synapse_state_ID FROM synapse_dendrite s WHERE s.neuron_ID = '%s'" % neuron_ID)
+        self.cur.execute(self._adjacencyQuery("synapse_dendrite", "SELECT DISTINCT s.dendrite_state_ID, s.synapse_state_ID FROM synapse_dendrite s WHERE s.neuron_ID = ?"), (neuron_ID,))
         synapse_dendrite_List = [(x[0], x[1]) for x in self.cur.fetchall()]
         if self.logging: self.logger("tfSynapseDendrite", "1/get_links")
         dendriteList = list(set([x[0] for x in synapse_dendrite_List]))
@@ -451,34 +1174,34 @@ class brainopy(object):
             synapseList = list(set([x[1] for x in synapse_dendrite_List if x[0] == dendrite]))
             for synapse in synapseList:
                 if self.logging: self.logger("tfSynapseDendrite", "3/process_dendritic_synapse/dendrite_state_ID=" + str(dendrite) + "/synapse_state_ID=" + str(synapse))
-                self.cur.execute("SELECT neurotransmitter, value FROM synapse_state WHERE ID = '%s'" % synapse)
-                for state in [(x[0], x[1]) for x in self.cur.fetchall()]:
+                for state in self._readState("synapse_state", synapse):
                     dendrite_neuro[state[0]] = dendrite_neuro[state[0]] + [float(state[1])]
             for n in neurotransmitters:
-                dendrite_neuro[n] = str(sum(dendrite_neuro[n]) / len(dendrite_neuro[n]))
-                self.cur.execute("UPDATE dendrite_state SET value = '%s' WHERE ID = '%s' AND neurotransmitter = '%s'" % (dendrite_neuro[n], dendrite, n))
+                dendrite_neuro[n] = sum(dendrite_neuro[n]) / len(dendrite_neuro[n])
                 if self.logging: self.logger("tfSynapseDendrite", "4/update_dendrite_state/dendrite_state_ID=" + str(dendrite) + "/neurotransmitter=" + str(n) + "/value=" + str(dendrite_neuro[n]))
-        self.con.commit()
+            self._writeStates("dendrite_state", [(dendrite_neuro[n], dendrite, n) for n in neurotransmitters])
 
+    @profiled
     def mfDendrite(self, neuron_ID):
         """!
         Default Dendrite Modulating Function (DMF), which should be overridden based on specific usage. DMF is based on individual neuron, represented by neuron_ID. This default DMF randomly varies each neurotransmitter in the neuron state by +/- proportion (determined by self.neurotransmitter_dendrite_variation) of its original value.
 
         @param neuron_ID String: ID of neuron
         """
-        self.cur.execute("SELECT DISTINCT dendrite_state_ID FROM neuron WHERE neuron_ID = '%s'" % neuron_ID)
+        self.cur.execute(self._adjacencyQuery("neuron", "SELECT DISTINCT dendrite_state_ID FROM neuron WHERE neuron_ID = ?"), (neuron_ID,))
         dendrite_state_IDs = [x[0] for x in self.cur.fetchall()]
         if self.logging: self.logger("mfDendrite", "get_link")
         for dendrite_state_ID in dendrite_state_IDs:
             self.randomState("dendrite_state", dendrite_state_ID, self.neurotransmitter_dendrite_variation)
 
+    @profiled
     def tfDendriteNeuron(self, neuron_ID):
         """!
         Default Dendrite to Neuron Transfer Function (DNTF), which should be overridden based on specific usage. DNTF is based on individual neuron, represented by neuron_ID. This default DNTF averages the dendrite state(s) into neuron state.
         @param neuron_ID String: ID of neuron
         """
         neurotransmitters = self.getNeurotransmitters()
-        self.cur.execute("SELECT DISTINCT dendrite_state_ID, neuron_state_ID FROM neuron WHERE neuron_ID = '%s'" % neuron_ID)
+        self.cur.execute(self._adjacencyQuery("neuron", "SELECT DISTINCT dendrite_state_ID, neuron_state_ID FROM neuron WHERE neuron_ID = ?"), (neuron_ID,))
         dendrite_neuron_List = [(x[0], x[1]) for x in self.cur.fetchall()]
         if self.logging: self.logger("tfDendriteNeuron", "1/get_links")
         neuronList = list(set([x[1] for x in dendrite_neuron_List]))
@@ -490,26 +1213,26 @@ class brainopy(object):
             dendriteList = list(set([x[0] for x in dendrite_neuron_List if x[1] == neuron]))
             for dendrite in dendriteList:
                 if self.logging: self.logger("tfDendriteNeuron", "3/process_dendrite/neuron_state_ID=" + str(neuron) + "/dendrite_state_ID=" + str(dendrite))
-                self.cur.execute("SELECT neurotransmitter, value FROM dendrite_state WHERE ID = '%s'" % dendrite)
-                for state in [(x[0], x[1]) for x in self.cur.fetchall()]:
+                for state in self._readState("dendrite_state", dendrite):
                     neuron_neuro[state[0]] = neuron_neuro[state[0]] + [float(state[1])]
             for n in neurotransmitters:
-                neuron_neuro[n] = str(sum(neuron_neuro[n]) / len(neuron_neuro[n]))
-                self.cur.execute("UPDATE neuron_state SET value = '%s' WHERE ID = '%s' AND neurotransmitter = '%s'" % (neuron_neuro[n], neuron, n))
+                neuron_neuro[n] = sum(neuron_neuro[n]) / len(neuron_neuro[n])
                 if self.logging: self.logger("tfDendriteNeuron", "4/update_neuron_state/dendrite_state_ID=" + str(neuron) + "/neurotransmitter=" + str(n) + "/value=" + str(neuron_neuro[n]))
-        self.con.commit()
+            self._writeStates("neuron_state", [(neuron_neuro[n], neuron, n) for n in neurotransmitters])
 
+    @profiled
     def mfNeuron(self, neuron_ID):
         """!
         Default Neuron Modulating Function (NMF), which should be overridden based on specific usage. DMF is based on individual neuron, represented by neuron_ID. This default NMF randomly varies each neurotransmitter in the neuron state by +/- proportion (determined by self.neurotransmitter_neuron_variation) of its original value.
 
         @param neuron_ID String: ID of neuron
         """
-        self.cur.execute("SELECT DISTINCT neuron_state_ID FROM neuron WHERE neuron_ID = '%s'" % neuron_ID)
+        self.cur.execute(self._adjacencyQuery("neuron", "SELECT DISTINCT neuron_state_ID FROM neuron WHERE neuron_ID = ?"), (neuron_ID,))
         neuron_state_ID = self.cur.fetchone()[0]
         if self.logging: self.logger("mfNeuron", "get_link")
         self.randomState("neuron_state", neuron_state_ID, self.neurotransmitter_neuron_variation)
 
+    @profiled
     def tfNeuronAxon(self, neuron_ID):
         """!
         Default Neuron to Axon Transfer Function (NATF), which should be overridden based on specific usage. NATF is based on individual neuron, represented by neuron_ID. This default NATF equates axon state to neuron state.
@@ -517,7 +1240,7 @@ class brainopy(object):
         @param neuron_ID String: ID of neuron
         """
         neurotransmitters = self.getNeurotransmitters()
-        self.cur.execute("SELECT DISTINCT neuron_state_ID, axon_state_ID FROM neuron_body where ID = '%s'" % neuron_ID)
+        self.cur.execute("SELECT DISTINCT neuron_state_ID, axon_state_ID FROM neuron_body where ID = ?", (neuron_ID,))
         neuron_axon = [(x[0], x[1]) for x in self.cur.fetchall()]
         if self.logging: self.logger("tfNeuronAxon", "1/get_link")
         if len(neuron_axon) > 1:
@@ -526,25 +1249,25 @@ class brainopy(object):
         else:
             neuron_state_ID = neuron_axon[0][0]
             axon_state_ID = neuron_axon[0][1]
-        self.cur.execute("SELECT neurotransmitter, value FROM neuron_state WHERE ID = '%s'" % neuron_state_ID)
-        stateList = [(x[0], x[1]) for x in self.cur.fetchall()]
+        stateList = self._readState("neuron_state", neuron_state_ID)
         if self.logging: self.logger("tfNeuronAxon", "2/process_axon/neuron_state_ID=" + str(neuron_state_ID) + "/axon_state_ID=" + str(axon_state_ID))
         for state in stateList:
-            self.cur.execute("UPDATE axon_state SET value = '%s' WHERE ID = '%s' AND neurotransmitter = '%s'" % (state[1], axon_state_ID, state[0]))
             if self.logging: self.logger("tfNeuronAxon", "3/update_axon_state/axon_state_ID=" + str(axon_state_ID) + "/neurotransmitter=" + str(state[0]) + "/value=" + str(state[1]))
-        self.con.commit()
+        self._writeStates("axon_state", [(state[1], axon_state_ID, state[0]) for state in stateList])
 
+    @profiled
     def mfAxon(self, neuron_ID):
         """!
         Default Axon Modulating Function (AMF), which should be overridden based on specific usage. AMF is based on individual neuron, represented by neuron_ID. This default AMF randomly varies each neurotransmitter in the neuron state by +/- proportion (determined by self.neurotransmitter_axon_variation) of its original value.
 
         @param neuron_ID String: ID of neuron
         """
-        self.cur.execute("SELECT DISTINCT axon_state_ID FROM neuron WHERE neuron_ID = '%s'" % neuron_ID)
+        self.cur.execute(self._adjacencyQuery("neuron", "SELECT DISTINCT axon_state_ID FROM neuron WHERE neuron_ID = ?"), (neuron_ID,))
         axon_state_ID = self.cur.fetchone()[0]
         if self.logging: self.logger("mfAxon", "get_link")
         self.randomState("axon_state", axon_state_ID, self.neurotransmitter_axon_variation)
 
+    @profiled
     def tfAxonSynapse(self, neuron_ID):
         """!
         Default Axon to Synapse Transfer Function (ASTF), which should be overridden based on specific usage. ASTF is based on individual neuron, represented by neuron_ID. This default ASTF equates synapse state(s) to axon state.
@@ -552,22 +1275,20 @@ class brainopy(object):
         @param neuron_ID String: ID of neuron
         """
         neurotransmitters = self.getNeurotransmitters()
-        self.cur.execute("SELECT DISTINCT a.axon_state_ID, a.synapse_state_ID FROM axon_synapse a WHERE a.neuron_ID = '%s'" % neuron_ID)
+        self.cur.execute(self._adjacencyQuery("axon_synapse", "SELECT DISTINCT a.axon_state_ID, a.synapse_state_ID FROM axon_synapse a WHERE a.neuron_ID = ?"), (neuron_ID,))
         axon_synapse_List = [(x[0], x[1]) for x in self.cur.fetchall()]
         if self.logging: self.logger("tfAxonSynapse", "1/get_links")
         if len(axon_synapse_List) > 0:
             axon_state_ID = axon_synapse_List[0][0]
-            try: self.cur.execute("SELECT neurotransmitter, value FROM axon_state WHERE ID = '%s'" % axon_state_ID)
-            except TypeError: print(axon_state_ID)
-            stateList = [(x[0], x[1]) for x in self.cur.fetchall()]
+            stateList = self._readState("axon_state", axon_state_ID)
             if self.logging: self.logger("tfAxonSynapse", "2/get_axon_state/neuron_state_ID=" + str(neuron_ID) + "/axon_state_ID=" + str(axon_state_ID))
             synapseList = list(set([x[1] for x in axon_synapse_List]))
             for synapse_state_ID in synapseList:
                 for state in stateList:
-                    self.cur.execute("UPDATE synapse_state SET value = '%s' WHERE ID = '%s' AND neurotransmitter = '%s'" % (state[1], synapse_state_ID, state[0]))
                     if self.logging: self.logger("tfAxonSynapse", "3/update_synapse_state/synapse_state_ID=" + str(synapse_state_ID) + "/neurotransmitter=" + str(state[0]) + "/value=" + str(state[1]))
-            self.con.commit()
+            self._writeStates("synapse_state", [(state[1], synapse_state_ID, state[0]) for synapse_state_ID in synapseList for state in stateList])
 
+    @profiled
     def mfSynapse(self, synapse_state_ID):
         """!
         Default Synapse Modulating Function (SMF), which should be overridden based on specific usage. SMF is based on individual synapse, represented by synapse_state_IDs. This default SMF randomly varies each neurotransmitter in the synapse state by +/- proportion (determined by self.neurotransmitter_synapse_variation) of its original value.
@@ -577,6 +1298,7 @@ class brainopy(object):
         if self.logging: self.logger("mfSynapse", "get_link")
         self.randomState("synapse_state", synapse_state_ID, self.neurotransmitter_synapse_variation)
     
+    @profiled
     def tfSynapseAxon(self, neuron_ID):
         """!
         Default Synapse to Axon Transfer Function (SATF), which should be overridden based on specific usage. SATF is based on individual neuron, represented by neuron_ID. SATF can be used to represent synaptic reuptake of neurotransmitters. This default SATF does nothing.
@@ -585,6 +1307,7 @@ class brainopy(object):
         """
         neurotransmitters = self.getNeurotransmitters()
 
+    @profiled
     def neuronFunction(self, neuron_ID):
         """!
         Wrapper method to execute the standard processes / functions of an individual neuron, represented by neuron_ID. The order of operation is (1) synapse to dendrite transfer function (SDTF), (2) dendrite modulator (DMF), (3) dendrite to neuron transfer function (DNTF), (4) neuron modulator (NMF), (5) neuron to axon transfer function (NATF), (6) axon modulator (AMF), and (7) axon to synapse transfer function (ASTF).
@@ -599,36 +1322,42 @@ class brainopy(object):
         self.mfAxon(neuron_ID)
         self.tfAxonSynapse(neuron_ID)
         
+    @profiled
     def mtNeuronGrowth(self):
         """!
         Default Neuronal Growth Function (NGF), which should be overridden based on specific usage.
         """
         pass
 
+    @profiled
     def mtSynapseGrowth(self):
         """!
         Default Synaptic Growth Function (SGF), which should be overridden based on specific usage.
         """
         pass
 
+    @profiled
     def mtNeuronPrune(self):
         """!
         Default Neuronal Prune Function (NPF), which should be overridden based on specific usage.
         """
         pass
 
+    @profiled
     def mtSynapsePrune(self):
         """!
         Default Synaptic Prune Function (SGF), which should be overridden based on specific usage.
         """
         pass
 
+    @profiled
     def mtGlobal(self):
         """!
         Default Global Maintenance Function (GMF), which should be overridden based on specific usage.
         """
         pass
 
+    @profiled
     def maintenanceFunction(self):
         """!
         Wrapper method to execute the standard processes / functions for brain maintenance. The order of operation is (1) neuronal growth function (NGF), (2) neuronal prune function (NPF), (3) synaptic growth function (SGF), (4) synaptic prune function (SPF), and (5) global maintenance function (GMF).
@@ -639,7 +1368,396 @@ class brainopy(object):
         self.mtSynapsePrune()
         self.mtGlobal()
 
-    def runBrain(self, neuronList=[], synapseList=[]):
+    def startEngine(self, seed=None, workers=1):
+        """!
+        Method to start the in-memory engine (arrayEngine), which loads the topology and all states into arrays. While the engine is active, runBrain() and inputSignal() methods will work on the arrays instead of the brain database, and the states will only be written into the brain database by saveEngine() or stopEngine() methods. The engine only implements the default transfer and modulating functions; hence, it cannot be used if any of these functions is overridden.
+
+        @param seed Integer: Seed for random variations in modulating functions. Default = None.
+        @param workers Integer: Number of worker processes to execute each cycle; where the neurons are partitioned across worker processes (see arrayEngine class). Default = 1 (no worker process).
+        @return: arrayEngine object
+        """
+        for function in ["tfSynapseDendrite", "mfDendrite", "tfDendriteNeuron", "mfNeuron", "tfNeuronAxon", "mfAxon", "tfAxonSynapse", "mfSynapse", "tfSynapseAxon", "neuronFunction"]:
+            if getattr(type(self), function) is not getattr(brainopy, function):
+                raise NotImplementedError("In-memory engine cannot be used with overridden " + function)
+        self.engine = arrayEngine(self, seed, workers)
+        if self.logging: self.logger("startEngine", "startEngine/workers=" + str(workers))
+        return self.engine
+
+    def saveEngine(self):
+        """!
+        Method to write the changed states in the in-memory engine into the brain database in one transaction.
+
+        @return: Number of neurotransmitter values written
+        """
+        return self.engine.save()
+
+    def stopEngine(self, save=True):
+        """!
+        Method to stop the in-memory engine.
+
+        @param save Boolean: Flag to write the changed states into the brain database. Default = True.
+        """
+        if save: self.engine.save()
+        self._dirtySynapses = set([self.engine.IDs["synapse_state"][i] for i in self.engine.dirty["synapse_state"].nonzero()[0]])
+        self._dirtyNeuronStates = set([self.engine.IDs["neuron_state"][i] for i in self.engine.dirty["neuron_state"].nonzero()[0]])
+        self.engine.close()
+        self.engine = None
+        if self.logging: self.logger("stopEngine", "stopEngine")
+
+    _snapshotTables = {"neurotransmitter": ["neurotransmitter", "description"],
+                       "ID_table": ["ID", "table_name"],
+                       "name_ID": ["ID", "name", "description"],
+                       "ID_alias": ["alias", "ID"],
+                       "neuron_body": ["ID", "neuron_state_ID", "axon_state_ID"],
+                       "neuron_dendrite": ["ID", "dendrite_state_ID"],
+                       "axon_synapse_link": ["axon_state_ID", "synapse_state_ID"],
+                       "synapse_dendrite_link": ["synapse_state_ID", "dendrite_state_ID"]}
+
+    def snapshot(self, path):
+        """!
+        Method to write the topology and all states of the brain into a compressed NumPy (.npz) file, which can be restored using restore() method. If the in-memory engine is active, the states in the engine are written.
+
+        The file consists of the following arrays - (1) <table>/<column> for each column of neurotransmitter, ID_table, name_ID, ID_alias, neuron_body, neuron_dendrite, axon_synapse_link and synapse_dendrite_link tables (and <table>/<column>/null for columns with NULL values), (2) state/<state type>/ID, state/<state type>/value and state/<state type>/present (whether the neurotransmitter is present in the state) for each state type, where the columns of values follow neurotransmitter/neurotransmitter, and (3) ID_counter.
+
+        @param path String: Path of snapshot file
+        @return: Number of neurotransmitter values written
+        """
+        import numpy as np
+        arrays = {}
+        for table in self._snapshotTables:
+            columns = self._snapshotTables[table]
+            self.cur.execute("SELECT %s FROM %s ORDER BY rowid" % (", ".join(columns), table))
+            rows = self.cur.fetchall()
+            for i in range(len(columns)):
+                arrays[table + "/" + columns[i]] = np.array(["" if row[i] == None else str(row[i]) for row in rows], dtype=str)
+                if len([row for row in rows if row[i] == None]) > 0:
+                    arrays[table + "/" + columns[i] + "/null"] = np.array([row[i] == None for row in rows], dtype=bool)
+        neurotransmitters = list(arrays["neurotransmitter/neurotransmitter"])
+        count = 0
+        for statetype in self.statetypes:
+            if self.engine != None:
+                IDs = self.engine.IDs[statetype]
+                values = self.engine.values[statetype][:, [self.engine.neurotransmitters.index(n) for n in neurotransmitters]]
+                present = self.engine.present[statetype][:, [self.engine.neurotransmitters.index(n) for n in neurotransmitters]]
+            else:
+                IDs = self.getIDs(statetype)
+                index = dict([(IDs[i], i) for i in range(len(IDs))])
+                column = dict([(neurotransmitters[i], i) for i in range(len(neurotransmitters))])
+                values = np.zeros((len(IDs), len(neurotransmitters)))
+                present = np.zeros(values.shape, dtype=bool)
+                states = self._readStates(statetype)
+                rows = np.array([index.get(x[0], -1) for x in states], dtype=np.int64)
+                cols = np.array([column.get(x[1], -1) for x in states], dtype=np.int64)
+                found = (rows >= 0) & (cols >= 0)
+                values[rows[found], cols[found]] = np.array([x[2] for x in states], dtype=float)[found]
+                present[rows[found], cols[found]] = True
+            arrays["state/" + statetype + "/ID"] = np.array(IDs, dtype=str)
+            arrays["state/" + statetype + "/value"] = values
+            arrays["state/" + statetype + "/present"] = present
+            count = count + int(present.sum())
+        self.cur.execute("SELECT value FROM ID_counter WHERE name = 'ID'")
+        arrays["ID_counter"] = np.array([self.cur.fetchone()[0]], dtype=np.int64)
+        np.savez_compressed(path, **arrays)
+        if self.logging: self.logger("snapshot", "path=" + str(path) + "/values=" + str(count))
+        return count
+
+    def restore(self, path, target="database"):
+        """!
+        Method to restore a brain from a snapshot file written by snapshot() method. 
+        
+        If target is "database", the topology, name labels, neurotransmitters and states in the brain database are replaced by those in the snapshot in one transaction, using the bulk loading path (see beginBulkLoad() method); the in-memory engine must not be active. If target is "engine", only the states in the active in-memory engine are replaced, without writing into the brain database (until saveEngine() or stopEngine() methods); the snapshot must be taken from a brain with the same states (IDs), such as a checkpoint of the same brain.
+
+        @param path String: Path of snapshot file
+        @param target String: Where to restore the snapshot into. Allowable values are "database" and "engine". Default = "database".
+        @return: Number of neurotransmitter values restored
+        """
+        import numpy as np
+        with np.load(path) as data:
+            arrays = dict([(key, data[key]) for key in data.files])
+        if target == "engine":
+            if self.engine == None:
+                raise RuntimeError("Start the in-memory engine before restoring into the engine")
+            count = self.engine.restore(arrays)
+            if self.logging: self.logger("restore", "path=" + str(path) + "/target=engine/values=" + str(count))
+            return count
+        if target != "database":
+            raise ValueError("Unknown restore target: " + str(target))
+        if self.engine != None:
+            raise RuntimeError("Stop the in-memory engine before restoring into the brain database")
+        self._dropIndexes()
+        self._dropAdjacencyTriggers()
+        for table in self._snapshotTables:
+            self.cur.execute("DELETE FROM %s" % table)
+            columns = self._snapshotTables[table]
+            if table + "/" + columns[0] not in arrays: continue
+            data = []
+            for column in columns:
+                values = arrays[table + "/" + column].tolist()
+                if table + "/" + column + "/null" in arrays:
+                    values = [None if null else value for (value, null) in zip(values, arrays[table + "/" + column + "/null"].tolist())]
+                data.append(values)
+            rows = zip(*data)
+            self.cur.executemany("INSERT INTO %s (%s) VALUES (%s)" % (table, ", ".join(columns), ", ".join(["?"] * len(columns))), rows)
+        for statetype in self.statetypes:
+            self.cur.execute("DROP VIEW IF EXISTS name_%s" % statetype)
+            self.cur.execute("DROP TABLE %s" % statetype)
+        self._columns = {}
+        self._createStateTables(self.layout)
+        self._createStateViews()
+        neurotransmitters = arrays["neurotransmitter/neurotransmitter"].tolist()
+        count = 0
+        for statetype in self.statetypes:
+            IDs = arrays["state/" + statetype + "/ID"].tolist()
+            values = arrays["state/" + statetype + "/value"].tolist()
+            present = arrays["state/" + statetype + "/present"]
+            if self.layout == "long":
+                (rows, cols) = np.nonzero(present)
+                self.cur.executemany("INSERT INTO %s (ID, neurotransmitter, value) VALUES (?, ?, ?)" % statetype, [(IDs[r], neurotransmitters[c], values[r][c]) for (r, c) in zip(rows.tolist(), cols.tolist())])
+            else:
+                columns = [neurotransmitters.index(n) for n in self._stateColumns(statetype)]
+                self.cur.executemany("INSERT INTO %s VALUES (%s)" % (statetype, ", ".join(["?"] * (len(columns) + 1))), [tuple([IDs[r]] + [values[r][c] if present[r, c] else None for c in columns]) for r in range(len(IDs))])
+            count = count + int(present.sum())
+        self.cur.execute("UPDATE ID_counter SET value = MAX(value, ?) WHERE name = 'ID'", (int(arrays["ID_counter"][0]),))
+        self._IDblock = [0, 0]
+        self._rebuildAdjacency()
+        self._createIndexes()
+        self.clearCache()
+        self.con.commit()
+        if self.logging: self.logger("restore", "path=" + str(path) + "/target=database/values=" + str(count))
+        return count
+
+    _edgeColumns = ["source", "synapse", "target", "dendrite"]
+
+    _stateFileColumns = ["statetype", "label", "neurotransmitter", "value"]
+
+    @staticmethod
+    def _readTable(path, columns):
+        """!
+        Internal method to read a table (CSV or Parquet file) of topology or states (see importTopology() method). Parquet files (with .parquet or .pq extension) are read using pandas. Empty values are read as None.
+
+        @param path String: Path of CSV or Parquet file
+        @param columns List: Names of columns to read
+        @return: List of rows (tuples of values in the order of columns)
+        """
+        if str(path).lower().endswith((".parquet", ".pq")):
+            import pandas as pd
+            table = pd.read_parquet(path, columns=columns)
+            table = table.astype(object).where(table.notna(), None)
+            rows = list(table.itertuples(index=False, name=None))
+        else:
+            with open(path, "r", newline="") as f:
+                rows = [tuple([row[column] for column in columns]) for row in csv.DictReader(f)]
+        return [tuple([None if value == None or str(value) == "" else value for value in row]) for row in rows]
+
+    @staticmethod
+    def _writeTable(path, columns, rows):
+        """!
+        Internal method to write a table (CSV or Parquet file) of topology or states (see exportTopology() method). Parquet files (with .parquet or .pq extension) are written using pandas.
+
+        @param path String: Path of CSV or Parquet file
+        @param columns List: Names of columns
+        @param rows List: List of rows (tuples of values in the order of columns)
+        """
+        if str(path).lower().endswith((".parquet", ".pq")):
+            import pandas as pd
+            pd.DataFrame(rows, columns=columns).to_parquet(path, index=False)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+
+    def exportTopology(self, edgefile, statefile=None):
+        """!
+        Method to write the topology of the brain as an edge list, and the states (optional), into CSV or Parquet files (by the extension of file name, .parquet or .pq for Parquet), which can be imported using importTopology() method. Neurons are labelled by their neuron IDs, synapses by their synapse state IDs, and dendrites by their dendrite state IDs.
+
+        The edge list has 4 columns - source (neuron linked to the synapse by its axon), synapse, target (neuron linked to the synapse by its dendrite), and dendrite (dendrite of target neuron linked to the synapse); where each row represents source --axon--> synapse >--dendrite-- target. Missing links are empty; for example, a synapse linked to an axon but not to any dendrite has empty target and dendrite. Dendrites not linked to any synapse are written as rows with only target and dendrite, and neurons without any dendrite are written as rows with only source.
+
+        The state file has 4 columns - statetype (axon_state, dendrite_state, neuron_state, or synapse_state), label (neuron label for axon and neuron states, dendrite label for dendrite states, and synapse label for synapse states), neurotransmitter, and value.
+
+        @param edgefile String: Path of edge list file to write
+        @param statefile String: Path of state file to write. Default = None (states are not written).
+        @return: (number of edges written, number of states written)
+        """
+        self.cur.execute("SELECT asl.synapse_state_ID, nb.ID FROM axon_synapse_link asl INNER JOIN neuron_body nb ON asl.axon_state_ID = nb.axon_state_ID ORDER BY asl.rowid, nb.rowid")
+        sources = {}
+        for (synapse_state_ID, neuron_ID) in self.cur.fetchall():
+            sources.setdefault(synapse_state_ID, []).append(neuron_ID)
+        self.cur.execute("SELECT sdl.synapse_state_ID, nd.ID, nd.dendrite_state_ID FROM synapse_dendrite_link sdl INNER JOIN neuron_dendrite nd ON sdl.dendrite_state_ID = nd.dendrite_state_ID ORDER BY sdl.rowid, nd.rowid")
+        targets = {}
+        linked = set()
+        for (synapse_state_ID, neuron_ID, dendrite_state_ID) in self.cur.fetchall():
+            targets.setdefault(synapse_state_ID, []).append((neuron_ID, dendrite_state_ID))
+            linked.add(dendrite_state_ID)
+        edges = []
+        for synapse_state_ID in self.getIDs("synapse_state"):
+            for source in sources.get(synapse_state_ID, [None]):
+                for (target, dendrite) in targets.get(synapse_state_ID, [(None, None)]):
+                    edges.append((source, synapse_state_ID, target, dendrite))
+        self.cur.execute("SELECT ID, dendrite_state_ID FROM neuron_dendrite ORDER BY rowid")
+        dendrites = self.cur.fetchall()
+        edges = edges + [(None, None, neuron_ID, dendrite_state_ID) for (neuron_ID, dendrite_state_ID) in dendrites if dendrite_state_ID not in linked]
+        withDendrite = set([x[0] for x in dendrites])
+        edges = edges + [(neuron_ID, None, None, None) for neuron_ID in self.getIDs("neuron_body") if neuron_ID not in withDendrite]
+        self._writeTable(edgefile, self._edgeColumns, edges)
+        states = []
+        if statefile != None:
+            self.cur.execute("SELECT ID, neuron_state_ID, axon_state_ID FROM neuron_body ORDER BY rowid")
+            labels = {"neuron_state": {}, "axon_state": {}}
+            for (neuron_ID, neuron_state_ID, axon_state_ID) in self.cur.fetchall():
+                labels["neuron_state"][neuron_state_ID] = neuron_ID
+                labels["axon_state"][axon_state_ID] = neuron_ID
+            for statetype in self.statetypes:
+                for (state_ID, neurotransmitter, value) in self._readStates(statetype):
+                    if statetype in labels:
+                        if state_ID not in labels[statetype]: continue
+                        state_ID = labels[statetype][state_ID]
+                    states.append((statetype, state_ID, neurotransmitter, value))
+            self._writeTable(statefile, self._stateFileColumns, states)
+        if self.logging: self.logger("exportTopology", "edgefile=" + str(edgefile) + "/statefile=" + str(statefile) + "/edges=" + str(len(edges)) + "/states=" + str(len(states)))
+        return (len(edges), len(states))
+
+    def importTopology(self, edgefile, statefile=None, names=True):
+        """!
+        Method to add neurons, dendrites and synapses, and to link them, from an edge list file (and to set their states from a state file), which are CSV or Parquet files (by the extension of file name, .parquet or .pq for Parquet) in the format written by exportTopology() method. The labels in the files are not used as IDs; new IDs are given to the added neurons, dendrites and synapses. The brain is constructed as a bulk load (see beginBulkLoad() method), unless a bulk load is already in progress.
+
+        Each neuron (by label, in source or target columns) is added with one dendrite, one neuron state and one axon state. The first dendrite label of a neuron is given to the dendrite added with the neuron, and a dendrite is added for each further dendrite label of the neuron; where an empty dendrite refers to the first dendrite of the target neuron. Dendrite labels must be unique across neurons. Each synapse label is added as a synapse. Neurotransmitters in the state file, which are not registered, are registered before the neurons and synapses are added.
+
+As each axon and each dendrite is linked to at most one synapse, and each synapse is linked to at most one axon and one dendrite (by the unique indexes on axon_synapse_link and synapse_dendrite_link tables), ValueError is raised before adding anything if any edge cannot be linked under these constraints, such as a neuron with more than one outgoing synapse.
+
+        @param edgefile String: Path of edge list file
+        @param statefile String: Path of state file. Default = None (states are not set).
+        @param names Boolean: Flag to label the added neurons with their labels in the edge list file (see nameID() method). Default = True.
+        @return: Dictionary of {"neuron": {<label>: <neuron_ID>}, "dendrite": {<label>: <dendrite_state_ID>}, "synapse": {<label>: <synapse_state_ID>}}
+        """
+        edges = [tuple([None if value == None else str(value) for value in edge]) for edge in self._readTable(edgefile, self._edgeColumns)]
+        states = []
+        if statefile != None:
+            states = self._readTable(statefile, self._stateFileColumns)
+            registered = self.getNeurotransmitters()
+            new = [neurotransmitter for neurotransmitter in dict.fromkeys([str(state[2]) for state in states]) if neurotransmitter not in registered]
+            if len(new) > 0: self.addNeurotransmitters(dict([(neurotransmitter, neurotransmitter) for neurotransmitter in new]))
+        neuronLabels = list(dict.fromkeys([label for edge in edges for label in (edge[0], edge[2]) if label != None]))
+        synapseLabels = list(dict.fromkeys([edge[1] for edge in edges if edge[1] != None]))
+        dendriteLabels = list(dict.fromkeys([(edge[2], edge[3]) for edge in edges if edge[2] != None and edge[3] != None]))
+        firstDendrite = {}
+        for (neuron, dendrite) in dendriteLabels: firstDendrite.setdefault(neuron, dendrite)
+        dropped = self._conflictingLinks(dict.fromkeys([(edge[0], edge[1]) for edge in edges if edge[0] != None and edge[1] != None])) + \
+                  self._conflictingLinks(dict.fromkeys([(edge[1], firstDendrite.get(edge[2], (edge[2],)) if edge[3] == None else edge[3]) for edge in edges if edge[1] != None and edge[2] != None]))
+        if dropped > 0:
+            raise ValueError(str(dropped) + " edge(s) in " + str(edgefile) + " link an axon, synapse or dendrite more than once, which cannot be imported")
+        bulk = self.bulk
+        if not bulk: self.beginBulkLoad()
+        neurons = dict(zip(neuronLabels, self.addNeuron(len(neuronLabels))))
+        dendrites = {}
+        first = dict([(label, neurons[label][1]) for label in neurons])
+        extra = []
+        for (neuron, dendrite) in dendriteLabels:
+            if neuron in first and first[neuron] != None:
+                dendrites[dendrite] = first[neuron]
+                first[neuron] = None
+            else:
+                extra.append((neuron, dendrite))
+        if len(extra) > 0:
+            IDs = self._addStates("dendrite_state", self._getUniqueIDs(len(extra)))
+            self.cur.executemany("INSERT INTO neuron_dendrite (ID, dendrite_state_ID) VALUES (?, ?)", [(neurons[extra[i][0]][0], IDs[i]) for i in range(len(extra))])
+            for i in range(len(extra)): dendrites[extra[i][1]] = IDs[i]
+        synapses = dict(zip(synapseLabels, self.addSynapse(len(synapseLabels))))
+        self.cur.executemany("INSERT OR IGNORE INTO axon_synapse_link (axon_state_ID, synapse_state_ID) VALUES (?, ?)",
+                             list(dict.fromkeys([(neurons[edge[0]][3], synapses[edge[1]]) for edge in edges if edge[0] != None and edge[1] != None])))
+        self.cur.executemany("INSERT OR IGNORE INTO synapse_dendrite_link (synapse_state_ID, dendrite_state_ID) VALUES (?, ?)",
+                             list(dict.fromkeys([(synapses[edge[1]], neurons[edge[2]][1] if edge[3] == None else dendrites[edge[3]]) for edge in edges if edge[1] != None and edge[2] != None])))
+        if names:
+            self.cur.executemany("INSERT INTO name_ID (ID, name, description) VALUES (?, ?, ?)", [(neurons[label][0], label, "importTopology") for label in neuronLabels])
+        if len(states) > 0:
+            IDs = {"neuron_state": dict([(label, neurons[label][2]) for label in neurons]),
+                   "axon_state": dict([(label, neurons[label][3]) for label in neurons]),
+                   "dendrite_state": dendrites,
+                   "synapse_state": synapses}
+            for statetype in self.statetypes:
+                self._writeStates(statetype, [(float(state[3]), IDs[statetype][str(state[1])], str(state[2])) for state in states if state[0] == statetype and str(state[1]) in IDs[statetype]])
+        if not bulk: self.endBulkLoad()
+        if self.logging: self.logger("importTopology", "edgefile=" + str(edgefile) + "/statefile=" + str(statefile) + "/neurons=" + str(len(neurons)) + "/synapses=" + str(len(synapses)) + "/edges=" + str(len(edges)))
+        return {"neuron": dict([(label, neurons[label][0]) for label in neurons]),
+                "dendrite": dendrites,
+                "synapse": synapses}
+
+    def _conflictingLinks(self, links):
+        """!
+        Internal method to count the links which cannot be registered under the unique indexes on link tables, where each side of a link is linked at most once.
+
+        @param links List: Distinct links as [(<label>, <label>)]
+        @return: Number of links which would be ignored
+        """
+        (left, right) = (set(), set())
+        count = 0
+        for (a, b) in links:
+            if a in left or b in right:
+                count = count + 1
+            else:
+                left.add(a)
+                right.add(b)
+        return count
+
+    def _selectIn(self, statement, values, size=500):
+        """!
+        Internal method to execute a SELECT statement with an IN (...) condition over a list of values, in chunks of values.
+
+        @param statement String: SELECT statement with one "IN (%s)" placeholder
+        @param values List: Values for the IN condition
+        @param size Integer: Number of values per chunk. Default = 500.
+        @return: List of rows
+        """
+        values = list(values)
+        rows = []
+        for i in range(0, len(values), size):
+            chunk = values[i:i+size]
+            self.cur.execute(statement % ", ".join(["?"] * len(chunk)), chunk)
+            rows = rows + self.cur.fetchall()
+        return rows
+
+    def _orderIDs(self, IDs):
+        """!
+        Internal method to order a set of IDs in the order of getIDs() method.
+
+        @param IDs Set: IDs
+        @return: List of IDs
+        """
+        return [x[1] for x in sorted(self._selectIn("SELECT rowid, ID FROM ID_table WHERE ID IN (%s)", IDs))]
+
+    def _activeNeurons(self, neuronList=[], synapseList=[], full=False):
+        """!
+        Internal method to get the neurons and synapses to process in a cycle of sparse scheduling (see runBrain() method), and the synapses to be marked as changed after the cycle.
+
+        @param neuronList List: List of neuron_IDs. Default = [] (all neurons)
+        @param synapseList List: List of synapse_state_IDs. Default = [] (all synapses)
+        @param full Boolean: Flag to process all neurons and synapses. Default = False.
+        @return: (neurons, synapses, changed synapses)
+        """
+        if full:
+            if len(neuronList) == 0: neuronList = self.getIDs("neuron_body")
+            if len(synapseList) == 0: synapseList = self.getIDs("synapse_state")
+            neurons = list(neuronList)
+        else:
+            active = set([x[0] for x in self._selectIn(self._adjacencyQuery("synapse_dendrite", "SELECT DISTINCT neuron_ID FROM synapse_dendrite WHERE synapse_state_ID IN (%s)"), self._dirtySynapses)])
+            active = active.union([x[0] for x in self._selectIn("SELECT ID FROM neuron_body WHERE neuron_state_ID IN (%s)", self._dirtyNeuronStates)])
+            if len(neuronList) > 0:
+                neurons = [neuron_ID for neuron_ID in neuronList if neuron_ID in active]
+            else:
+                neurons = self._orderIDs(active)
+        changed = []
+        for x in self._selectIn(self._adjacencyQuery("axon_synapse", "SELECT DISTINCT synapse_state_ID FROM axon_synapse WHERE neuron_ID IN (%s)"), neurons):
+            changed.append(x[0])
+        if not full:
+            active = self._dirtySynapses.union(changed)
+            if len(synapseList) > 0:
+                synapseList = [synapse_state_ID for synapse_state_ID in synapseList if synapse_state_ID in active]
+            else:
+                synapseList = self._orderIDs(active)
+        return (neurons, synapseList, changed)
+
+    @profiled
+    def runBrain(self, neuronList=[], synapseList=[], full=False):
         """!
         Wrapper method to execute / run the entire brain or part of the brain. If a list of neuron_IDs (represented by neuronList) and list of synapse IDs (represented by synapseList) are not given, the entire brain will be executed / ran. To execute / run part of the brain, neurons (represented by neuron_IDs in neuronList) and/or synapses (represented by synapse_state_IDs in synpaseList)for the part of the brain must be given as neuronList.
 
@@ -649,15 +1767,32 @@ class brainopy(object):
             3. Synapse to axon transfer function (SATF) executed for each neuron.
             Brain maintenance processes / functions [(1) neuronal growth function (NGF), (2) neuronal prune function (NPF), (3) synaptic growth function (SGF), (4) synaptic prune function (SPF), and (5) global maintenance function (GMF)] executed.
 
+        If self.scheduler is "sparse", only the neurons reachable from changed states are processed - neurons with a dendrite linked to a changed synapse state, or with a changed neuron state; where states are changed by inputSignal() method and by the axon to synapse transfer function (the synapses linked to the axons of processed neurons are marked as changed for the next cycle). Synapse modulator is executed for the changed synapses and the synapses linked to the axons of processed neurons. If self.scheduler is "full" (default), or full is True, all neurons and synapses (in neuronList and synapseList, if given) are processed. As changed states are only tracked under sparse scheduling, a full cycle (full = True) is needed to mark the changed states after switching from full to sparse scheduling.
+
+        If the in-memory engine is active (see startEngine() method), the cycle will be executed by the engine. In memory mode (see connectBrain() method), the brain database is backed up into the brain database file every self.backup_interval cycles.
+
         @param neuroList List: List of neuron_IDs. Default = []
         @param synapseList List: List of synapse_state_IDs. Default = []
+        @param full Boolean: Flag to process all neurons and synapses under sparse scheduling. Default = False.
         """
-        if len(neuronList) == 0: neuronList = self.getIDs("neuron_body")
-        if len(synapseList) == 0: synapseList = self.getIDs("synapse_state")
-        for neuron_ID in neuronList: self.neuronFunction(neuron_ID)
-        for synapse_state_ID in synapseList: self.mfSynapse(synapse_state_ID)
-        for neuron_ID in neuronList: self.tfSynapseAxon(neuron_ID)
-        self.maintenanceFunction()
+        if self.engine != None: 
+            self.engine.run(1, neuronList, synapseList, full)
+        else:
+            if self.scheduler == "sparse":
+                (neuronList, synapseList, changed) = self._activeNeurons(neuronList, synapseList, full)
+                self._dirtySynapses = set(changed)
+                self._dirtyNeuronStates = set()
+            else:
+                if len(neuronList) == 0: neuronList = self.getIDs("neuron_body")
+                if len(synapseList) == 0: synapseList = self.getIDs("synapse_state")
+            for neuron_ID in neuronList: self.neuronFunction(neuron_ID)
+            for synapse_state_ID in synapseList: self.mfSynapse(synapse_state_ID)
+            for neuron_ID in neuronList: self.tfSynapseAxon(neuron_ID)
+            self.maintenanceFunction()
+            self.con.commit()
+        self._cycles = self._cycles + 1
+        if self.mode == "memory" and self.backup_interval > 0 and self._cycles % self.backup_interval == 0:
+            self.backupBrain()
 
     def inputSignal(self, state_ID, signal_state, state_type="synapse_state_ID"):
         """!
@@ -667,16 +1802,508 @@ class brainopy(object):
         @param signal_state Dictionary: Dictionary of neurotransmitter values
         @param state_type: Type of ID for state_ID. Allowable values are synapse_state_ID and neuron_state_ID
         """
-        if state_type == "synapse_state_ID":
-            if self.logging: self.logger("inputSignal", "1/input_signal/synapse_state_ID=" + str(state_ID))
-            for neurotransmitter in signal_state:
-                value = float(signal_state[neurotransmitter])
-                self.cur.execute("UPDATE synapse_state SET value = '%s' WHERE ID = '%s' AND neurotransmitter = '%s'" % (value, state_ID, neurotransmitter))
-                if self.logging: self.logger("inputSignal", "2/update_synapse_state/synapse_state_ID=" + str(state_ID) + "/neurotransmitter=" + str(neurotransmitter) + "/value=" + str(value))
-        elif state_type == "neuron_state_ID":
-            if self.logging: self.logger("inputSignal", "1/input_signal/neuron_state_ID=" + str(state_ID))
-            for neurotransmitter in signal_state:
-                value = float(signal_state[neurotransmitter])
-                self.cur.execute("UPDATE neuron_state SET value = '%s' WHERE ID = '%s' AND neurotransmitter = '%s'" % (value, state_ID, neurotransmitter))
-                if self.logging: self.logger("inputSignal", "2/update_neuron_state/neuron_state_ID=" + str(state_ID) + "/neurotransmitter=" + str(neurotransmitter) + "/value=" + str(value))
-        self.con.commit()
+        if self.engine != None:
+            if self.logging: self.logger("inputSignal", "engine/" + str(state_type) + "=" + str(state_ID))
+            self.engine.writeState(state_type[:-3], state_ID, signal_state)
+            return
+        if state_type in ["synapse_state_ID", "neuron_state_ID"]:
+            statetype = state_type[:-3]
+            if self.logging: self.logger("inputSignal", "1/input_signal/" + state_type + "=" + str(state_ID))
+            if statetype == "synapse_state": self._dirtySynapses.add(state_ID)
+            else: self._dirtyNeuronStates.add(state_ID)
+            updates = [(float(signal_state[neurotransmitter]), state_ID, neurotransmitter) for neurotransmitter in signal_state]
+            if self.logging: 
+                for update in updates: self.logger("inputSignal", "2/update_" + statetype + "/" + state_type + "=" + str(state_ID) + "/neurotransmitter=" + str(update[2]) + "/value=" + str(update[0]))
+            self._writeStates(statetype, updates)
+
+class arrayEngine(object):
+    """!
+    Class to execute the brain (neural network) in memory. The topology (neuron bodies, dendrites, axon-synapse links and synapse-dendrite links) and all state tables are loaded once from the brain database into integer-indexed NumPy arrays. Each cycle is then executed as vectorized gather, average and scatter operations, and the changed states are written back to the brain database in one transaction. Hence, the brain database is only used for persistence.
+
+    The engine implements the default transfer functions (SDTF, DNTF, NATF, ASTF) and modulating functions (DMF, NMF, AMF, SMF). Unlike runBrain() method in brainopy class, where the neurons are processed one after another, each function is applied to all neurons at the same time; hence, the result of a cycle does not depend on the order of neurons.
+
+    With more than one worker, the states are held in shared memory and the neurons are partitioned (by neuron index) across worker processes. Each cycle is double-buffered: every worker reads the frozen states of cycle t and writes the states of its own neurons (dendrites, neuron states, axons, and synapses linked to its axons) into the buffer for cycle t+1, which becomes the state of the brain after all workers are done. Random variations are drawn by the main process in the same order as a single process engine; hence, the results do not depend on the number of workers.
+    """
+
+    statetypes = ["axon_state", "dendrite_state", "neuron_state", "synapse_state"]
+
+    def __init__(self, brain, seed=None, workers=1):
+        """!
+        Initialization method. Loads the topology and states from the brain.
+
+        @param brain Object: Connected brainopy object.
+        @param seed Integer: Seed for random variations in modulating functions. Default = None.
+        @param workers Integer: Number of worker processes. Default = 1 (no worker process).
+        """
+        import numpy as np
+        self.brain = brain
+        self.rng = np.random.default_rng(seed)
+        self.dirty = {}
+        self.workers = max(1, int(workers))
+        self.pool = None
+        self.shared = []
+        self.load()
+
+    def load(self):
+        """!
+        Method to load the topology and all state tables from the brain database into arrays.
+        """
+        import numpy as np
+        cur = self.brain.cur
+        self.neurotransmitters = self.brain.getNeurotransmitters()
+        ntIndex = dict([(self.neurotransmitters[i], i) for i in range(len(self.neurotransmitters))])
+        self.IDs = {}
+        self.index = {}
+        self.values = {}
+        self.present = {}
+        for statetype in self.statetypes:
+            IDs = self.brain.getIDs(statetype)
+            self.IDs[statetype] = IDs
+            self.index[statetype] = dict([(IDs[i], i) for i in range(len(IDs))])
+            values = np.zeros((len(IDs), len(self.neurotransmitters)))
+            present = np.zeros(values.shape, dtype=bool)
+            for (ID, neurotransmitter, value) in self.brain._readStates(statetype):
+                if ID in self.index[statetype] and neurotransmitter in ntIndex:
+                    row = self.index[statetype][ID]
+                    col = ntIndex[neurotransmitter]
+                    values[row, col] = float(value)
+                    present[row, col] = True
+            self.values[statetype] = values
+            self.present[statetype] = present
+        self.loaded = dict([(statetype, self.values[statetype].copy()) for statetype in self.statetypes])
+        for (statetype, IDs) in [("synapse_state", self.brain._dirtySynapses), ("neuron_state", self.brain._dirtyNeuronStates)]:
+            self.dirty[statetype] = np.zeros(len(self.IDs[statetype]), dtype=bool)
+            self.dirty[statetype][[self.index[statetype][ID] for ID in IDs if ID in self.index[statetype]]] = True
+        cur.execute("SELECT ID, neuron_state_ID, axon_state_ID FROM neuron_body")
+        body = [x for x in cur.fetchall() if x[1] in self.index["neuron_state"] and x[2] in self.index["axon_state"]]
+        self.neuronIDs = [x[0] for x in body]
+        self.neuronIndex = dict([(self.neuronIDs[i], i) for i in range(len(self.neuronIDs))])
+        self.neuron_state = np.array([self.index["neuron_state"][x[1]] for x in body], dtype=np.int64)
+        self.neuron_axon = np.array([self.index["axon_state"][x[2]] for x in body], dtype=np.int64)
+        cur.execute("SELECT DISTINCT ID, dendrite_state_ID FROM neuron_dendrite")
+        pairs = [x for x in cur.fetchall() if x[0] in self.neuronIndex and x[1] in self.index["dendrite_state"]]
+        self.dendrite_neuron = np.array([self.neuronIndex[x[0]] for x in pairs], dtype=np.int64)
+        self.dendrite_state = np.array([self.index["dendrite_state"][x[1]] for x in pairs], dtype=np.int64)
+        cur.execute("SELECT DISTINCT synapse_state_ID, dendrite_state_ID FROM synapse_dendrite_link")
+        pairs = [x for x in cur.fetchall() if x[0] in self.index["synapse_state"] and x[1] in self.index["dendrite_state"]]
+        self.sd_synapse = np.array([self.index["synapse_state"][x[0]] for x in pairs], dtype=np.int64)
+        self.sd_dendrite = np.array([self.index["dendrite_state"][x[1]] for x in pairs], dtype=np.int64)
+        cur.execute("SELECT DISTINCT axon_state_ID, synapse_state_ID FROM axon_synapse_link")
+        pairs = [x for x in cur.fetchall() if x[0] in self.index["axon_state"] and x[1] in self.index["synapse_state"]]
+        self.as_axon = np.array([self.index["axon_state"][x[0]] for x in pairs], dtype=np.int64)
+        self.as_synapse = np.array([self.index["synapse_state"][x[1]] for x in pairs], dtype=np.int64)
+        if self.workers > 1: self._share()
+
+    def _sharedArray(self, array):
+        """!
+        Internal method to copy an array into shared memory.
+
+        @param array Array: Array to copy
+        @return: (name of shared memory, shared array)
+        """
+        import numpy as np
+        from multiprocessing import shared_memory
+        memory = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        self.shared.append(memory)
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)
+        shared[:] = array
+        return (memory.name, shared)
+
+    def _share(self):
+        """!
+        Internal method to move the states into shared memory, allocate the buffers for the next cycle and random multipliers, and start the worker processes with their partitions of the topology.
+        """
+        import numpy as np
+        import multiprocessing
+        self.close()
+        buffers = {}
+        self.next = {}
+        self.multipliers = {}
+        for statetype in self.statetypes:
+            (name, self.values[statetype]) = self._sharedArray(self.values[statetype])
+            buffers["values/" + statetype] = (name, self.values[statetype].shape)
+            (name, self.next[statetype]) = self._sharedArray(self.values[statetype])
+            buffers["next/" + statetype] = (name, self.next[statetype].shape)
+            (name, self.multipliers[statetype]) = self._sharedArray(np.ones(self.values[statetype].shape))
+            buffers["multipliers/" + statetype] = (name, self.multipliers[statetype].shape)
+        self.partitions = []
+        for neurons in np.array_split(np.arange(len(self.neuronIDs)), self.workers):
+            if len(neurons) == 0: continue
+            (start, end) = (int(neurons[0]), int(neurons[-1]) + 1)
+            pairs = (self.dendrite_neuron >= start) & (self.dendrite_neuron < end)
+            dendrite_rows = np.unique(self.dendrite_state[pairs])
+            sd_links = np.isin(self.sd_dendrite, dendrite_rows)
+            as_links = np.isin(self.as_axon, self.neuron_axon[start:end])
+            self.partitions.append({"start": start, "end": end,
+                                    "dendrite_neuron": self.dendrite_neuron[pairs] - start,
+                                    "dendrite_state": self.dendrite_state[pairs],
+                                    "neuron_state": self.neuron_state[start:end],
+                                    "neuron_axon": self.neuron_axon[start:end],
+                                    "sd_synapse": self.sd_synapse[sd_links],
+                                    "sd_dendrite": self.sd_dendrite[sd_links],
+                                    "as_axon": self.as_axon[as_links],
+                                    "as_synapse": self.as_synapse[as_links]})
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        self.pool = context.Pool(self.workers, _initializeEngineWorker, (self.partitions, buffers))
+
+    def close(self):
+        """!
+        Method to stop the worker processes and release the shared memory, if any. The states are copied out of shared memory; hence, the engine can still be used as a single process engine.
+        """
+        if self.pool != None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if len(self.shared) > 0:
+            for statetype in self.statetypes:
+                self.values[statetype] = self.values[statetype].copy()
+            self.next = {}
+            self.multipliers = {}
+            for memory in self.shared:
+                memory.close()
+                memory.unlink()
+            self.shared = []
+            self.workers = 1
+
+    def _randomize(self, statetype, rows, variation):
+        """!
+        Internal method to perform random variation to the neurotransmitter values of states, equivalent to randomState() method in brainopy class.
+
+        @param statetype String: Type of state
+        @param rows Array: Row indices of states
+        @param variation Float: Variation limit
+        """
+        if len(rows) == 0: return
+        self.values[statetype][rows] = self.values[statetype][rows] * self._multiplier(rows, variation)
+
+    def _multiplier(self, rows, variation, rng=None):
+        """!
+        Internal method to draw the random multipliers for the neurotransmitter values of states.
+
+        @param rows Array: Row indices of states
+        @param variation Float: Variation limit
+        @param rng Object: NumPy random number generator. Default = None (random number generator of the engine).
+        @return: Array of multipliers (rows by neurotransmitters)
+        """
+        if rng == None: rng = self.rng
+        variation = float(variation)
+        lower_limit = int(1000000 - (1000000 * variation))
+        upper_limit = int(1000000 + (1000000 * variation))
+        return rng.integers(lower_limit, upper_limit + 1, size=(len(rows), len(self.neurotransmitters))) / 1000000
+
+    @staticmethod
+    def _rows(indices, size):
+        """!
+        Internal method to get the sorted unique row indices, equivalent to numpy.unique() but in linear time.
+
+        @param indices Array: Row indices
+        @param size Integer: Number of rows
+        @return: Array of sorted unique row indices
+        """
+        import numpy as np
+        present = np.zeros(size, dtype=bool)
+        present[indices] = True
+        return np.flatnonzero(present)
+
+    @staticmethod
+    def _average(source, sourceRows, targetRows, size):
+        """!
+        Internal method to average source rows into target rows.
+
+        @return: (sums, counts) where sums[i] / counts[i] is the average of source rows for target row i
+        """
+        import numpy as np
+        sums = np.zeros((size, source.shape[1]))
+        np.add.at(sums, targetRows, source[sourceRows])
+        counts = np.bincount(targetRows, minlength=size)
+        return (sums, counts)
+
+    def cycle(self, neurons, synapses):
+        """!
+        Method to execute one cycle on the given neurons and synapses; which are (1) synapse to dendrite transfer function (SDTF), (2) dendrite modulator (DMF), (3) dendrite to neuron transfer function (DNTF), (4) neuron modulator (NMF), (5) neuron to axon transfer function (NATF), (6) axon modulator (AMF), (7) axon to synapse transfer function (ASTF), and (8) synapse modulator (SMF).
+
+        @param neurons Array: Boolean array of selected neurons (by neuron index)
+        @param synapses Array: Row indices of selected synapse states
+        """
+        import numpy as np
+        brain = self.brain
+        dendrites = self.values["dendrite_state"]
+        neuron_states = self.values["neuron_state"]
+        axons = self.values["axon_state"]
+        synapse_states = self.values["synapse_state"]
+        # Dendrites (by neuron-dendrite pair) of selected neurons
+        selected = neurons[self.dendrite_neuron]
+        dendrite_rows = self._rows(self.dendrite_state[selected], len(dendrites))
+        # (1) SDTF
+        target = np.zeros(len(dendrites), dtype=bool)
+        target[dendrite_rows] = True
+        links = target[self.sd_dendrite]
+        (sums, counts) = self._average(synapse_states, self.sd_synapse[links], self.sd_dendrite[links], len(dendrites))
+        updated = counts > 0
+        dendrites[updated] = sums[updated] / counts[updated][:, None]
+        # (2) DMF
+        self._randomize("dendrite_state", dendrite_rows, brain.neurotransmitter_dendrite_variation)
+        # (3) DNTF
+        (sums, counts) = self._average(dendrites, self.dendrite_state[selected], self.neuron_state[self.dendrite_neuron[selected]], len(neuron_states))
+        updated = counts > 0
+        neuron_states[updated] = sums[updated] / counts[updated][:, None]
+        # (4) NMF
+        neuron_rows = self._rows(self.neuron_state[neurons], len(neuron_states))
+        self._randomize("neuron_state", neuron_rows, brain.neurotransmitter_neuron_variation)
+        # (5) NATF
+        axons[self.neuron_axon[neurons]] = neuron_states[self.neuron_state[neurons]]
+        # (6) AMF
+        axon_rows = self._rows(self.neuron_axon[neurons], len(axons))
+        self._randomize("axon_state", axon_rows, brain.neurotransmitter_axon_variation)
+        # (7) ASTF
+        target = np.zeros(len(axons), dtype=bool)
+        target[axon_rows] = True
+        links = target[self.as_axon]
+        synapse_states[self.as_synapse[links]] = axons[self.as_axon[links]]
+        # (8) SMF
+        self._randomize("synapse_state", synapses, brain.neurotransmitter_synapse_variation)
+
+    def parallelCycle(self, neurons, synapses):
+        """!
+        Method to execute one cycle on the given neurons and synapses using the worker processes (see cycle() method for the functions executed). The random multipliers are drawn before the cycle, the workers write the next states of their neurons into the buffer for the next cycle, and the buffer is merged into the states at the end of the cycle.
+
+        @param neurons Array: Boolean array of selected neurons (by neuron index)
+        @param synapses Array: Row indices of selected synapse states
+        """
+        import numpy as np
+        brain = self.brain
+        selected = neurons[self.dendrite_neuron]
+        rows = {"dendrite_state": self._rows(self.dendrite_state[selected], len(self.values["dendrite_state"])),
+                "neuron_state": self._rows(self.neuron_state[neurons], len(self.values["neuron_state"])),
+                "axon_state": self._rows(self.neuron_axon[neurons], len(self.values["axon_state"])),
+                "synapse_state": synapses}
+        variation = {"dendrite_state": brain.neurotransmitter_dendrite_variation,
+                     "neuron_state": brain.neurotransmitter_neuron_variation,
+                     "axon_state": brain.neurotransmitter_axon_variation,
+                     "synapse_state": brain.neurotransmitter_synapse_variation}
+        for statetype in ["dendrite_state", "neuron_state", "axon_state", "synapse_state"]:
+            if len(rows[statetype]) > 0:
+                self.multipliers[statetype][rows[statetype]] = self._multiplier(rows[statetype], variation[statetype])
+            self.next[statetype][:] = self.values[statetype]
+        self.pool.map(_engineWorkerCycle, [(i, neurons[partition["start"]:partition["end"]]) for (i, partition) in enumerate(self.partitions)])
+        if len(synapses) > 0:
+            self.next["synapse_state"][synapses] = self.next["synapse_state"][synapses] * self.multipliers["synapse_state"][synapses]
+        for statetype in self.statetypes:
+            self.values[statetype][:] = self.next[statetype]
+
+    def activeNeurons(self, neurons, synapses, full=False):
+        """!
+        Method to select the neurons and synapses to process in a cycle of sparse scheduling (see runBrain() method in brainopy class), and to mark the synapses linked to the axons of the selected neurons as changed for the next cycle.
+
+        @param neurons Array: Boolean array of selected neurons (by neuron index)
+        @param synapses Array: Row indices of selected synapse states
+        @param full Boolean: Flag to process all selected neurons and synapses. Default = False.
+        @return: (boolean array of active neurons, row indices of active synapse states)
+        """
+        import numpy as np
+        if not full:
+            dendrites = np.zeros(len(self.IDs["dendrite_state"]), dtype=bool)
+            dendrites[self.sd_dendrite[self.dirty["synapse_state"][self.sd_synapse]]] = True
+            active = np.zeros(len(self.neuronIDs), dtype=bool)
+            active[self.dendrite_neuron[dendrites[self.dendrite_state]]] = True
+            neurons = neurons & (active | self.dirty["neuron_state"][self.neuron_state])
+        axons = np.zeros(len(self.IDs["axon_state"]), dtype=bool)
+        axons[self.neuron_axon[neurons]] = True
+        changed = np.zeros(len(self.IDs["synapse_state"]), dtype=bool)
+        changed[self.as_synapse[axons[self.as_axon]]] = True
+        if not full:
+            selected = np.zeros(len(changed), dtype=bool)
+            selected[synapses] = True
+            synapses = np.flatnonzero(selected & (changed | self.dirty["synapse_state"]))
+        self.dirty["synapse_state"] = changed
+        self.dirty["neuron_state"] = np.zeros(len(self.IDs["neuron_state"]), dtype=bool)
+        return (neurons, synapses)
+
+    def run(self, cycles=1, neuronList=[], synapseList=[], full=False):
+        """!
+        Method to execute / run the entire brain or part of the brain in memory for a number of cycles. If a list of neuron_IDs (represented by neuronList) and list of synapse IDs (represented by synapseList) are not given, the entire brain will be executed / ran. If the scheduler of the brain is "sparse", only the neurons reachable from changed states are processed in each cycle (see runBrain() method in brainopy class). Brain maintenance functions in brainopy class are executed after each cycle.
+
+        @param cycles Integer: Number of cycles. Default = 1
+        @param neuroList List: List of neuron_IDs. Default = []
+        @param synapseList List: List of synapse_state_IDs. Default = []
+        @param full Boolean: Flag to process all neurons and synapses under sparse scheduling. Default = False.
+        """
+        import numpy as np
+        neurons = np.zeros(len(self.neuronIDs), dtype=bool)
+        if len(neuronList) == 0: 
+            neurons[:] = True
+        else:
+            neurons[[self.neuronIndex[ID] for ID in neuronList if ID in self.neuronIndex]] = True
+        if len(synapseList) == 0:
+            synapses = np.arange(len(self.IDs["synapse_state"]))
+        else:
+            synapses = np.unique([self.index["synapse_state"][ID] for ID in synapseList if ID in self.index["synapse_state"]]).astype(np.int64)
+        for c in range(int(cycles)):
+            (active, activeSynapses) = (neurons, synapses)
+            if self.brain.scheduler == "sparse":
+                (active, activeSynapses) = self.activeNeurons(neurons, synapses, full)
+            if self.pool != None:
+                self.parallelCycle(active, activeSynapses)
+            else:
+                self.cycle(active, activeSynapses)
+            self.brain.maintenanceFunction()
+        if self.brain.logging: self.brain.logger("arrayEngine.run", "cycles=" + str(cycles))
+
+    def readState(self, statetype, ID):
+        """!
+        Method to read neurotransmitter values of a state from memory.
+
+        @param statetype String: Type of state
+        @param ID String: ID of state
+        @return: Dictionary of neurotransmitter values - {<neurotransmitter>: <value>}
+        """
+        row = self.index[statetype][ID]
+        return dict([(self.neurotransmitters[i], float(self.values[statetype][row, i])) for i in range(len(self.neurotransmitters)) if self.present[statetype][row, i]])
+
+    def writeState(self, statetype, ID, state):
+        """!
+        Method to update neurotransmitter values of a state in memory.
+
+        @param statetype String: Type of state
+        @param ID String: ID of state
+        @param state Dictionary: Dictionary of neurotransmitter values - {<neurotransmitter>: <value>}
+        """
+        row = self.index[statetype][ID]
+        for i in range(len(self.neurotransmitters)):
+            if self.neurotransmitters[i] in state and self.present[statetype][row, i]:
+                self.values[statetype][row, i] = float(state[self.neurotransmitters[i]])
+        if statetype in self.dirty: self.dirty[statetype][row] = True
+
+    def randomizeStates(self, statetype, IDs="all", variation=0.01, seed=None):
+        """!
+        Method to perform random variation to the neurotransmitter values of many states in memory (see randomizeStates() method in brainopy class).
+
+        @param statetype String: Type of state
+        @param IDs List: List of state IDs, or "all" for all states of statetype. Default = "all".
+        @param variation Float: Variation limit. Default = 0.01 (1% variation)
+        @param seed Integer: Seed for random variations. Default = None (random number generator of the engine).
+        @return: Number of neurotransmitter values varied
+        """
+        import numpy as np
+        if IDs == "all":
+            rows = np.arange(len(self.IDs[statetype]))
+        else:
+            rows = self._rows(np.array([self.index[statetype][ID] for ID in IDs if ID in self.index[statetype]], dtype=np.int64), len(self.IDs[statetype]))
+        multipliers = self._multiplier(rows, variation, None if seed == None else np.random.default_rng(seed))
+        self.values[statetype][rows] = np.where(self.present[statetype][rows], self.values[statetype][rows] * multipliers, self.values[statetype][rows])
+        if statetype in self.dirty: self.dirty[statetype][rows] = True
+        return int(self.present[statetype][rows].sum())
+
+    def restore(self, arrays):
+        """!
+        Method to replace the states in memory with the states of a snapshot (see snapshot() and restore() methods in brainopy class). The states in the snapshot must be the same (by IDs) as the states in memory.
+
+        @param arrays Dictionary: Arrays of the snapshot
+        @return: Number of neurotransmitter values restored
+        """
+        import numpy as np
+        neurotransmitters = arrays["neurotransmitter/neurotransmitter"].tolist()
+        columns = [neurotransmitters.index(n) if n in neurotransmitters else -1 for n in self.neurotransmitters]
+        count = 0
+        for statetype in self.statetypes:
+            IDs = arrays["state/" + statetype + "/ID"].tolist()
+            if len(IDs) != len(self.IDs[statetype]) or len([ID for ID in IDs if ID not in self.index[statetype]]) > 0:
+                raise ValueError("Snapshot does not match the states of the engine: " + statetype)
+            rows = np.array([self.index[statetype][ID] for ID in IDs], dtype=np.int64)
+            for i in range(len(self.neurotransmitters)):
+                if columns[i] < 0:
+                    self.present[statetype][:, i] = False
+                else:
+                    self.values[statetype][rows, i] = arrays["state/" + statetype + "/value"][:, columns[i]]
+                    self.present[statetype][rows, i] = arrays["state/" + statetype + "/present"][:, columns[i]]
+            count = count + int(self.present[statetype].sum())
+        return count
+
+    def save(self):
+        """!
+        Method to write the changed states back into the brain database in one transaction.
+
+        @return: Number of values written
+        """
+        import numpy as np
+        count = 0
+        for statetype in self.statetypes:
+            changed = (self.values[statetype] != self.loaded[statetype]) & self.present[statetype]
+            (rows, cols) = np.nonzero(changed)
+            IDs = self.IDs[statetype]
+            data = [(float(self.values[statetype][r, c]), IDs[r], self.neurotransmitters[c]) for (r, c) in zip(rows, cols)]
+            self.brain._writeStates(statetype, data)
+            self.loaded[statetype] = self.values[statetype].copy()
+            count = count + len(data)
+        self.brain.con.commit()
+        if self.brain.logging: self.brain.logger("arrayEngine.save", "values=" + str(count))
+        return count
+
+_engineWorker = {}
+
+def _initializeEngineWorker(partitions, buffers):
+    """!
+    Internal function to initialize a worker process of arrayEngine with the partitions of the topology and the shared memory of states, buffers for next cycle and random multipliers.
+
+    @param partitions List: Partitions of the topology
+    @param buffers Dictionary: {<buffer>: (<name of shared memory>, <shape>)}
+    """
+    import numpy as np
+    from multiprocessing import shared_memory
+    _engineWorker["partitions"] = partitions
+    _engineWorker["memory"] = []
+    for key in buffers:
+        (name, shape) = buffers[key]
+        memory = shared_memory.SharedMemory(name=name)
+        _engineWorker["memory"].append(memory)
+        _engineWorker[key] = np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+
+def _engineWorkerCycle(arguments):
+    """!
+    Internal function to execute one cycle on a partition of neurons in a worker process of arrayEngine. The states of cycle t are read from the frozen states, and the states of the neurons in the partition for cycle t+1 are written into the buffer for next cycle.
+
+    @param arguments Tuple: (partition index, boolean array of selected neurons in the partition)
+    """
+    import numpy as np
+    (index, neurons) = arguments
+    partition = _engineWorker["partitions"][index]
+    values = lambda statetype: _engineWorker["values/" + statetype]
+    buffer = lambda statetype: _engineWorker["next/" + statetype]
+    multiplier = lambda statetype: _engineWorker["multipliers/" + statetype]
+    def average(source, sourceRows, targetPositions, target):
+        sums = np.zeros((len(target), source.shape[1]))
+        np.add.at(sums, targetPositions, source[sourceRows])
+        counts = np.bincount(targetPositions, minlength=len(target))
+        updated = counts > 0
+        target[updated] = sums[updated] / counts[updated][:, None]
+    def member(rows, IDs):
+        if len(rows) == 0: return np.zeros(len(IDs), dtype=bool)
+        positions = np.minimum(np.searchsorted(rows, IDs), len(rows) - 1)
+        return rows[positions] == IDs
+    # (1) SDTF and (2) DMF
+    selected = neurons[partition["dendrite_neuron"]]
+    dendrite_rows = np.unique(partition["dendrite_state"][selected])
+    dendrites = values("dendrite_state")[dendrite_rows]
+    links = member(dendrite_rows, partition["sd_dendrite"])
+    average(values("synapse_state"), partition["sd_synapse"][links], np.searchsorted(dendrite_rows, partition["sd_dendrite"][links]), dendrites)
+    dendrites = dendrites * multiplier("dendrite_state")[dendrite_rows]
+    buffer("dendrite_state")[dendrite_rows] = dendrites
+    # (3) DNTF and (4) NMF
+    neuron_rows = np.unique(partition["neuron_state"][neurons])
+    neuron_states = values("neuron_state")[neuron_rows]
+    average(dendrites, np.searchsorted(dendrite_rows, partition["dendrite_state"][selected]), np.searchsorted(neuron_rows, partition["neuron_state"][partition["dendrite_neuron"][selected]]), neuron_states)
+    neuron_states = neuron_states * multiplier("neuron_state")[neuron_rows]
+    buffer("neuron_state")[neuron_rows] = neuron_states
+    # (5) NATF and (6) AMF
+    axon_rows = np.unique(partition["neuron_axon"][neurons])
+    axons = values("axon_state")[axon_rows]
+    axons[np.searchsorted(axon_rows, partition["neuron_axon"][neurons])] = neuron_states[np.searchsorted(neuron_rows, partition["neuron_state"][neurons])]
+    axons = axons * multiplier("axon_state")[axon_rows]
+    buffer("axon_state")[axon_rows] = axons
+    # (7) ASTF
+    links = member(axon_rows, partition["as_axon"])
+    buffer("synapse_state")[partition["as_synapse"][links]] = axons[np.searchsorted(axon_rows, partition["as_axon"][links])]
+    return int(np.sum(neurons))
@@ -0,0 +1,220 @@
+'''!
+Brainopy Benchmark: Scalable Benchmark for Brainopy
+
+Date created: 18th October 2026
+
+License: GNU General Public License version 3 for academic or
+not-for-profit use only.
+
+Bactome package is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+'''
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import fire
+
+from brainopy import brainopy
+
+
+def _percentile(values, percent):
+    '''!
+    Function to calculate percentile of a list of values using the
+    nearest-rank method.
+
+    @param values List: List of values
+    @param percent Float: Percentile (0 to 100)
+    @return: Percentile value, or None if values is empty
+    '''
+    if len(values) == 0: return None
+    values = sorted(values)
+    rank = int(-(-len(values) * float(percent) // 100))
+    return values[max(rank, 1) - 1]
+
+def _peakMemory():
+    '''!
+    Function to get the peak resident memory of the current process
+    in bytes. This is only available on Unix-like systems.
+
+    @return: Peak resident memory in bytes, or None if not available
+    '''
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin": return int(peak)
+    return int(peak) * 1024
+
+def benchmark(neurons=1000, dendrites=2, synapse_density=2.0,
+              neurotransmitters=6, cycles=10, backend="sqlite",
+              workers=1, layout="long", scheduler="full",
+              database=None, seed=None, logging=False,
+              outputfile=None):
+    '''!
+    Function to benchmark brainopy by constructing a random brain
+    (neural network) and running it for a number of cycles. The brain
+    is constructed with bulk loading; where the number of synapses is
+    synapse_density times the number of neurons, a quarter of the
+    synapses is linked to axons and three quarters of the synapses
+    is linked to dendrites (as in the original stress test). A signal
+    is given to every synapse before the cycles.
+
+    The results are printed (and written into outputfile, if given)
+    as JSON with the following keys:
+        - parameters: parameters of the benchmark
+        - setup_time: time (in seconds) to construct the brain and
+        give the input signals
+        - cycle_time: total, mean, minimum, p50, p90, p99 and maximum
+        time (in seconds) per cycle
+        - rows_touched: number of database rows inserted, updated
+        or deleted during setup and during the cycles (including
+        writing the states of the in-memory engine into the database)
+        - counts: number of IDs (neurons, dendrites and states) and
+        links
+        - peak_memory: peak resident memory of the process in bytes
+        (None if not available)
+
+    Usage:
+
+        python brainopy_benchmark.py run --neurons=<number of neurons>
+        --dendrites=<number of dendrites per neuron>
+        --synapse_density=<number of synapses per neuron>
+        --neurotransmitters=<number of neurotransmitters>
+        --cycles=<number of cycles> --backend=<sqlite|engine>
+        --workers=<number of engine worker processes>
+        --layout=<long|wide> --scheduler=<full|sparse>
+        --database=<path to brain database> --seed=<random seed>
+        --logging=<True|False> --outputfile=<path to JSON file>
+
+    @param neurons Integer: Number of neurons. Default = 1000.
+    @param dendrites Integer: Number of dendrites per neuron,
+    including the dendrite created with each neuron (at least 1).
+    Default = 2.
+    @param synapse_density Float: Number of synapses per neuron.
+    Default = 2.0.
+    @param neurotransmitters Integer: Number of neurotransmitters.
+    Default = 6.
+    @param cycles Integer: Number of cycles. Default = 10.
+    @param backend String: Backend to run the cycles. Allowable values
+    are "sqlite" (brain database) and "engine" (in-memory engine;
+    see brainopy.startEngine() method). Default = "sqlite".
+    @param workers Integer: Number of worker processes for the
+    in-memory engine. Default = 1.
+    @param layout String: Layout of state tables (see
+    brainopy.connectBrain() method). Default = "long".
+    @param scheduler String: Scheduler of brain cycles (see
+    brainopy.runBrain() method). Default = "full".
+    @param database String: Path to brain database file, which must
+    not exist. Default = None (temporary database, which is deleted
+    after the benchmark).
+    @param seed Integer: Random seed. Default = None.
+    @param logging Boolean: Flag to enable brain logging.
+    Default = False.
+    @param outputfile String: Path of JSON file to write the results.
+    Default = None (results are printed only).
+    @return: Dictionary of results
+    '''
+    if backend not in ["sqlite", "engine"]:
+        raise ValueError("Unknown backend: " + str(backend))
+    if int(dendrites) < 1:
+        raise ValueError("Number of dendrites per neuron must be at least 1: " + str(dendrites))
+    if database != None and os.path.exists(database):
+        raise ValueError("Brain database exists: " + str(database))
+    random.seed(seed)
+    temporary = None
+    if database == None:
+        temporary = tempfile.mkdtemp(prefix="brainopy_benchmark_")
+        database = os.path.join(temporary, "brain.db")
+    try:
+        start_time = time.perf_counter()
+        b = brainopy(database, layout=layout)
+        b.logging = logging
+        b.scheduler = scheduler
+        b.addNeurotransmitters(dict([("NT" + str(i + 1), "neurotransmitter " + str(i + 1)) for i in range(int(neurotransmitters))]))
+        b.beginBulkLoad()
+        b.addNeuron(int(neurons))
+        neuronList = b.getIDs("neuron_body")
+        for d in range(int(dendrites) - 1):
+            for neuron in neuronList: b.addDendrite(neuron)
+        synapseList = b.addSynapse(int(synapse_density * int(neurons)))
+        b.linkRandomAxonSynapse(int(0.25 * len(synapseList)))
+        b.linkRandomSynapseDendrite(int(0.75 * len(synapseList)))
+        b.endBulkLoad()
+        signal = dict([(neurotransmitter, round(0.1 + 0.05 * i, 2)) for i, neurotransmitter in enumerate(b.getNeurotransmitters())])
+        for synapse_state_ID in synapseList: b.inputSignal(synapse_state_ID, signal)
+        b.con.commit()
+        setup_time = time.perf_counter() - start_time
+        setup_rows = b.con.total_changes
+        if backend == "engine": b.startEngine(seed=seed, workers=workers)
+        cycle_times = []
+        for cycle in range(int(cycles)):
+            cycle_start = time.perf_counter()
+            b.runBrain()
+            cycle_times.append(time.perf_counter() - cycle_start)
+        if backend == "engine": b.stopEngine()
+        cycle_rows = b.con.total_changes - setup_rows
+        b.cur.execute("SELECT table_name, count(*) FROM ID_table GROUP BY table_name")
+        counts = dict(b.cur.fetchall())
+        for table in ["axon_synapse_link", "synapse_dendrite_link"]:
+            b.cur.execute("SELECT count(*) FROM " + table)
+            counts[table] = b.cur.fetchone()[0]
+        b.disconnectBrain()
+    finally:
+        if temporary != None: shutil.rmtree(temporary, ignore_errors=True)
+    results = {"parameters": {"neurons": neurons,
+                              "dendrites": dendrites,
+                              "synapse_density": synapse_density,
+                              "neurotransmitters": neurotransmitters,
+                              "cycles": cycles,
+                              "backend": backend,
+                              "workers": workers,
+                              "layout": layout,
+                              "scheduler": scheduler,
+                              "seed": seed,
+                              "logging": logging},
+               "setup_time": setup_time,
+               "cycle_time": {"total": sum(cycle_times),
+                              "mean": sum(cycle_times) / len(cycle_times) if len(cycle_times) > 0 else None,
+                              "min": min(cycle_times) if len(cycle_times) > 0 else None,
+                              "p50": _percentile(cycle_times, 50),
+                              "p90": _percentile(cycle_times, 90),
+                              "p99": _percentile(cycle_times, 99),
+                              "max": max(cycle_times) if len(cycle_times) > 0 else None},
+               "rows_touched": {"setup": setup_rows,
+                                "cycles": cycle_rows,
+                                "per_cycle": cycle_rows / len(cycle_times) if len(cycle_times) > 0 else None},
+               "counts": counts,
+               "peak_memory": _peakMemory()}
+    output = json.dumps(results, indent=2)
+    print(output)
+    if outputfile != None:
+        with open(outputfile, "w") as f:
+            f.write(output + "\n")
+    return results
+
+def _run(**kwargs):
+    '''!
+    Function to run benchmark() function from command line, where
+    the results are printed as JSON only.
+    '''
+    benchmark(**kwargs)
+
+if __name__ == '__main__':
+    exposed_functions = {'run': _run}
+    fire.Fire(exposed_functions)
@@ -23,6 +23,8 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 '''
+import json
+import multiprocessing
 import os
 import random
 import subprocess
@@ -35,9 +37,18 @@ except ImportError:
                            'install', 'fire'])
     import fire
 
+try: 
+    import numpy as np
+except ImportError:
+    subprocess.check_call([sys.executable, '-m', 'pip', 
+                           'install', 'numpy'])
+    import numpy as np
+
 ######################################################################
 # Section 1: Read file operations
 ######################################################################
+BINARY_MAGIC = b"ISLANDPOP1\n"
+
 def read_parameter_file(parameterfile, cmdline=True):
     """!
     Function to read a simulation parameter file containing the 
@@ -91,7 +102,9 @@ def read_parameter_file(parameterfile, cmdline=True):
 
 def read_population_file(populationfile, cmdline=True):
     """!
-    Function to read/prepare population file for simulation.
+    Function to read/prepare population file for simulation. Binary 
+    population file (see read_population_binary() function) is also 
+    accepted.
 
     Usage:
 
@@ -104,16 +117,24 @@ def read_population_file(populationfile, cmdline=True):
     (results are not returned).
     """
     populationfile = os.path.abspath(populationfile)
-    inputfile = open(populationfile, "r").readlines()
-    inputfile = [x[:-1] for x in inputfile]
-    geneData = inputfile[0]
-    alleleData = [x for x in inputfile if x.startswith("A")]
-    organismData = [x for x in inputfile if x.startswith("O")]
-    organismData = [[x.split(">")[1].split("|"), 
-                     x.split(">")[2].split(";")] 
-                    for x in organismData]
-    organismData = [[x[0], [ploid.split("|") for ploid in x[1]]] 
-                    for x in organismData]
+    if is_binary_population(populationfile):
+        (geneData, alleleData, metadata, genome) = \
+            read_population_binary(populationfile)
+        organismData = [[list(metadata[i]), 
+                         [[str(allele) for allele in ploid] 
+                          for ploid in genome[i].tolist()]]
+                        for i in range(len(metadata))]
+    else:
+        inputfile = open(populationfile, "r").readlines()
+        inputfile = [x[:-1] for x in inputfile]
+        geneData = inputfile[0]
+        alleleData = [x for x in inputfile if x.startswith("A")]
+        organismData = [x for x in inputfile if x.startswith("O")]
+        organismData = [[x.split(">")[1].split("|"), 
+                         x.split(">")[2].split(";")] 
+                        for x in organismData]
+        organismData = [[x[0], [ploid.split("|") for ploid in x[1]]] 
+                        for x in organismData]
     organisms = {}
     for organism in organismData:
         org = {'organism': str(organism[0][0]),
@@ -144,32 +165,193 @@ def read_population_file(populationfile, cmdline=True):
     else:
         return (geneData, alleleData, organismData, organisms)
 
+def _allele_dtype(geneData):
+    """!
+    Private function to determine the smallest unsigned integer type 
+    to hold the alleles of all genes.
+
+    @param geneData String: Gene Names and the corresponding number of 
+    alleles, which is the first row of population file.
+    """
+    alleles = [int(x) for x in geneData.split(">")[1].split("|")]
+    if max(alleles + [0]) < 256:
+        return np.uint8
+    return np.uint16
+
+def is_binary_population(populationfile):
+    """!
+    Function to check whether a population file is a binary population 
+    file (see read_population_binary() function).
+
+    @param populationfile String: Relative or absolute path of the 
+    population file.
+    @return: True if the population file is a binary population file.
+    """
+    with open(populationfile, "rb") as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+def _binary_offset(header_length):
+    """!
+    Private function to calculate the position of the allele matrix in 
+    binary population file, which is aligned to 64 bytes after the 
+    header.
+
+    @param header_length Integer: Length of header in bytes.
+    """
+    offset = len(BINARY_MAGIC) + 8 + header_length
+    return offset + (-offset % 64)
+
+def read_population_binary(populationfile):
+    """!
+    Function to read binary population file. Binary population file 
+    consists of a header and an allele matrix; where the header 
+    (identifier, header length as 8-byte little-endian integer, and 
+    header in JSON) holds the gene data, allele data, organism metadata, 
+    data type and shape of the allele matrix, and the allele matrix 
+    (organisms by ploidy by genes) is memory-mapped; hence, alleles are 
+    only read from file when used.
+
+    @param populationfile String: Relative or absolute path of the 
+    binary population file.
+    @return: (geneData, alleleData, metadata, genome) where geneData 
+    is the first row of population file, alleleData is the list of 
+    allele data rows of population file, metadata is the list of 
+    [organism, generation, parentA, parentB] of each organism, and 
+    genome is the memory-mapped array of alleles.
+    """
+    populationfile = os.path.abspath(populationfile)
+    with open(populationfile, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError("%s is not a binary population file" % \
+                populationfile)
+        header_length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    shape = tuple(header["shape"])
+    if int(np.prod(shape)) == 0:
+        genome = np.zeros(shape, dtype=header["dtype"])
+    else:
+        genome = np.memmap(populationfile, dtype=header["dtype"], mode="r",
+                           offset=_binary_offset(header_length), 
+                           shape=shape)
+    return (header["geneData"], header["alleleData"], 
+            header["metadata"], genome)
+
+def read_population_array(populationfile, ploidy=None):
+    """!
+    Function to read population file into an array-backed population, 
+    where the genomes of all organisms are held in an integer array of 
+    organisms by ploidy by genes (uint8, or uint16 if any gene has more 
+    than 255 alleles). All organisms must have the same ploidy, unless 
+    ploidy is given; where each organism is trimmed to its first ploidy 
+    chromosome sets. Binary population file (see 
+    read_population_binary() function) is also accepted.
+
+    @param populationfile String: Relative or absolute path of the 
+    population file.
+    @param ploidy Integer: Number of chromosome sets to read of each 
+    organism. Default = None (all chromosome sets).
+    @return: (geneData, alleleData, metadata, genome) where geneData 
+    is the first row of population file, alleleData is the list of 
+    allele data rows of population file, metadata is the list of 
+    [organism, generation, parentA, parentB] of each organism, and 
+    genome is the array of alleles.
+    """
+    populationfile = os.path.abspath(populationfile)
+    if is_binary_population(populationfile):
+        (geneData, alleleData, metadata, genome) = \
+            read_population_binary(populationfile)
+        if ploidy != None: genome = genome[:, :int(ploidy), :]
+        return (geneData, alleleData, metadata, genome)
+    geneData = None
+    alleleData = []
+    metadata = []
+    genomes = []
+    for line in open(populationfile, "r"):
+        line = line.rstrip("\n")
+        if geneData == None:
+            geneData = line
+        elif line.startswith("A"):
+            alleleData.append(line)
+        elif line.startswith("O"):
+            line = line.split(">")
+            metadata.append(line[1].split("|"))
+            genomes.append(line[2].split(";"))
+            if ploidy != None: genomes[-1] = genomes[-1][:int(ploidy)]
+    dtype = _allele_dtype(geneData)
+    gene_count = len(geneData.split(">")[0].split("|"))
+    ploidy = set([len(genome) for genome in genomes])
+    if len(ploidy) > 1:
+        raise ValueError("Organisms of different ploidy in %s" % \
+            populationfile)
+    ploidy = ploidy.pop() if len(ploidy) == 1 else 0
+    genome = np.zeros((len(genomes), ploidy, gene_count), dtype=dtype)
+    for i in range(len(genomes)):
+        genome[i] = np.array("|".join(genomes[i]).split("|"), 
+                             dtype=dtype).reshape(ploidy, gene_count)
+    return (geneData, alleleData, metadata, genome)
+
 ######################################################################
 # Section 2: Generate population from parameters operations
 ######################################################################
-def _generate_organism(pop_param, gene_sequence, ploidy):
-    organism = []
-    for i in range(int(ploidy)):
-        ploid = []
-        for gene in gene_sequence:
-            freq = random.random()
-            allele_bin = 0
-            while freq >= pop_param[gene][allele_bin]:
-                allele_bin = allele_bin + 1
-            ploid.append(allele_bin + 1)
-        organism.append(ploid)
-    return organism
+def _cumulative_frequency_matrix(pop_param, gene_sequence):
+    """!
+    Private function to arrange the cumulative allelic frequencies of 
+    all genes (from read_parameter_file() function) into one sorted 
+    array for searchsorted; where the cumulative allelic frequencies of 
+    the i-th gene are offset by 2i, so that the bins of each gene do not 
+    overlap the bins of other genes.
+
+    @param pop_param Dictionary: Cumulative allelic frequencies of genes.
+    @param gene_sequence List: List of gene names.
+    @return: (cumulative allelic frequencies, starting position of the 
+    bins of each gene, number of alleles of each gene)
+    """
+    allele_count = np.array([len(pop_param[gene]) 
+                             for gene in gene_sequence], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(allele_count)[:-1]])
+    cumulative = np.concatenate([np.array(pop_param[gene], dtype=float) + 
+                                 2 * i 
+                                 for i, gene in enumerate(gene_sequence)])
+    return (cumulative, starts, allele_count)
+
+def _generate_genomes(rng, cumulative, starts, allele_count, 
+                      organism_count, ploidy, dtype):
+    """!
+    Private function to generate the genomes of organisms from the 
+    cumulative allelic frequencies (from _cumulative_frequency_matrix() 
+    function). For each gene of each ploid of each organism, a random 
+    number is drawn and the allele is the number of cumulative allelic 
+    frequencies of the gene less than or equal to the random number, 
+    plus 1.
+
+    @param rng Object: NumPy random number generator.
+    @param cumulative Array: Offset cumulative allelic frequencies.
+    @param starts Array: Starting position of the bins of each gene.
+    @param allele_count Array: Number of alleles of each gene.
+    @param organism_count Integer: Number of organisms to generate.
+    @param ploidy Integer: Number of chromosome sets.
+    @param dtype Object: NumPy data type of alleles.
+    @return: Array of alleles (organisms by ploidy by genes).
+    """
+    offsets = 2 * np.arange(len(starts))
+    freq = rng.random((int(organism_count), int(ploidy), len(starts)))
+    allele_bin = np.searchsorted(cumulative, freq + offsets, 
+                                 side="right") - starts
+    return (np.minimum(allele_bin, allele_count - 1) + 1).astype(dtype)
 
 def generate_population(parameterfile, populationfile,
                         population_size=10, ploidy=2, 
-                        generation_count=0):
+                        generation_count=0, seed=None,
+                        output_format="text"):
     """!
     Function to generate the population file, which will be used as 
-    input for simulation, from the simulation parameter file.
+    input for simulation, from the simulation parameter file. Organisms 
+    are generated and written in blocks (see _generate_genomes() 
+    function).
 
     Usage:
     
-        python island.py gpop --populationfile=test_pop --ploidy=2 --generation_count=0 --population_size=10 --parameterfile=island_parameter.csv
+        python island.py gpop --populationfile=test_pop --ploidy=2 --generation_count=0 --population_size=10 --parameterfile=island_parameter.csv --seed=1 --output_format=text
 
     @param parameterfile String: Relative or absolute path to the 
     simulation parameter file.
@@ -181,35 +363,56 @@ def generate_population(parameterfile, populationfile,
     (diploid).
     @param generation_count Integer: The base generation count. 
     Default = 0.
+    @param seed Integer: Seed for random number generator. Default = 
+    None.
+    @param output_format String: Format of population file. Allowable 
+    values are "text" and "binary" (see read_population_binary() 
+    function). Default = text.
     """
+    if output_format.lower() not in ["text", "binary"]:
+        raise ValueError("Unknown population file format: %s" % \
+            str(output_format))
     populationfile = os.path.abspath(populationfile)
     parameterfile = os.path.abspath(parameterfile)
-    pop_file = open(populationfile, "w")
     (pop_param, gene_sequence) = read_parameter_file(parameterfile, False)
     allele_count = [str(len(pop_param[gene])) for gene in gene_sequence]
-    stdout = '%s>%s' % ("|".join(gene_sequence), "|".join(allele_count))
-    pop_file.write(stdout + "\n")
-    # print(stdout)
+    geneData = '%s>%s' % ("|".join(gene_sequence), "|".join(allele_count))
     print("Number of Genes = %i" % len(gene_sequence))
+    alleleData = []
     for gene in gene_sequence:
         allelic_frequency = ["%.5f" % pop_param[gene][0]] + \
             ["%.5f" % (pop_param[gene][i] - pop_param[gene][i-1]) 
                 for i in range(1, len(pop_param[gene]))]
         stdout = "A>%s>" % gene
         stdout = stdout + "|".join([str(af) for af in allelic_frequency])
-        pop_file.write(stdout + "\n")
-        # print(stdout)
-    for organism_count in range(int(population_size)):
-        organism = _generate_organism(pop_param, gene_sequence, ploidy)
-        stdout = "O>%s|%s|0|0>%s" % \
-            (str(organism_count), str(int(generation_count)),
-             ";".join(["|".join([str(allele) for allele in ploid]) 
-                        for ploid in organism]))
-        pop_file.write(stdout + "\n")
-        # print(stdout)
-        if (organism_count + 1) % 100 == 0:
-            print("%s organisms generated" % str(organism_count + 1))
-    print("Total %s organisms generated" % str(organism_count + 1))
+        alleleData.append(stdout)
+    population_size = int(population_size)
+    dtype = _allele_dtype(geneData)
+    metadata = [[str(i), str(int(generation_count)), "0", "0"] 
+                for i in range(population_size)]
+    if output_format.lower() == "binary":
+        pop_file = open(populationfile, "wb")
+        _write_binary_header(pop_file, geneData, alleleData, metadata, 
+                             dtype, (population_size, int(ploidy), 
+                                     len(gene_sequence)))
+    else:
+        pop_file = open(populationfile, "w")
+        pop_file.write("\n".join([geneData] + alleleData) + "\n")
+    rng = np.random.default_rng(seed)
+    (cumulative, starts, counts) = \
+        _cumulative_frequency_matrix(pop_param, gene_sequence)
+    block = max(1, 1000000 // max(1, int(ploidy) * len(gene_sequence)))
+    for first in range(0, population_size, block):
+        genome = _generate_genomes(rng, cumulative, starts, counts,
+                                   min(block, population_size - first),
+                                   ploidy, dtype)
+        if output_format.lower() == "binary":
+            genome.tofile(pop_file)
+        else:
+            pop_file.write(_organism_lines(
+                metadata[first:first + len(genome)], genome))
+        print("%s organisms generated" % str(first + len(genome)))
+    print("Total %s organisms generated" % str(population_size))
     pop_file.close()
 
 ######################################################################
@@ -321,10 +524,264 @@ def simulate_simple(populationfile, generations, organisms,
         _simulation_writeout(outputfile, new_organisms, headerData)
         organisms = new_organisms
 
+def _simulation_writeout_array(filename, metadata, genome, headerData):
+    """!
+    Private function called by simulate_<simulation type>_array() 
+    functions to write out the corresponding population files for each 
+    generation from an array-backed population.
+
+    @param filename String: Relative or absolute path of the new
+    population file.
+    @param metadata List: List of [organism, generation, parentA, 
+    parentB] of each organism.
+    @param genome Array: Array of alleles (organisms by ploidy by genes).
+    @param headerData List: Header data of population file (consisting 
+    of gene list and allelic frequencies).
+    """
+    outputfile = open(filename, "w")
+    for header in headerData:
+        outputfile.write(header + "\n")
+    block = max(1, 1000000 // max(1, genome.shape[1] * genome.shape[2]))
+    for first in range(0, len(metadata), block):
+        outputfile.write(_organism_lines(metadata[first:first + block],
+                                         genome[first:first + block]))
+    outputfile.close()
+
+def _genome_text(genome):
+    """!
+    Private function to format the alleles of organisms as text, where 
+    alleles are delimited by "|" and chromosome sets are delimited by 
+    ";". The alleles are formatted into one byte buffer by vectorized 
+    scatter of the digits of each allele, instead of formatting each 
+    allele as a string.
+
+    @param genome Array: Array of alleles (organisms by ploidy by genes).
+    @return: List of genome strings of organisms.
+    """
+    (organism_count, ploidy, gene_count) = genome.shape
+    if organism_count == 0 or ploidy == 0 or gene_count == 0:
+        return [";".join(["|".join(map(str, ploid)) for ploid in g]) 
+                for g in genome.tolist()]
+    values = genome.reshape(-1).astype(np.intp)
+    labels = [str(x).encode() for x in range(int(values.max()) + 1)]
+    lengths = np.array([len(label) for label in labels], dtype=np.intp)
+    digits = np.zeros((len(labels), int(lengths.max())), dtype=np.uint8)
+    for (value, label) in enumerate(labels):
+        digits[value, :len(label)] = np.frombuffer(label, dtype=np.uint8)
+    separator = np.full(ploidy * gene_count, ord("|"), dtype=np.uint8)
+    separator[gene_count - 1::gene_count] = ord(";")
+    separator[-1] = ord("\n")
+    if digits.shape[1] == 1:
+        # all alleles are single digits; hence, fixed width
+        buffer = np.empty(2 * len(values), dtype=np.uint8)
+        buffer[0::2] = digits[values, 0]
+        buffer[1::2] = np.tile(separator, organism_count)
+    else:
+        size = lengths[values] + 1
+        ends = np.cumsum(size)
+        starts = ends - size
+        buffer = np.empty(int(ends[-1]), dtype=np.uint8)
+        for digit in range(digits.shape[1]):
+            present = np.flatnonzero(size > digit + 1)
+            buffer[starts[present] + digit] = digits[values[present], digit]
+        buffer[ends - 1] = np.tile(separator, organism_count)
+    return buffer.tobytes().decode().split("\n")[:-1]
+
+def _organism_lines(metadata, genome):
+    """!
+    Private function to format organisms of an array-backed population 
+    as organism rows of population file.
+
+    @param metadata List: List of [organism, generation, parentA, 
+    parentB] of each organism.
+    @param genome Array: Array of alleles (organisms by ploidy by genes).
+    @return: String of organism rows.
+    """
+    return "".join(["O>%s>%s\n" % ("|".join([str(x) for x in m]), g)
+                    for (m, g) in zip(metadata, _genome_text(genome))])
+
+def _write_binary_header(f, geneData, alleleData, metadata, dtype, shape):
+    """!
+    Private function to write out the header of binary population file 
+    (see read_population_binary() function), which is followed by the 
+    allele matrix.
+
+    @param f Object: File object opened for writing in binary mode.
+    @param geneData String: Gene Names and the corresponding number of 
+    alleles, which is the first row of population file.
+    @param alleleData List: List of allele data rows of population file.
+    @param metadata List: List of [organism, generation, parentA, 
+    parentB] of each organism.
+    @param dtype Object: NumPy data type of alleles.
+    @param shape Tuple: Shape of allele matrix (organisms, ploidy, 
+    genes).
+    """
+    header = {"geneData": geneData,
+              "alleleData": list(alleleData),
+              "metadata": [[str(x) for x in m] for m in metadata],
+              "dtype": np.dtype(dtype).name,
+              "shape": [int(x) for x in shape]}
+    header = json.dumps(header).encode("utf-8")
+    f.write(BINARY_MAGIC)
+    f.write(len(header).to_bytes(8, "little"))
+    f.write(header)
+    f.write(b"\0" * (_binary_offset(len(header)) - f.tell()))
+
+def _write_population_binary(filename, geneData, alleleData, metadata, 
+                             genome):
+    """!
+    Private function to write out binary population file (see 
+    read_population_binary() function).
+
+    @param filename String: Relative or absolute path of the binary 
+    population file.
+    @param geneData String: Gene Names and the corresponding number of 
+    alleles, which is the first row of population file.
+    @param alleleData List: List of allele data rows of population file.
+    @param metadata List: List of [organism, generation, parentA, 
+    parentB] of each organism.
+    @param genome Array: Array of alleles (organisms by ploidy by genes).
+    """
+    genome = np.ascontiguousarray(genome, dtype=_allele_dtype(geneData))
+    with open(filename, "wb") as f:
+        _write_binary_header(f, geneData, alleleData, metadata, 
+                             genome.dtype, genome.shape)
+        genome.tofile(f)
+
+def _write_population(filename, geneData, alleleData, metadata, genome, 
+                      output_format="text"):
+    """!
+    Private function to write out array-backed population as text or 
+    binary population file.
+
+    @param filename String: Relative or absolute path of the population 
+    file.
+    @param geneData String: Gene Names and the corresponding number of 
+    alleles, which is the first row of population file.
+    @param alleleData List: List of allele data rows of population file.
+    @param metadata List: List of [organism, generation, parentA, 
+    parentB] of each organism.
+    @param genome Array: Array of alleles (organisms by ploidy by genes).
+    @param output_format String: Format of population file. Allowable 
+    values are "text" and "binary". Default = text.
+    """
+    if output_format.lower() == "binary":
+        _write_population_binary(filename, geneData, alleleData, 
+                                 metadata, genome)
+    else:
+        _simulation_writeout_array(filename, metadata, genome, 
+                                   [geneData] + list(alleleData))
+
+def _select_parents(rng, organism_count, population_size):
+    """!
+    Private function to randomly select pairs of different parents 
+    (random mating without possibility of self-mating).
+
+    @param rng Object: NumPy random number generator.
+    @param organism_count Integer: Number of organisms to select from.
+    @param population_size Integer: Number of pairs of parents.
+    @return: Array of parent indices (population_size by 2).
+    """
+    if organism_count < 2:
+        raise ValueError("At least 2 organisms are needed for mating")
+    parents = rng.integers(0, organism_count, size=(population_size, 2))
+    selfing = np.flatnonzero(parents[:, 0] == parents[:, 1])
+    while len(selfing) > 0:
+        parents[selfing] = rng.integers(0, organism_count, 
+                                        size=(len(selfing), 2))
+        selfing = selfing[parents[selfing, 0] == parents[selfing, 1]]
+    return parents
+
+def _gamete(rng, chromosomes, position):
+    """!
+    Private function to generate one gamete per organism from a 
+    chromosome pair with one crossover per chromosome pair; where either 
+    recombinant chromosome (chromosome 1 before crossover position and 
+    chromosome 2 after, or the reverse) is randomly chosen.
+
+    @param rng Object: NumPy random number generator.
+    @param chromosomes Array: Array of chromosome pairs (organisms by 
+    2 by genes).
+    @param position Array: Crossover position of each organism.
+    @return: Array of gametes (organisms by genes).
+    """
+    gene_count = chromosomes.shape[2]
+    before = np.arange(gene_count)[None, :] < position[:, None]
+    choice = rng.integers(0, 2, size=len(position)).astype(bool)
+    first = before != choice[:, None]
+    return np.where(first, chromosomes[:, 0, :], chromosomes[:, 1, :])
+
+def _simple_generation(rng, genome, population_size):
+    """!
+    Private function to produce the next generation of an array-backed 
+    population in simple simulation (see simulate_simple_array() 
+    function).
+
+    @param rng Object: NumPy random number generator.
+    @param genome Array: Array of alleles (organisms by 2 by genes).
+    @param population_size Integer: Population size of next generation.
+    @return: (array of parent indices (population_size by 2), array of 
+    alleles of next generation)
+    """
+    parents = _select_parents(rng, len(genome), population_size)
+    position = rng.integers(0, genome.shape[2] + 1, size=population_size)
+    new_genome = np.empty((population_size, 2, genome.shape[2]), 
+                          dtype=genome.dtype)
+    new_genome[:, 0, :] = _gamete(rng, genome[parents[:, 0]], position)
+    new_genome[:, 1, :] = _gamete(rng, genome[parents[:, 1]], position)
+    return (parents, new_genome)
+
+def simulate_simple_array(populationfile, generations, metadata, genome,
+                          population_size, headerData, seed=None,
+                          output_format="text"):
+    """!
+    Function to perform simple simulation (simulation type = simple) on 
+    an array-backed population (see read_population_array() function), 
+    where parent selection, crossovers and gamete choices of each 
+    generation are vectorized. The features of this simulation are the 
+    same as simulate_simple() function.
+
+    @param populationfile String: Relative or absolute path of the 
+    population file for simulation.
+    @param generations Integer: Number of generations to simulate. 
+    @param metadata List: List of [organism, generation, parentA, 
+    parentB] of each organism.
+    @param genome Array: Array of alleles (organisms by ploidy by genes).
+    @param population_size Integer: Population size.
+    @param headerData List: Header data of population file (consisting 
+    of gene list and allelic frequencies).
+    @param seed Integer: Seed for random number generator. Default = 
+    None.
+    @param output_format String: Format of population file of each 
+    generation. Allowable values are "text" and "binary" (see 
+    read_population_binary() function). Default = text.
+    """
+    rng = np.random.default_rng(seed)
+    population_size = int(population_size)
+    organismList = [str(x[0]) for x in metadata]
+    genome = genome[:, :2, :]
+    for gen_count in range(int(generations)):
+        gen_count = gen_count + 1
+        outputfile = '.'.join([populationfile, str(gen_count)])
+        (parents, new_genome) = _simple_generation(rng, genome, 
+                                                   population_size)
+        metadata = [[str(i), str(gen_count), 
+                     organismList[parents[i, 0]], 
+                     organismList[parents[i, 1]]]
+                    for i in range(population_size)]
+        print("Total %s organisms produced" % str(population_size))
+        _write_population(outputfile, headerData[0], headerData[1:], 
+                          metadata, new_genome, output_format)
+        organismList = [str(i) for i in range(population_size)]
+        genome = new_genome
+
 def simulate_population(populationfile, 
                         population_size, 
                         simulation_type='simple',
-                        generations=10):
+                        generations=10,
+                        engine='array',
+                        seed=None,
+                        output_format=None):
     """!
     Function to simulate population over generations, given a 
     population. Allowable simulation types are simple. For more 
@@ -335,7 +792,7 @@ def simulate_population(populationfile,
 
     Usage:
     
-        python island.py simulate --populationfile=test_pop --simulation_type=simple --population_size=10 --generations=10
+        python island.py simulate --populationfile=test_pop --simulation_type=simple --population_size=10 --generations=10 --engine=array --seed=1 --output_format=binary
 
     @param populationfile String: Relative or absolute path of the 
     population file for simulation.
@@ -348,7 +805,39 @@ def simulate_population(populationfile,
     which means that despite the generation in population file may be 
     50, the generation count in the results file will begin with 1. 
     Default = 10.
+    @param engine String: Population representation for simulation. 
+    Allowable values are "array" (array-backed population; see 
+    read_population_array() function) and "dict" (dictionary of 
+    organisms; see read_population_file() function). As simple 
+    simulation only uses the first 2 chromosome sets, organisms are 
+    trimmed to their first 2 chromosome sets in array-backed population; 
+    hence, organisms of different ploidy are accepted. Default = array.
+    @param seed Integer: Seed for random number generator of array-backed 
+    population. Default = None.
+    @param output_format String: Format of population file of each 
+    generation for array-backed population. Allowable values are "text" 
+    and "binary" (see read_population_binary() function). Text 
+    population files are formatted by vectorized formatting (see 
+    _genome_text() function), but binary population files are written 
+    without formatting and are faster for large populations. Default = 
+    None (same format as the population file for simulation).
     """
+    if output_format != None and \
+        output_format.lower() not in ["text", "binary"]:
+        raise ValueError("Unknown population file format: %s" % \
+            str(output_format))
+    if engine.upper() == 'ARRAY':
+        if output_format == None:
+            output_format = "binary" \
+                if is_binary_population(populationfile) else "text"
+        (geneData, alleleData, metadata, genome) = \
+            read_population_array(populationfile, 2)
+        headerData = [geneData] + alleleData
+        if simulation_type.upper() == 'SIMPLE':
+            simulate_simple_array(populationfile, generations, metadata, 
+                                  genome, population_size, headerData, 
+                                  seed, output_format)
+        return
     (geneData, alleleData, organismData, organisms) = \
         read_population_file(populationfile, False)
     headerData = [geneData] + alleleData
@@ -356,6 +845,202 @@ def simulate_population(populationfile,
         simulate_simple(populationfile, generations, organisms, 
                         population_size, headerData)
 
+_replicate_worker = {}
+
+def _initialize_replicate_worker(geneData, alleleData, metadata, genome):
+    """!
+    Private function to initialize a worker process of 
+    simulate_replicates() function with the starting population. When 
+    worker processes are forked, the starting population is shared 
+    (copy-on-write) instead of copied.
+
+    @param geneData String: Gene Names and the corresponding number of 
+    alleles, which is the first row of population file.
+    @param alleleData List: List of allele data rows of population file.
+    @param metadata List: List of [organism, generation, parentA, 
+    parentB] of each organism.
+    @param genome Array: Array of alleles (organisms by 2 by genes).
+    """
+    _replicate_worker["geneData"] = geneData
+    _replicate_worker["alleleData"] = alleleData
+    _replicate_worker["metadata"] = metadata
+    _replicate_worker["genome"] = genome
+
+def _replicate_summary(genome, geneData, alleleData):
+    """!
+    Private function to calculate the summary statistics of an 
+    array-backed population for simulate_replicates() function.
+
+    @param genome Array: Array of alleles (organisms by ploidy by genes).
+    @param geneData String: Gene Names and the corresponding number of 
+    alleles, which is the first row of population file.
+    @param alleleData List: List of allele data rows of population file.
+    @return: Dictionary of observed heterozygosity (proportion of 
+    heterozygous genes of organisms), expected heterozygosity (mean of 
+    1 - sum of squared allelic frequencies of genes), number of fixed 
+    genes (genes with only one allele), number of lost alleles (alleles 
+    not present), and normalized Chi Square statistic of allelic counts 
+    against the allelic frequencies of population file (as 
+    tabulate_allelic_counts() function, where alleles of zero expected 
+    count are excluded).
+    """
+    pop_size = genome.shape[0]
+    ploidy = genome.shape[1]
+    obs_allele_counts = _generate_observed_allelic_counts_array(genome, 
+                                                                geneData)
+    exp_allele_counts = _generate_expected_allelic_counts(alleleData, 
+                                                          pop_size, 
+                                                          ploidy)
+    expected_heterozygosity = 0.0
+    fixed_genes = 0
+    lost_alleles = 0
+    chiSq = 0.0
+    df = -1
+    for gene in obs_allele_counts:
+        counts = np.array(obs_allele_counts[gene], dtype=float)
+        frequency = counts / max(1.0, counts.sum())
+        expected_heterozygosity = expected_heterozygosity + \
+            1 - float((frequency ** 2).sum())
+        fixed_genes = fixed_genes + int((counts > 0).sum() == 1)
+        lost_alleles = lost_alleles + int((counts == 0).sum())
+        for allele in range(len(counts)):
+            if exp_allele_counts[gene][allele] > 0:
+                df = df + 1
+                chiSq = chiSq + \
+                    (((counts[allele] - exp_allele_counts[gene][allele]) \
+                        ** 2) / exp_allele_counts[gene][allele])
+    heterozygous = (genome != genome[:, :1, :]).any(axis=1)
+    return {"observed_heterozygosity": float(heterozygous.mean()) 
+                if heterozygous.size > 0 else 0.0,
+            "expected_heterozygosity": expected_heterozygosity / 
+                max(1, len(obs_allele_counts)),
+            "fixed_genes": fixed_genes,
+            "lost_alleles": lost_alleles,
+            "normalized_chisq": chiSq / max(1, df + 1)}
+
+def _simulate_replicate(arguments):
+    """!
+    Private function to run one replicate of simple simulation in a 
+    worker process of simulate_replicates() function.
+
+    @param arguments Tuple: (replicate number, seed sequence of the 
+    replicate, number of generations, population size, path of 
+    population file to write out the last generation or None)
+    @return: Dictionary of summary statistics of the replicate (see 
+    _replicate_summary() function).
+    """
+    (replicate, seed, generations, population_size, outputfile) = arguments
+    rng = np.random.default_rng(seed)
+    genome = _replicate_worker["genome"]
+    metadata = _replicate_worker["metadata"]
+    for gen_count in range(int(generations)):
+        (parents, genome) = _simple_generation(rng, genome, population_size)
+    if outputfile != None and int(generations) > 0:
+        if int(generations) == 1:
+            organismList = [str(x[0]) for x in metadata]
+        else:
+            organismList = [str(i) for i in range(population_size)]
+        metadata = [[str(i), str(int(generations)), 
+                     organismList[parents[i, 0]], 
+                     organismList[parents[i, 1]]]
+                    for i in range(population_size)]
+    summary = {"replicate": replicate,
+               "generations": int(generations),
+               "population_size": len(genome)}
+    summary.update(_replicate_summary(genome, 
+                                      _replicate_worker["geneData"], 
+                                      _replicate_worker["alleleData"]))
+    if outputfile != None:
+        _write_population_binary(outputfile, _replicate_worker["geneData"],
+                                 _replicate_worker["alleleData"], 
+                                 metadata, genome)
+    return summary
+
+def simulate_replicates(populationfile, population_size, replicates=10,
+                        simulation_type='simple', generations=10, 
+                        seed=None, workers=None, outputfile=None,
+                        writeout=False):
+    """!
+    Function to run replicates of population simulation, given a 
+    population, in parallel. The population file is read once into an 
+    array-backed population (see read_population_array() function) and 
+    shared with a pool of worker processes; where each replicate is 
+    simulated with an independent random number stream (spawned from 
+    seed) and only the summary statistics of the last generation of 
+    each replicate are collected into one table (replicate, generations, 
+    population_size, observed_heterozygosity, expected_heterozygosity, 
+    fixed_genes, lost_alleles, normalized_chisq). Allowable simulation 
+    types are simple (see simulate_simple() function).
+
+    Usage:
+
+        python island.py simulate_replicates --populationfile=test_pop --population_size=10 --replicates=100 --generations=10 --seed=1 --workers=4 --outputfile=test_pop.replicates.csv
+
+    @param populationfile String: Relative or absolute path of the 
+    population file for simulation.
+    @param population_size Integer: Population size.
+    @param replicates Integer: Number of replicates. Default = 10.
+    @param simulation_type String: Type of simulation to run. Default 
+    = simple.
+    @param generations Integer: Number of generations to simulate. 
+    Default = 10.
+    @param seed Integer: Seed for random number generator, from which 
+    the random number streams of replicates are spawned. Default = None.
+    @param workers Integer: Number of worker processes. Default = None 
+    (number of CPUs). If 1, the replicates are simulated without worker 
+    processes.
+    @param outputfile String: Relative or absolute path for writing 
+    out the table of summary statistics as comma-delimited file. 
+    Default = None (the table is only printed).
+    @param writeout Boolean: Flag to write out the last generation of 
+    each replicate as binary population file (see 
+    read_population_binary() function), named as <populationfile>.r<
+    replicate number>. Default = False.
+    """
+    if simulation_type.upper() != 'SIMPLE':
+        raise ValueError("Unknown simulation type: %s" % \
+            str(simulation_type))
+    populationfile = os.path.abspath(populationfile)
+    (geneData, alleleData, metadata, genome) = \
+        read_population_array(populationfile, 2)
+    genome = np.array(genome)
+    seeds = np.random.SeedSequence(seed).spawn(int(replicates))
+    tasks = [(replicate + 1, seeds[replicate], int(generations), 
+              int(population_size),
+              '.'.join([populationfile, "r" + str(replicate + 1)]) 
+                if writeout else None)
+             for replicate in range(int(replicates))]
+    if workers == None: workers = os.cpu_count() or 1
+    workers = max(1, min(int(workers), len(tasks)))
+    if workers == 1:
+        _initialize_replicate_worker(geneData, alleleData, metadata, 
+                                     genome)
+        summaries = [_simulate_replicate(task) for task in tasks]
+    else:
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        pool = context.Pool(workers, _initialize_replicate_worker,
+                            (geneData, alleleData, metadata, genome))
+        try:
+            summaries = pool.map(_simulate_replicate, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    columns = ["replicate", "generations", "population_size", 
+               "observed_heterozygosity", "expected_heterozygosity", 
+               "fixed_genes", "lost_alleles", "normalized_chisq"]
+    table = [",".join(columns)] + \
+        [",".join([str(summary[column]) for column in columns]) 
+         for summary in summaries]
+    for row in table:
+        print(row)
+    if outputfile != None:
+        outputfile = open(os.path.abspath(outputfile), "w")
+        outputfile.write("\n".join(table) + "\n")
+        outputfile.close()
+
 ######################################################################
 # Section 4: Analyze population operations
 ######################################################################
@@ -406,6 +1091,32 @@ def _generate_observed_allelic_counts(organisms, geneData):
     # print(allele_counts)
     return allele_counts
 
+def _generate_observed_allelic_counts_array(genome, geneData, 
+                                           block=1000):
+    """!
+    Private function to tabulate observed allelic counts from 
+    array-backed population, in blocks of organisms.
+
+    @param genome Array: Array of alleles (organisms by ploidy by genes).
+    @param geneData String: Gene Names and the corresponding number of 
+    alleles, which is the first row of population file.
+    @param block Integer: Number of organisms per block. Default = 1000.
+    """
+    geneData = geneData.split(">")
+    geneNames = [x.strip() for x in geneData[0].split("|")]
+    geneAlleles = [int(x.strip()) for x in geneData[1].split("|")]
+    offsets = np.concatenate([[0], np.cumsum(geneAlleles)[:-1]])
+    counts = np.zeros(sum(geneAlleles), dtype=np.int64)
+    for start in range(0, len(genome), int(block)):
+        alleles = np.asarray(genome[start:start+int(block)], dtype=np.int64)
+        alleles = alleles - 1 + offsets[None, None, :]
+        counts = counts + np.bincount(alleles.ravel(), 
+                                      minlength=len(counts))
+    counts = counts.tolist()
+    return dict([(geneNames[i], 
+                  counts[offsets[i]:offsets[i] + geneAlleles[i]])
+                 for i in range(len(geneNames))])
+
 def tabulate_allelic_counts(populationfile, ploidy=2, statistic="chisq"):
     """!
     Function to tabulate the expected and actual allelic counts from 
@@ -421,18 +1132,31 @@ def tabulate_allelic_counts(populationfile, ploidy=2, statistic="chisq"):
     (diploid).
     @param statistic String: Type of statistic to generate. Allowable 
     values are "chisq" (generates normalized Chi-Square statistic), and 
-    "count" (generates allelic counts).
+    "count" (generates allelic counts). Binary population file (see 
+    read_population_binary() function) is also accepted. Alleles of 
+    zero expected count are excluded from Chi-Square statistic and 
+    degrees of freedom.
     """
-    (geneData, alleleData, organismData, organisms) = \
-        read_population_file(populationfile, False)
+    if is_binary_population(populationfile):
+        (geneData, alleleData, metadata, genome) = \
+            read_population_binary(populationfile)
+        organisms = None
+        pop_size = len(metadata)
+    else:
+        (geneData, alleleData, organismData, organisms) = \
+            read_population_file(populationfile, False)
+        pop_size = len(organisms)
     statistic = statistic.lower()
-    pop_size = len(organisms)
     exp_allele_counts = _generate_expected_allelic_counts(alleleData, 
                                                           pop_size, 
                                                           ploidy)
     if statistic == "chisq":
-        obs_allele_counts = _generate_observed_allelic_counts(organisms, 
-                                                              geneData)
+        if organisms == None:
+            obs_allele_counts = \
+                _generate_observed_allelic_counts_array(genome, geneData)
+        else:
+            obs_allele_counts = \
+                _generate_observed_allelic_counts(organisms, geneData)
         chiSq = 0
         df = -1
         print("Gene Name : Allele : Expected Count : Observed Count")
@@ -442,11 +1166,12 @@ def tabulate_allelic_counts(populationfile, ploidy=2, statistic="chisq"):
                     (str(gene), str(allele),
                      str(exp_allele_counts[gene][allele]),
                      str(obs_allele_counts[gene][allele])))
-                df = df + 1
-                chiSq = chiSq + \
-                    (((obs_allele_counts[gene][allele] - \
-                        exp_allele_counts[gene][allele]) ** 2)  / \
-                    exp_allele_counts[gene][allele])
+                if exp_allele_counts[gene][allele] > 0:
+                    df = df + 1
+                    chiSq = chiSq + \
+                        (((obs_allele_counts[gene][allele] - \
+                            exp_allele_counts[gene][allele]) ** 2)  / \
+                        exp_allele_counts[gene][allele])
         print("Chi Square Statistic : %s" % str(chiSq))
         print("Degrees of Freedom : %i" % df)
         print("Normalized Chi Square Statistic : %s" % str(chiSq / (df + 1)))
@@ -477,9 +1202,17 @@ def combine_populations(populationfile1, populationfile2, outputfile):
     second population file to combine.
     @param putputfile String: Relative or absolute path for writing 
     out the combined population file.
+
+    If any of the population files is a binary population file (see 
+    read_population_binary() function), the combined population file 
+    will be in the format of the first population file.
     """
     populationfile1 = os.path.abspath(populationfile1)
     populationfile2 = os.path.abspath(populationfile2)
+    if is_binary_population(populationfile1) or \
+        is_binary_population(populationfile2):
+        return _combine_populations_array(populationfile1, 
+                                          populationfile2, outputfile)
     outputmapfile = outputfile + ".map"
     outputfile = os.path.abspath(outputfile)
     outputfile = open(outputfile, "w")
@@ -527,6 +1260,53 @@ def combine_populations(populationfile1, populationfile2, outputfile):
     outputmapfile.close()
     outputfile.close()
 
+def _combine_populations_array(populationfile1, populationfile2, 
+                               outputfile):
+    """!
+    Private function called by combine_populations() function to combine 
+    population files as array-backed populations, when any of the 
+    population files is a binary population file.
+
+    @param populationfile1 String: Absolute path of the first 
+    population file to combine.
+    @param populationfile2 String: Absolute path of the second 
+    population file to combine.
+    @param putputfile String: Relative or absolute path for writing 
+    out the combined population file.
+
+    The population files must have the same ploidy and number of genes, 
+    as the combined population is held in one array.
+    """
+    output_format = "binary" \
+        if is_binary_population(populationfile1) else "text"
+    print("Read population file %s" % str(populationfile1))
+    (geneData1, alleleData1, metadata1, genome1) = \
+        read_population_array(populationfile1)
+    print("Read population file %s" % str(populationfile2))
+    (_, _, metadata2, genome2) = read_population_array(populationfile2)
+    if genome1.shape[1:] != genome2.shape[1:]:
+        raise ValueError("Different ploidy or number of genes in %s %s and %s %s" % \
+            (populationfile1, str(genome1.shape[1:]), 
+             populationfile2, str(genome2.shape[1:])))
+    outputmapfile = open(os.path.abspath(outputfile + ".map"), "w")
+    outputfile = os.path.abspath(outputfile)
+    print("Combine populations")
+    metadata = []
+    count = 0
+    for (populationfile, organisms) in [(populationfile1, metadata1),
+                                        (populationfile2, metadata2)]:
+        for org in organisms:
+            mapdata = "%s:%s>%s" % (populationfile, str(org[0]), str(count))
+            print(mapdata)
+            outputmapfile.write(mapdata + "\n")
+            metadata.append([str(count)] + list(org[1:]))
+            count = count + 1
+    _write_population(outputfile, geneData1, alleleData1, metadata, 
+                      np.concatenate([genome1, genome2]), output_format)
+    print("Total number of combined organisms = %s" % \
+        str(count))
+    outputmapfile.close()
+
 def randomly_select_population(populationfile, outputfile, n):
     """!
     Function to randomly select n organisms from a population file into 
@@ -541,11 +1321,25 @@ def randomly_select_population(populationfile, outputfile, n):
     @param putputfile String: Relative or absolute path for writing 
     out the randomly selected population file.
     @param n Integer: Number of organisms to select.
+
+    If the population file is a binary population file (see 
+    read_population_binary() function), the selected population file 
+    will be a binary population file.
     """
     populationfile = os.path.abspath(populationfile)
     outputfile = os.path.abspath(outputfile)
     print("Sample %s organisms from %s into %s" % \
         (str(int(n)), populationfile, outputfile))
+    if is_binary_population(populationfile):
+        (geneData, alleleData, metadata, genome) = \
+            read_population_binary(populationfile)
+        selected = list(range(len(metadata)))
+        random.shuffle(selected)
+        selected = selected[:int(n)]
+        _write_population_binary(outputfile, geneData, alleleData,
+                                 [metadata[i] for i in selected], 
+                                 genome[selected])
+        return
     outputfile = open(outputfile, "w")
     (geneData, alleleData, organismData, _) = \
         read_population_file(populationfile, False)
@@ -565,17 +1359,47 @@ def randomly_select_population(populationfile, outputfile, n):
         outputfile.write(organismData + "\n")
         # print(organismData)
     outputfile.close()
+
+def convert_population(populationfile, outputfile, output_format="binary"):
+    """!
+    Function to convert population file between text and binary 
+    population file (see read_population_binary() function).
+
+    Usage:
+
+        python island.py convertpop --populationfile=test_pop --outputfile=test_pop.bin --output_format=binary
+
+    @param populationfile String: Relative or absolute path of the 
+    population file to convert.
+    @param outputfile String: Relative or absolute path for writing 
+    out the converted population file.
+    @param output_format String: Format of converted population file. 
+    Allowable values are "text" and "binary". Default = binary.
+    """
+    if output_format.lower() not in ["text", "binary"]:
+        raise ValueError("Unknown population file format: %s" % \
+            str(output_format))
+    (geneData, alleleData, metadata, genome) = \
+        read_population_array(populationfile)
+    _write_population(os.path.abspath(outputfile), geneData, alleleData, 
+                      metadata, genome, output_format)
+    print("Converted %s organisms from %s into %s (%s)" % \
+        (str(len(metadata)), os.path.abspath(populationfile), 
+         os.path.abspath(outputfile), output_format.lower()))
+
 ######################################################################
 # Section 6: Command-line executor
 ######################################################################
 if __name__ == '__main__':
     exposed_functions = {
         'combinepop': combine_populations,
+        'convertpop': convert_population,
         'gpop': generate_population,
         'random': randomly_select_population,
         'readpf': read_parameter_file,
         'readpop': read_population_file,
         'simulate': simulate_population,
+        'simulate_replicates': simulate_replicates,
         'tabulateCount': tabulate_allelic_counts
         }
     fire.Fire(exposed_functions)
@@ -57,15 +57,238 @@ except ImportError:
     import fire
 
 
+class PackedSequence(object):
+    '''!
+    Class to hold a nucleotide sequence in 2-bit packed form (4 bases
+    per byte). Bases other than A, C, G, and T (such as N, U, and IUPAC
+    ambiguity codes) are kept as a list of exception runs, and lowercase
+    (soft-masked) regions are kept as a list of mask runs; hence, the
+    original sequence can be fully recovered. Slicing returns a string,
+    while reverse complement and k-mer extraction work on the packed
+    form directly.
+    '''
+    _complement = str.maketrans('ACGTUMRWSYKVHDBN', 'TGCAAKYWSRMBDHVN')
+    _kmerBlock = 1048576
+
+    def __init__(self, sequence=''):
+        '''!
+        Constructor method.
+
+        @param sequence String: Nucleotide sequence to pack. Biopython
+        Seq object is also accepted.
+        '''
+        import numpy as np
+        raw = np.frombuffer(str(sequence).encode(), dtype=np.uint8)
+        self.length = len(raw)
+        lowercase = (raw >= 97) & (raw <= 122)
+        upper = np.where(lowercase, raw - 32, raw).astype(np.uint8)
+        encoder = np.full(256, 255, dtype=np.uint8)
+        for (code, base) in enumerate(b'ACGT'):
+            encoder[base] = code
+        codes = encoder[upper]
+        unpackable = codes == 255
+        self.exceptions = [(start, end, chr(upper[start]))
+                           for (start, end)
+                           in self._runs(unpackable, upper)]
+        self.mask = self._runs(lowercase)
+        self._exceptionEnds = [run[1] for run in self.exceptions]
+        self._maskEnds = [run[1] for run in self.mask]
+        codes[unpackable] = 0
+        codes = np.concatenate([codes, np.zeros((-self.length) % 4,
+                                                dtype=np.uint8)])
+        codes = codes.reshape(-1, 4)
+        self.data = (codes[:, 0] << 6) | (codes[:, 1] << 4) | \
+                    (codes[:, 2] << 2) | codes[:, 3]
+
+    @staticmethod
+    def _runs(flags, values=None):
+        '''!
+        Private method to find runs of consecutive True flags. If values
+        is given, a run is also broken when the value changes.
+
+        @param flags Array: Boolean array.
+        @param values Array: Values to break runs on. Default = None.
+        @return: List of (start, end) where end is exclusive.
+        '''
+        import numpy as np
+        positions = np.flatnonzero(flags)
+        if len(positions) == 0:
+            return []
+        breaks = np.diff(positions) != 1
+        if values is not None:
+            breaks = breaks | (np.diff(values[positions].astype(int)) != 0)
+        breaks = np.flatnonzero(breaks)
+        starts = [positions[0]] + list(positions[breaks + 1])
+        ends = list(positions[breaks] + 1) + [positions[-1] + 1]
+        return [(int(s), int(e)) for (s, e) in zip(starts, ends)]
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return self._decode(0, self.length)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            (start, stop, step) = index.indices(self.length)
+            if step == 1:
+                return self._decode(start, max(start, stop))
+            return self._decode(0, self.length)[index]
+        index = int(index)
+        if index < 0:
+            index = index + self.length
+        if index < 0 or index >= self.length:
+            raise IndexError('PackedSequence index out of range')
+        return self._decode(index, index + 1)
+
+    def _codes(self, start, end):
+        '''!
+        Private method to unpack the 2-bit codes (A = 0, C = 1, G = 2,
+        T = 3) of the sequence between start (inclusive) and end
+        (exclusive).
+        '''
+        import numpy as np
+        block = self.data[start // 4:(end + 3) // 4]
+        codes = np.empty((len(block), 4), dtype=np.uint8)
+        codes[:, 0] = block >> 6
+        codes[:, 1] = (block >> 4) & 3
+        codes[:, 2] = (block >> 2) & 3
+        codes[:, 3] = block & 3
+        offset = start % 4
+        return codes.ravel()[offset:offset + end - start]
+
+    def _decode(self, start, end):
+        '''!
+        Private method to decode the sequence between start (inclusive)
+        and end (exclusive) into a string.
+        '''
+        import bisect
+        import numpy as np
+        if end <= start:
+            return ''
+        chars = np.frombuffer(b'ACGT', dtype=np.uint8)[self._codes(start, end)]
+        i = bisect.bisect_right(self._exceptionEnds, start)
+        while i < len(self.exceptions) and self.exceptions[i][0] < end:
+            (s, e, base) = self.exceptions[i]
+            chars[max(s, start) - start:min(e, end) - start] = ord(base)
+            i = i + 1
+        i = bisect.bisect_right(self._maskEnds, start)
+        while i < len(self.mask) and self.mask[i][0] < end:
+            (s, e) = self.mask[i]
+            chars[max(s, start) - start:min(e, end) - start] += 32
+            i = i + 1
+        return chars.tobytes().decode()
+
+    def reverse_complement(self):
+        '''!
+        Method to generate the reverse complement of the sequence,
+        without unpacking the sequence.
+
+        @return: PackedSequence object of the reverse complement.
+        '''
+        import numpy as np
+        table = np.arange(256, dtype=np.uint8)
+        table = ((3 - (table & 3)) << 6) | ((3 - ((table >> 2) & 3)) << 4) | \
+                ((3 - ((table >> 4) & 3)) << 2) | (3 - (table >> 6))
+        data = table[self.data[::-1]]
+        shift = 2 * ((-self.length) % 4)
+        if shift > 0 and len(data) > 0:
+            following = np.append(data[1:], np.uint8(0))
+            data = ((data.astype(np.uint16) << shift) |
+                    (following >> (8 - shift))).astype(np.uint8)
+        rc = PackedSequence.__new__(PackedSequence)
+        rc.length = self.length
+        rc.data = data
+        rc.exceptions = [(self.length - e, self.length - s,
+                          base.translate(self._complement))
+                         for (s, e, base) in reversed(self.exceptions)]
+        rc.mask = [(self.length - e, self.length - s)
+                   for (s, e) in reversed(self.mask)]
+        rc._exceptionEnds = [run[1] for run in rc.exceptions]
+        rc._maskEnds = [run[1] for run in rc.mask]
+        return rc
+
+    def translate(self, *args, **kwargs):
+        '''!
+        Method to translate the sequence into amino acid sequence, using
+        translate function in Biopython.
+
+        @return: Biopython Seq object of the amino acid sequence.
+        '''
+        return Seq(str(self)).translate(*args, **kwargs)
+
+    def kmers(self, k):
+        '''!
+        Method to extract all k-mers (up to 32-mers) as 2-bit encoded
+        integers, where the first base is the most significant. K-mers
+        overlapping any exception (such as N) are excluded. The k-mers
+        are built from the packed data in blocks of k-mer positions, so
+        the sequence is never unpacked as a whole. Use decodeKmer()
+        method to convert an encoded k-mer into a string.
+
+        @param k Integer: Size of k-mer.
+        @return: (positions, kmers) where positions is an array of start
+        positions and kmers is an array of encoded k-mers.
+        '''
+        import bisect
+        import numpy as np
+        k = int(k)
+        if k < 1 or k > 32:
+            raise ValueError('k must be between 1 and 32')
+        if self.length < k:
+            return (np.array([], dtype=np.int64),
+                    np.array([], dtype=np.uint64))
+        windows = self.length - k + 1
+        positions = []
+        kmers = []
+        for start in range(0, windows, self._kmerBlock):
+            end = min(start + self._kmerBlock, windows)
+            count = end - start
+            codes = self._codes(start, end + k - 1).astype(np.uint64)
+            block = np.zeros(count, dtype=np.uint64)
+            for j in range(k):
+                block = (block << np.uint64(2)) | codes[j:j + count]
+            valid = np.ones(count, dtype=bool)
+            i = bisect.bisect_right(self._exceptionEnds, start)
+            while i < len(self.exceptions) and \
+                    self.exceptions[i][0] < end + k - 1:
+                (s, e, _) = self.exceptions[i]
+                valid[max(s - k + 1, start) - start:min(e, end) - start] = False
+                i = i + 1
+            index = np.flatnonzero(valid)
+            positions.append(index.astype(np.int64) + start)
+            kmers.append(block[index])
+        return (np.concatenate(positions), np.concatenate(kmers))
+
+    @staticmethod
+    def decodeKmer(kmer, k):
+        '''!
+        Method to convert an encoded k-mer from kmers() method into a
+        string.
+
+        @param kmer Integer: Encoded k-mer.
+        @param k Integer: Size of k-mer.
+        @return: K-mer string.
+        '''
+        kmer = int(kmer)
+        return ''.join(['ACGT'[(kmer >> (2 * (int(k) - 1 - j))) & 3]
+                        for j in range(int(k))])
+
+
 class CodonUsageBias(object):
     '''!
     Class to hold the core methods for codon usage bias analysis.
     '''
 
-    def __init__(self):
+    def __init__(self, packed=False):
         '''!
         Constructor method.
+
+        @param packed Boolean: Flag to store nucleotide sequences as
+        PackedSequence objects (2 bits per base) instead of Biopython
+        Seq objects. Default = False.
         '''
+        self.packed = packed
         self.seqNN = {}
         self.codonCount = {}
         self.aalist = ['A', 'C', 'D', 'E', 'F', 
@@ -78,12 +301,16 @@ class CodonUsageBias(object):
         '''!
         Method to add sequences from FASTA file into data structure. 
         This allows for sequences to be added from multiple FASTA 
-        files.
+        files. If packed flag is set, sequences will be stored as 
+        PackedSequence objects.
 
         @param fastafile String: Path to the FASTA file to add.
         '''
         for r in SeqIO.parse(fastafile, 'fasta'):
-            self.seqNN[r.id] = [r.seq, r.description]
+            if self.packed:
+                self.seqNN[r.id] = [PackedSequence(r.seq), r.description]
+            else:
+                self.seqNN[r.id] = [r.seq, r.description]
 
     def generateCodonCount(self, seq, genetic_code=1):
         '''!
@@ -363,28 +590,89 @@ def nucleotideLength(fastafile):
         nnseq = o.seqNN[k][0]
         print('%s : %s' % (k, str(len(str(nnseq)))))
 
-def complement(fastafile):
+def _fastaRecordOffsets(fastafile):
     '''!
-    Function to generate the complement sequence of each FASTA record. 
-    This is done using reverse_complement function in Biopython - each 
-    FASTA sequence is assumed to be in 5'-->3', this function will 
-    generate the complementary sequence in 5'-->3' orientation rather 
-    than 3'<--5' orientation.
+    Private function to scan a FASTA file and locate the sequence
+    portion of each FASTA record as byte offsets, without holding any
+    sequence in memory.
+
+    @param fastafile String: Path to the FASTA file to be processed.
+    @return: Generator of (sequence ID, start offset, end offset) where
+    the sequence lines of the record lies between start offset
+    (inclusive) and end offset (exclusive).
+    '''
+    ID = None
+    start = 0
+    offset = 0
+    with open(fastafile, 'rb') as f:
+        for line in f:
+            if line.startswith(b'>'):
+                if ID is not None:
+                    yield (ID, start, offset)
+                ID = line[1:].split()
+                ID = ID[0].decode() if len(ID) > 0 else ''
+                start = offset + len(line)
+            offset = offset + len(line)
+    if ID is not None:
+        yield (ID, start, offset)
+
+def complement(fastafile, width=60, chunksize=1048576):
+    '''!
+    Function to generate the complement sequence of each FASTA record.
+    Each FASTA sequence is assumed to be in 5'-->3', this function will
+    generate the complementary sequence in 5'-->3' orientation rather
+    than 3'<--5' orientation. IUPAC ambiguity codes are complemented
+    in the same way as reverse_complement function in Biopython.
+
+    The sequences are not loaded into memory. Instead, each record is
+    read in chunks from its end, complemented using a translation
+    table, and written out as wrapped lines; hence, memory usage is
+    proportional to chunksize rather than the length of the sequence.
 
     Usage:
 
-        python seqproperties.py complement --fastafile=<FASTA file path> 
+        python seqproperties.py complement --fastafile=<FASTA file path> --width=60 --chunksize=1048576
 
     The output will be in FASTA format.
 
     @param fastafile String: Path to the FASTA file to be processed.
+    @param width Integer: Number of bases per line in the output. If
+    width is 0, each sequence will be written as a single line.
+    Default = 60.
+    @param chunksize Integer: Number of bytes to read from the FASTA
+    file at a time. Default = 1048576 (1 MB).
     '''
-    o = CodonUsageBias()
-    o.addSequencesFromFasta(fastafile)
-    for k in o.seqNN:
-        nnseq = o.seqNN[k][0]
-        print("> %s" % k)
-        print(str(nnseq.reverse_complement()))
+    table = bytes.maketrans(b'ACGTUMRWSYKVHDBNacgtumrwsykvhdbn',
+                            b'TGCAAKYWSRMBDHVNtgcaakywsrmbdhvn')
+    width = int(width)
+    chunksize = int(chunksize)
+    with open(fastafile, 'rb') as f:
+        for (k, start, end) in _fastaRecordOffsets(fastafile):
+            sys.stdout.write("> %s\n" % k)
+            pending = b''
+            empty = True
+            position = end
+            while position > start:
+                size = min(chunksize, position - start)
+                position = position - size
+                f.seek(position)
+                chunk = f.read(size).translate(table, b' \t\r\n')[::-1]
+                if width > 0:
+                    pending = pending + chunk
+                    cut = len(pending) - (len(pending) % width)
+                    lines = [pending[i:i+width]
+                             for i in range(0, cut, width)]
+                    if len(lines) > 0:
+                        sys.stdout.write(b'\n'.join(lines).decode() + '\n')
+                        empty = False
+                    pending = pending[cut:]
+                else:
+                    sys.stdout.write(chunk.decode())
+            if width > 0:
+                if len(pending) > 0 or empty:
+                    sys.stdout.write(pending.decode() + '\n')
+            else:
+                sys.stdout.write('\n')
 
 def flattenCodonCount(CC):
     '''!
@@ -1148,7 +1436,7 @@ def nGram(fastafile, molecule, n):
         table = ' : '.join(table)
         print('%s : %s : %s' % (k, result, table))
 
-def hasReverse(fastafile, molecule, min, max, suffix=''):
+def hasReverse(fastafile, molecule, min, max, suffix='', packed=False):
     '''!
     Function to process each FASTA record for the presence of 
     a sub-sequence and its reverse. For example, this is to see 
@@ -1156,7 +1444,7 @@ def hasReverse(fastafile, molecule, min, max, suffix=''):
 
     Usage:
 
-        python seqproperties.py reverse --fastafile=<FASTA file path> --molecule=<molecule type> --suffix=<substring to start sequence with> --min=3 --max=5
+        python seqproperties.py reverse --fastafile=<FASTA file path> --molecule=<molecule type> --suffix=<substring to start sequence with> --min=3 --max=5 --packed=False
 
     The output will be in the format of:
 
@@ -1173,13 +1461,20 @@ def hasReverse(fastafile, molecule, min, max, suffix=''):
     @param suffix String: Defining the starting portion of the 
     sub-sequence - this is to enable the search for longer sub-
     sequence without running out of memory. Default = ''.
+    @param packed Boolean: Flag to hold the sequences in 2-bit packed 
+    form (only for DNA sequences; ValueError is raised for other 
+    molecules), which allows about 4 times more sequences to be held 
+    in memory. Default = False.
     '''
+    if packed and molecule != 'DNA':
+        raise ValueError('Packed sequences are only for DNA molecule: ' + \
+                         str(molecule))
     def _generateReverseSequence(k, n, nonEmpty):
         for item in nonEmpty:
             rItem = ''.join(reversed(item))
             if rItem in nonEmpty:
                 print('%s : %s : %s : %s' % (k, n, item, rItem))
-    o = CodonUsageBias()
+    o = CodonUsageBias(packed)
     o.addSequencesFromFasta(fastafile)
     if molecule == 'DNA':
         sequence = ['A', 'T', 'G', 'C', '*']
@@ -1190,12 +1485,21 @@ def hasReverse(fastafile, molecule, min, max, suffix=''):
                     'K', 'L', 'M', 'N', 'P', 'Q', 'R', 'S', 
                     'T', 'V', 'W', 'Y', '*']
     for k in o.seqNN:
+        seq = o.seqNN[k][0]
         for n in range(min, max+1):
-            seq = o.seqNN[k][0]
             seqD = _dictionaryGenerator(sequence, n, suffix)
-            for i in range(len(seq)-n):
-                s = seq[i:i+n]
-                seqD[s] = seqD[s] + 1
+            if packed:
+                import numpy as np
+                (positions, kmers) = seq.kmers(n)
+                (kmers, counts) = np.unique(kmers[positions < len(seq)-n],
+                                            return_counts=True)
+                for (kmer, count) in zip(kmers, counts):
+                    s = PackedSequence.decodeKmer(kmer, n)
+                    seqD[s] = seqD[s] + int(count)
+            else:
+                for i in range(len(seq)-n):
+                    s = seq[i:i+n]
+                    seqD[s] = seqD[s] + 1
             nonEmpty = [k1 for k1 in seqD if seqD[k1] > 0]
             _generateReverseSequence(k, n, nonEmpty)
 
@@ -1307,14 +1611,14 @@ def propensity(datafile, separator=',', header=False):
         result = (nAB / nXB) / (nAX / nXX)
         print('%s : %s' % (seq, result))
 
-def pairwise_alignment(fastafile, algorithm='local'):
+def pairwise_alignment(fastafile, algorithm='local', packed=False):
     '''!
     Function to take a FASTA file and calculate pairwise alignments 
     between all the sequences in the file.
 
     Usage:
 
-        python seqproperties.py palign --fastafile=<FASTA file path> --algorithm=local
+        python seqproperties.py palign --fastafile=<FASTA file path> --algorithm=local --packed=False
 
     The output will be in the format of
 
@@ -1331,8 +1635,11 @@ def pairwise_alignment(fastafile, algorithm='local'):
     @param algorithm String: Type of pairwise alignment algorithm to 
     use. Allowable values are 'local' (Smith-Waterman algorithm) 
     and 'global' (Needleman-Wunsch algorithm). Default = local.
+    @param packed Boolean: Flag to hold the sequences in 2-bit packed 
+    form (only for DNA sequences), which allows about 4 times more 
+    sequences to be held in memory. Default = False.
     '''
-    o = CodonUsageBias()
+    o = CodonUsageBias(packed)
     o.addSequencesFromFasta(fastafile)
     aligner = Align.PairwiseAligner()
     aligner.mode = str(algorithm)
@@ -1341,8 +1648,8 @@ def pairwise_alignment(fastafile, algorithm='local'):
     reduced_set = [k for k in o.seqNN]
     for k in o.seqNN:
         reduced_set = [k1 for k1 in reduced_set if k1 != k]
+        sequenceA = str(o.seqNN[k][0])
         for k1 in reduced_set:
-            sequenceA = str(o.seqNN[k][0])
             sequenceB = str(o.seqNN[k1][0])
             score = aligner.score(sequenceA, sequenceB)
             print('%s : %s : %s : %s' % (str(count), str(score), 
@@ -1423,7 +1730,8 @@ def pairwise_alignment2(queryfile, dbfile,
             count = count + 1
 
 def findORF(fastafile, min_length=33, max_length=105000, outfmt="CSV", 
-            start_codons="TTG,CTG,ATG", stop_codons="TAA,TAG,TGA"):
+            start_codons="TTG,CTG,ATG", stop_codons="TAA,TAG,TGA", 
+            packed=False):
     '''!
     Function to find open reading frames (ORF) for each FASTA record 
     in a given FASTA file. An ORF is basically computed as a stretch 
@@ -1431,7 +1739,7 @@ def findORF(fastafile, min_length=33, max_length=105000, outfmt="CSV",
 
     Usage:
 
-        python seqproperties.py orf --start_codons="TTG,CTG,ATG" --stop_codons="TAA,TAG,TGA" --fastafile=<fasta file path> --min_length=33 --max_length=105000 --outfmt=CSV-NS
+        python seqproperties.py orf --start_codons="TTG,CTG,ATG" --stop_codons="TAA,TAG,TGA" --fastafile=<fasta file path> --min_length=33 --max_length=105000 --outfmt=CSV-NS --packed=False
 
     The CSV output will be in the format of:
 
@@ -1459,8 +1767,11 @@ def findORF(fastafile, min_length=33, max_length=105000, outfmt="CSV",
     is no stop codons within the sequence. Secondly, it can be used 
     to cap the stop of a newly generated sequence.Default = 
     "TAA,TAG,TGA".
+    @param packed Boolean: Flag to hold the sequences in 2-bit packed 
+    form, which allows about 4 times more sequences to be held in 
+    memory. Default = False.
     '''
-    q = CodonUsageBias()
+    q = CodonUsageBias(packed)
     q.addSequencesFromFasta(fastafile)
     if type(start_codons) is str:
         start_codons = start_codons.strip()
@@ -1524,7 +1835,7 @@ def findORF(fastafile, min_length=33, max_length=105000, outfmt="CSV",
                      str(coord[1]-coord[0])))
                 print(seq[coord[0]:coord[1]])
             count = count + 1
-        rev_seq = str(Seq(seq, generic_dna).reverse_complement())
+        rev_seq = str(q.seqNN[k][0].reverse_complement())
         start_locations = [list(find_all(rev_seq, start)) 
                            for start in start_codons]
         start_locations = [item for sublist in start_locations 
@@ -1551,15 +1862,77 @@ def findORF(fastafile, min_length=33, max_length=105000, outfmt="CSV",
                 print(seq[coord[0]:coord[1]])
             count = count + 1
 
+def _randomSeeds(seed=None, n=1):
+    '''!
+    Private function to derive independent seeds for n random number 
+    streams (such as one per replicate) from one seed, using NumPy 
+    SeedSequence.spawn. As each replicate always gets the same stream, 
+    results are identical regardless of the number of workers.
+
+    @param seed Integer: Seed. If None, fresh entropy from the operating 
+    system will be used. Default = None.
+    @param n Integer: Number of streams. Default = 1.
+    @return: List of integer seeds, to be used as random.Random(seed).
+    '''
+    import numpy as np
+    if seed is not None:
+        seed = int(seed)
+    children = np.random.SeedSequence(seed).spawn(int(n))
+    return [int.from_bytes(child.generate_state(4).tobytes(), "little")
+            for child in children]
+
+def _randomStreams(seed=None, n=1):
+    '''!
+    Private function to generate n independent random number generators 
+    from one seed. See _randomSeeds() function.
+
+    @param seed Integer: Seed. Default = None.
+    @param n Integer: Number of streams. Default = 1.
+    @return: List of random.Random objects.
+    '''
+    return [random.Random(s) for s in _randomSeeds(seed, n)]
+
+_workerData = None
+
+def _initializeWorker(data):
+    '''!
+    Private function to hold shared data in each worker process, for 
+    replicates to be executed in parallel.
+    '''
+    global _workerData
+    _workerData = data
+
+def _runReplicates(function, data, arguments, workers=1):
+    '''!
+    Private function to execute replicates, either sequentially or in 
+    parallel using a pool of worker processes. Results are returned in 
+    the order of arguments.
+
+    @param function Function: Module-level function to execute for each 
+    replicate, taking a tuple of arguments and reading shared data from 
+    _workerData.
+    @param data Object: Shared data for all replicates.
+    @param arguments List: Tuple of arguments for each replicate.
+    @param workers Integer: Number of worker processes. Default = 1.
+    @return: List of results.
+    '''
+    if int(workers) <= 1:
+        _initializeWorker(data)
+        return [function(args) for args in arguments]
+    import multiprocessing
+    with multiprocessing.Pool(int(workers), _initializeWorker, 
+                              (data,)) as pool:
+        return pool.map(function, arguments)
+
 def random_selection(fastafile, n=250, with_replacement=True, 
-                     outfmt='fasta'):
+                     outfmt='fasta', seed=None):
     '''!
     Function to select a random set of sequences from a given FASTA 
     file.
 
     Usage:
 
-        python seqproperties.py rselect --fastafile=<fasta file path> --n=250 --with_replacement=True --outfmt=fasta
+        python seqproperties.py rselect --fastafile=<fasta file path> --n=250 --with_replacement=True --outfmt=fasta --seed=<seed>
 
     The linear output format will be:
 
@@ -1573,12 +1946,15 @@ def random_selection(fastafile, n=250, with_replacement=True,
     @param outfmt String: Type of output. Allowable options are "linear" 
     (ID line and sequence in the same line) or "fasta" (FASTA format). 
     Default = 'fasta'
+    @param seed Integer: Seed for random number generator. Default = 
+    None (not reproducible).
     '''
+    rng = _randomStreams(seed, 1)[0]
     q = CodonUsageBias()
     q.addSequencesFromFasta(fastafile)
     selection = []
     while len(selection) < int(n):
-        s = random.sample(list(q.seqNN), k=1)[0]
+        s = rng.sample(list(q.seqNN), k=1)[0]
         if str(with_replacement) == "True" and (s not in selection):
             selection.append((s, q.seqNN[s]))
         else:
@@ -1596,7 +1972,7 @@ def random_selection(fastafile, n=250, with_replacement=True,
 def pointMutationOverGenerations(organisms=100, length=1000, bases="DNA", 
                                  mutations=10, mutation_rate=-1,
                                  algorithm="local", 
-                                 generations=100, tests=100):
+                                 generations=100, tests=100, seed=None):
     """!
     Function to perform naive simulation of a population of sequences 
     over a number of generations and sample the sequence diversity at 
@@ -1613,7 +1989,7 @@ def pointMutationOverGenerations(organisms=100, length=1000, bases="DNA",
 
     Usage:
 
-        python seqproperties.py pmog --organisms=100 --length=1000 --bases=DNA --mutations=10 --mutation_rate=-1 --algorithm=local --generations=100 --tests=100
+        python seqproperties.py pmog --organisms=100 --length=1000 --bases=DNA --mutations=10 --mutation_rate=-1 --algorithm=local --generations=100 --tests=100 --seed=<seed>
 
     The CSV output will be in the format of:
 
@@ -1638,6 +2014,9 @@ def pointMutationOverGenerations(organisms=100, length=1000, bases="DNA",
     Default = 1000
     @param tests Integer: Number of pairwise alignments per generation. 
     Default = 100
+    @param seed Integer: Seed for random number generator. Each organism 
+    has its own random number stream for mutations, derived from the 
+    seed. Default = None (not reproducible).
     """
     if bases == "DNA":
         bases = [x for x in "ATGC"]
@@ -1653,25 +2032,28 @@ def pointMutationOverGenerations(organisms=100, length=1000, bases="DNA",
     elif algorithm == "global":
         aligner = Align.PairwiseAligner()
         aligner.mode = "global"
-    seq = [''.join([random.choice(bases) for i in range(int(length))])] * int(organisms)
+    streams = _randomStreams(seed, int(organisms) + 1)
+    rng = streams[0]
+    seq = [''.join([rng.choice(bases) for i in range(int(length))])] * int(organisms)
     score_header = ','.join(["Score_" + str(i+1) for i in range(tests)])
     print("Generation,%s" % score_header)
     mutation_rate = float(mutation_rate)
-    def mutate(s, mutation_rate, mutations):
+    def mutate(s, mutation_rate, mutations, orgRNG):
         s = [base for base in s]
         if mutation_rate < 0:
             for m in range(int(mutations)):
-                s[random.randint(0, len(s)-1)] = random.choice(bases)
+                s[orgRNG.randint(0, len(s)-1)] = orgRNG.choice(bases)
         else:
             for position in range(len(s)):
-                if random.random() <= mutation_rate:
-                    s[position] = random.choice(bases)
+                if orgRNG.random() <= mutation_rate:
+                    s[position] = orgRNG.choice(bases)
         return ''.join(s)
     for gen in range(int(generations)+1):
-        score = [str(aligner.score(random.choice(seq), random.choice(seq))) 
+        score = [str(aligner.score(rng.choice(seq), rng.choice(seq))) 
                  for test in range(int(tests))]
         print("%s,%s" % (str(gen), ",".join(score)))
-        seq = [mutate(s, mutation_rate, mutations) for s in seq]
+        seq = [mutate(seq[i], mutation_rate, mutations, streams[i+1]) 
+               for i in range(len(seq))]
 
 def extractFasta(fastafile, keyfile, outfile, match="start"):
     '''!
@@ -1853,45 +2235,73 @@ def coexpression(expfile, method):
                                          str(id2), str(score)))
             count = count + 1
 
-def coexpression_randomization(expfile, method, n, replicate):
+def _coexpressionReplicate(args):
+    '''!
+    Private function to generate one replicate of randomized gene 
+    co-expressions, called by coexpression_randomization() function. 
+    The expression data is read from _workerData.
+
+    @param args Tuple: (method, n, seed) where method is the 
+    co-expression measure, n is the number of samples, and seed is the 
+    seed of the random number stream for the replicate.
+    @return: List of co-expression scores.
+    '''
+    from scipy import stats
+    from copads import objectdistance as d
+    (method, n, seed) = args
+    expData = _workerData
+    rng = random.Random(seed)
+    idList = list(expData.keys())
+    scores = []
+    for i in range(n):
+        d1 = expData[rng.choice(idList)]
+        d2 = expData[rng.choice(idList)]
+        if method == 'braycurtis': scores.append(d.Bray_Curtis(d1, d2))
+        if method == 'canberra': scores.append(d.Canberra(d1, d2))
+        if method == 'cosine': scores.append(d.Cosine(d1, d2))
+        if method == 'euclidean': scores.append(d.Euclidean(d1, d2))
+        if method == 'kendall': scores.append(stats.kendalltau(d1, d2).correlation)
+        if method == 'manhattan': scores.append(d.Manhattan(d1, d2))
+        if method == 'pearson': scores.append(stats.pearsonr(d1, d2)[0])
+        if method == 'pointbiserial': scores.append(stats.pointbiserialr(d1, d2).correlation)
+        if method == 'somer': scores.append(stats.somersd(d1, d2).statistic)
+        if method == 'spearman': scores.append(stats.spearmanr(d1, d2).correlation)
+        if method == 'tanimoto': scores.append(d.Tanimoto(d1, d2))
+    return scores
+
+def coexpression_randomization(expfile, method, n, replicate, seed=None, 
+                               workers=1):
     '''!
     Function to generate randomized gene co-expressions from expression 
-    data (for statistical testing).
+    data (for statistical testing). Each replicate has its own random 
+    number stream derived from the seed; hence, the results are 
+    identical regardless of the number of workers.
 
     Usage:
 
-        python seqproperties.py coexp_rand --expfile=<CSV file> --method=<coexpression method> --n=1000 --replicate=30
+        python seqproperties.py coexp_rand --expfile=<CSV file> --method=<coexpression method> --n=1000 --replicate=30 --seed=<seed> --workers=1
 
     @param expfile String: Path to the comma-separated value (CSV) file 
     containing gene expression data.
     @param method String: Co-expression measure. Allowable values are braycurtis (Bray and Curtis coefficient), cosine (Cosine coefficient) canberra (Canberra distance), euclidean (Euclidean distance), kendall (Kendall's tau), manhattan (Manhattan distance), pearson (Pearson's correlation), pointserial (Point biserial correlation), somer (Somer's D), spearman (Spearman's correlation), and tanimoto (Tanimoto coefficient).
     @param n Integer: Number of samples in each replicate.
     @param replicate Integer: Number of replicates.
+    @param seed Integer: Seed for random number generator. Default = 
+    None (not reproducible).
+    @param workers Integer: Number of worker processes to execute the 
+    replicates. Default = 1.
     '''
     from scipy import stats
-    from copads import objectdistance as d
     expData = {}
     for line in open(expfile, "r").readlines()[1:]:
         line = [x.strip() for x in line.split(',')]
         expData[line[0]] = [float(exp) for exp in line[1:]]
-    idList = list(expData.keys())
+    arguments = [(method, int(n), s) 
+                 for s in _randomSeeds(seed, int(replicate))]
+    results = _runReplicates(_coexpressionReplicate, expData, 
+                             arguments, workers)
     count = 1
-    for rep in range(replicate):
-        scores = []
-        for i in range(n):
-            d1 = expData[random.choice(idList)]
-            d2 = expData[random.choice(idList)]
-            if method == 'braycurtis': scores.append(d.Bray_Curtis(d1, d2))
-            if method == 'canberra': scores.append(d.Canberra(d1, d2))
-            if method == 'cosine': scores.append(d.Cosine(d1, d2))
-            if method == 'euclidean': scores.append(d.Euclidean(d1, d2))
-            if method == 'kendall': scores.append(stats.kendalltau(d1, d2).correlation)
-            if method == 'manhattan': scores.append(d.Manhattan(d1, d2))
-            if method == 'pearson': scores.append(stats.pearsonr(d1, d2)[0])
-            if method == 'pointbiserial': scores.append(stats.pointbiserialr(d1, d2).correlation)
-            if method == 'somer': scores.append(stats.somersd(d1, d2).statistic)
-            if method == 'spearman': scores.append(stats.spearmanr(d1, d2).correlation)
-            if method == 'tanimoto': scores.append(d.Tanimoto(d1, d2))
+    for scores in results:
         mean_score = stats.describe(scores).mean
         print('%s : %s : %s' % (str(count), str(len(scores)), str(mean_score)))
         count = count + 1
@@ -1995,23 +2405,87 @@ def coexpression_compare(coexpfile, truthfile, separator=":"):
     print("Critical Success Index = %.5f" % CSI)
     print("Fowlkes–Mallows Index = %.5f" % FM)
 
-def checkCSV(file, separator=","):
+def checkCSV(file, separator=",", header=True, numeric=True,
+             skipcols=1, chunksize=100000, max_errors=100):
     '''!
     Function to check for potentially problematic data rows in CSV file.
+    The file is streamed in chunks of rows; hence, files larger than
+    memory can be checked. The checks are (1) the number of columns in
+    each row is the same as the first row, and (2) the cells are numeric
+    (optional, excluding the first skipcols columns, such as gene IDs).
 
     Usage:
 
-        python seqproperties.py checkcsv --file=<CSV file> --separator=,
+        python seqproperties.py checkcsv --file=<CSV file> --separator=, --header=True --numeric=True --skipcols=1 --chunksize=100000 --max_errors=100
+
+    The output will be in the format of:
+
+        Line <line number> : Column count mismatch : <expected number of columns> : <number of columns>
+        Line <line number> : Non-numeric cell : <column name> : <cell value>
 
     @param file String: Path to CSV file.
     @param separator String: Separator in CSV file. Default = ,
+    @param header Boolean: Flag to indicate header row in CSV file.
+    Default = True.
+    @param numeric Boolean: Flag to check that cells are numeric.
+    Default = True.
+    @param skipcols Integer: Number of leading columns to exclude from
+    numeric check. Default = 1.
+    @param chunksize Integer: Number of rows to read at a time.
+    Default = 100000.
+    @param max_errors Integer: Maximum number of errors to report before
+    stopping the check. Default = 100.
     '''
-    import pandas as pd
-    try:
-        data = pd.read_csv(file, sep=separator, on_bad_lines=False)
-    except:
-        data = pd.read_csv(file, sep=separator, error_bad_lines=False, 
-                           warn_bad_lines=True)
+    import csv
+    import itertools
+    skipcols = int(skipcols)
+    chunksize = int(chunksize)
+    max_errors = int(max_errors)
+    errors = 0
+    rows = 0
+    with open(file, "r", newline="") as f:
+        reader = csv.reader(f, delimiter=str(separator))
+        first = next(reader, None)
+        if first is None:
+            print("Empty file")
+            return
+        ncol = len(first)
+        if str(header) == "True":
+            columns = [x.strip() for x in first]
+            pending = []
+        else:
+            columns = [str(i+1) for i in range(ncol)]
+            pending = [(reader.line_num, first)]
+        while errors < max_errors:
+            chunk = pending + [(reader.line_num, row) for row 
+                               in itertools.islice(reader, chunksize)]
+            pending = []
+            if len(chunk) == 0:
+                break
+            for (line, row) in chunk:
+                if errors >= max_errors:
+                    break
+                rows = rows + 1
+                if len(row) != ncol:
+                    print("Line %s : Column count mismatch : %s : %s" % \
+                          (str(line), str(ncol), str(len(row))))
+                    errors = errors + 1
+                    continue
+                if str(numeric) != "True":
+                    continue
+                for index in range(skipcols, ncol):
+                    try:
+                        float(row[index])
+                    except ValueError:
+                        print("Line %s : Non-numeric cell : %s : %s" % \
+                              (str(line), columns[index], row[index]))
+                        errors = errors + 1
+                        if errors >= max_errors:
+                            break
+    if errors >= max_errors:
+        print("Check stopped after %s errors" % str(errors))
+    print("Number of data rows checked = %s" % str(rows))
+    print("Number of errors = %s" % str(errors))
 
 def sample_ClusterScan(file, filetype="excel", sheet_name=None, 
                        usecols=None, samplesbyrow=True, 
@@ -2068,18 +2542,28 @@ def sample_ClusterScan(file, filetype="excel", sheet_name=None,
 def sample_ClusterLabel(file, filetype="excel", sheet_name=None, 
                         usecols=None, samplesbyrow=True, 
                         clusters=10, label="cluster",
-                        resultfile="result.csv"):
+                        resultfile="result.csv", mode="batch",
+                        chunksize=100000, passes=1):
     '''!
     Function to cluster data from file by K-means clustering and append 
     the cluster label to the result file.
 
+    In minibatch mode, the data file is read in chunks of rows and 
+    fitted incrementally by mini-batch K-means clustering. The data file 
+    is then read a second time to label each chunk, which is appended to 
+    the result file; hence, files larger than memory can be clustered. 
+    Only CSV files are streamed (Excel files are read as a whole before 
+    chunking), and samples must be by rows. ValueError is raised if the 
+    data file has fewer samples than clusters.
+
     Usage:
 
-        python seqproperties.py clusterlabel --file=<data file> --filetype=<type of file> --sheet_name=<name of Excel sheet> --usecols=<columns to use> --samplesbyrow=<whether sample are by rows> --clusters=<number of clusters> --label=<cluster label> --resultfile=<result file name>
+        python seqproperties.py clusterlabel --file=<data file> --filetype=<type of file> --sheet_name=<name of Excel sheet> --usecols=<columns to use> --samplesbyrow=<whether sample are by rows> --clusters=<number of clusters> --label=<cluster label> --resultfile=<result file name> --mode=<batch or minibatch> --chunksize=<number of rows per chunk> --passes=<number of passes for fitting>
 
     For example,
 
         python seqproperties.py clusterlabel --file=iAF692_fluxes.xlsx --filetype=excel --sheet_name=iAF692 --usecols=B:ZK --samplesbyrow=False --clusters=10 --label=cluster --resultfile=iAF692_clustered.csv
+        python seqproperties.py clusterlabel --file=iAF692_fluxes.csv --filetype=csv --clusters=10 --label=cluster --resultfile=iAF692_clustered.csv --mode=minibatch --chunksize=100000
 
     @param file String: Path to data file.
     @param filetype String: Type of file. Allowable types are "csv" 
@@ -2095,20 +2579,119 @@ def sample_ClusterLabel(file, filetype="excel", sheet_name=None,
     @param label String: Field name for cluster. Default = cluster
     @param resultfile String: Name of result file containing clusters. 
     Default = result.csv
+    @param mode String: Clustering mode. Allowable values are "batch" 
+    (K-means clustering on the whole data) and "minibatch" (mini-batch 
+    K-means clustering on chunks of data). Default = batch
+    @param chunksize Integer: Number of rows per chunk (only if mode = 
+    minibatch). Default = 100000
+    @param passes Integer: Number of passes through the data file for 
+    fitting (only if mode = minibatch). Default = 1
     '''
     import pandas as pd
+    if mode.lower() == "minibatch":
+        _sample_ClusterLabel_minibatch(file, filetype, sheet_name, 
+                                       usecols, samplesbyrow, clusters, 
+                                       label, resultfile, chunksize, 
+                                       passes)
+        return
     from sklearn.cluster import KMeans
     if filetype.lower() == "excel":
-        df = pd.read_excel(file, sheet_name, usecols, engine="openpyxl")
+        df = pd.read_excel(file, sheet_name=sheet_name, usecols=usecols, 
+                           engine="openpyxl")
     elif filetype.lower() == "csv":
-        df = pd.read_csv(file, usecols)
-    if samples.lower == "column":
+        df = pd.read_csv(file, usecols=usecols)
+    if str(samplesbyrow) == "False":
         df = df.T     # columns are features, rows are samples
     model = KMeans(n_clusters=int(clusters), random_state=0).fit(df)
     df[str(label)] = model.labels_
     df.to_csv(str(resultfile))
 
-def overlap_statistics(file1, file2, separator, n_item, option, replicate=30):
+def _sample_ClusterLabel_minibatch(file, filetype, sheet_name, usecols, 
+                                   samplesbyrow, clusters, label, 
+                                   resultfile, chunksize, passes):
+    '''!
+    Private function called by sample_ClusterLabel() function to 
+    cluster data from file by mini-batch K-means clustering, streaming 
+    the data file in chunks for fitting and for labelling. For the 
+    description of parameters, please see sample_ClusterLabel() 
+    function.
+    '''
+    import pandas as pd
+    from sklearn.cluster import MiniBatchKMeans
+    if str(samplesbyrow) == "False":
+        print("Mini-batch mode requires samples to be by rows")
+        return
+    chunksize = int(chunksize)
+    def read_chunks():
+        if filetype.lower() == "excel":
+            df = pd.read_excel(file, sheet_name=sheet_name, 
+                               usecols=usecols, engine="openpyxl")
+            for start in range(0, len(df), chunksize):
+                yield df[start:start+chunksize]
+        elif filetype.lower() == "csv":
+            for df in pd.read_csv(file, usecols=usecols, 
+                                  chunksize=chunksize):
+                yield df
+    model = MiniBatchKMeans(n_clusters=int(clusters), random_state=0)
+    fitted = 0
+    for p in range(int(passes)):
+        remainder = None
+        for df in read_chunks():
+            if remainder is not None:
+                df = pd.concat([remainder, df])
+                remainder = None
+            if len(df) < int(clusters):
+                # partial_fit requires at least as many samples as 
+                # clusters; carry small chunks forward
+                remainder = df
+                continue
+            model.partial_fit(df)
+            fitted = fitted + len(df)
+        if remainder is not None and fitted > 0:
+            model.partial_fit(remainder)
+            fitted = fitted + len(remainder)
+        if fitted == 0:
+            samples = 0 if remainder is None else len(remainder)
+            raise ValueError("Number of samples (%s) is fewer than the number of clusters (%s)" % \
+                             (str(samples), str(clusters)))
+        print("Pass %s: %s samples fitted" % (str(p+1), str(fitted)))
+    header = True
+    count = 0
+    for df in read_chunks():
+        df = df.copy()
+        df[str(label)] = model.predict(df)
+        df.to_csv(str(resultfile), mode="w" if header else "a", 
+                  header=header)
+        header = False
+        count = count + len(df)
+    print("Total %s samples labelled" % str(count))
+
+def _overlapReplicate(args):
+    '''!
+    Private function to generate the number of overlapping elements in 
+    one replicate of randomized lists, called by overlap_statistics() 
+    function. The 2 lists are read from _workerData.
+
+    @param args Tuple: (option, seed) where option is "null" or 
+    "confidence", and seed is the seed of the random number stream for 
+    the replicate.
+    @return: Number of overlapping elements.
+    '''
+    (option, seed) = args
+    (dataA, dataB) = _workerData
+    rng = random.Random(seed)
+    combinelist = dataA + dataB
+    rng.shuffle(combinelist)
+    if option.lower() == "confidence":
+        listA = rng.sample(combinelist, len(dataA))
+        listB = rng.sample(combinelist, len(dataB))
+    if option.lower() == "null":
+        listA = combinelist[:len(dataA)]
+        listB = combinelist[len(dataA):]
+    return sum([1 for x in listA if x in listB])
+
+def overlap_statistics(file1, file2, separator, n_item, option, replicate=30, 
+                       seed=None, workers=1):
     '''!
     Function to randomize 2 lists (given as files - file1 and file 2) 
     and generate the number of overlapping elements within the 2 randomized 
@@ -2121,7 +2704,7 @@ def overlap_statistics(file1, file2, separator, n_item, option, replicate=30):
 
     Usage:
 
-        python seqproperties.py overlap_stat --file1=overlap1.txt --file2=overlap2.txt --separator=: --n_item=2 --option=<null or confidence> --replicate=30
+        python seqproperties.py overlap_stat --file1=overlap1.txt --file2=overlap2.txt --separator=: --n_item=2 --option=<null or confidence> --replicate=30 --seed=<seed> --workers=1
 
     @param file1 String: Path to data file 1.
     @param file2 String: Path to data file 2.
@@ -2133,6 +2716,12 @@ def overlap_statistics(file1, file2, separator, n_item, option, replicate=30):
     @param option String: Option to select between "null" hypothesis testing or 
     "confidence" interval testing.
     @param replicate Integer: Number of replicates.
+    @param seed Integer: Seed for random number generator. Each replicate 
+    has its own random number stream derived from the seed; hence, the 
+    results are identical regardless of the number of workers. Default = 
+    None (not reproducible).
+    @param workers Integer: Number of worker processes to execute the 
+    replicates. Default = 1.
     '''
     dataA = [x[:-1] for x in open(file1).readlines()]
     dataA = [[x.strip() for x in row.split(separator)] for row in dataA]
@@ -2142,17 +2731,11 @@ def overlap_statistics(file1, file2, separator, n_item, option, replicate=30):
     dataB = [separator.join(row[:n_item]) for row in dataB]
     actual_overlap = sum([1 for x in dataA if x in dataB])
     print("Actual number of overlaps = " + str(actual_overlap))
-    for i in range(replicate):
-        combinelist = dataA + dataB
-        random.shuffle(combinelist)
-        if option.lower() == "confidence":
-            listA = random.sample(combinelist, len(dataA))
-            listB = random.sample(combinelist, len(dataB))
-        if option.lower() == "null":
-            listA = combinelist[:len(dataA)]
-            listB = combinelist[len(dataA):]
-        randomized_overlap = sum([1 for x in listA if x in listB])
-        print("Randomized overlaps %s = %s" % (i+1, randomized_overlap))
+    arguments = [(option, s) for s in _randomSeeds(seed, int(replicate))]
+    results = _runReplicates(_overlapReplicate, (dataA, dataB), 
+                             arguments, workers)
+    for i in range(len(results)):
+        print("Randomized overlaps %s = %s" % (i+1, results[i]))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,452 @@
+"""
+Test script for brainopy.py
+
+Date created: 18th October 2026
+
+Licence: GNU General Public License version 3 for academic or
+not-for-profit use only.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brainopy import brainopy
+
+class testBrainopy(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.brainDB = os.path.join(self.directory, 'brain.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def newBrain(self, **kwargs):
+        brain = brainopy(self.brainDB, **kwargs)
+        brain.addNeurotransmitters({'NT1': 'neurotransmitter 1',
+                                    'NT2': 'neurotransmitter 2'})
+        return brain
+
+    def testBulkConstruction(self):
+        brain = self.newBrain()
+        brain.beginBulkLoad()
+        neurons = brain.addNeuron(10)
+        synapses = brain.addSynapse(20)
+        axon_synapse = brain.linkRandomAxonSynapse(15)
+        synapse_dendrite = brain.linkRandomSynapseDendrite(15)
+        brain.cur.execute("SELECT count(*) FROM sqlite_master WHERE type = 'index' AND name = 'neuron_body_ID'")
+        self.assertEqual(brain.cur.fetchone()[0], 0)
+        brain.endBulkLoad()
+        brain.cur.execute("SELECT count(*) FROM sqlite_master WHERE type = 'index' AND name = 'neuron_body_ID'")
+        self.assertEqual(brain.cur.fetchone()[0], 1)
+        self.assertEqual(brain.getIDs('neuron_body'), [x[0] for x in neurons])
+        self.assertEqual(brain.getIDs('synapse_state'), synapses)
+        self.assertEqual(len(brain._readStates('synapse_state')), 40)
+        counts = self.topology(brain)
+        self.assertEqual(counts[:2], [10, 10])
+        self.assertTrue(0 < counts[2] <= len(axon_synapse))
+        self.assertTrue(0 < counts[3] <= len(synapse_dendrite))
+        brain.cur.execute("SELECT axon_state_ID, synapse_state_ID FROM axon_synapse_link")
+        self.assertTrue(set(brain.cur.fetchall()) <= set(axon_synapse))
+        brain.disconnectBrain()
+
+    def testBulkLoadStaple(self):
+        brain = self.newBrain()
+        brain.beginBulkLoad()
+        brain.addNamedNeuron('n1')
+        brain.addNamedNeuron('n2')
+        (axon, synapse, dendrite) = brain.stapleNeurons('n1', 'n2')
+        self.assertEqual(brain.getStateIDFromNeuronName('n1', 'axon_state_ID'),
+                         axon)
+        self.assertEqual(brain.getStateIDFromNeuronName('n2', 'dendrite_state_ID'),
+                         [dendrite])
+        brain.endBulkLoad()
+        brain.cur.execute("SELECT axon_state_ID, synapse_state_ID FROM axon_synapse")
+        self.assertEqual(brain.cur.fetchall(), [(axon, synapse)])
+        brain.cur.execute("SELECT synapse_state_ID, dendrite_state_ID FROM synapse_dendrite")
+        self.assertEqual(brain.cur.fetchall(), [(synapse, dendrite)])
+        brain.disconnectBrain()
+
+    def testParameterizedSQL(self):
+        brain = self.newBrain()
+        brain.addNamedNeuron("n'1", "neuron's description")
+        brain.inputSignal(brain.getStateIDFromNeuronName("n'1", 'neuron_state_ID'),
+                          {'NT1': 0.5}, 'neuron_state_ID')
+        self.assertEqual(brain.readNeurotransmitters("n'1")['NT1'], 0.5)
+        self.assertRaises(ValueError, brain.getStateIDFromNeuronName,
+                          "n'1", 'name')
+        self.assertRaises(ValueError, brain.randomState,
+                          'neuron_state; DROP TABLE log', '1')
+        brain.cur.execute("PRAGMA journal_mode")
+        self.assertEqual(brain.cur.fetchone()[0], 'wal')
+        brain.disconnectBrain()
+
+    def testSequentialIDs(self):
+        brain = self.newBrain()
+        brain.ID_block_size = 5
+        IDs = [ID for neuron in brain.addNeuron(3) for ID in neuron]
+        self.assertEqual([int(ID) for ID in IDs],
+                         list(range(int(IDs[0]), int(IDs[0]) + 12)))
+        brain.disconnectBrain()
+        brain = brainopy(self.brainDB)
+        neuron_ID = brain.addNeuron()[0][0]
+        self.assertTrue(int(neuron_ID) > int(IDs[-1]))
+        brain.cur.execute("SELECT count(*), count(DISTINCT ID) FROM ID_table")
+        (count, distinct) = brain.cur.fetchone()
+        self.assertEqual(count, distinct)
+        brain.disconnectBrain()
+
+    def logCount(self, brain):
+        brain.cur.execute("SELECT count(*) FROM log")
+        return brain.cur.fetchone()[0]
+
+    def testLogBuffer(self):
+        brain = self.newBrain()
+        brain.logging = True
+        brain.log_flush_interval = 3600
+        brain.flushLog()
+        before = self.logCount(brain)
+        brain.addNeuron(2)
+        self.assertEqual(self.logCount(brain), before)
+        buffered = len(brain._logBuffer)
+        self.assertTrue(buffered > 0)
+        self.assertEqual(brain.flushLog(), buffered)
+        self.assertEqual(self.logCount(brain), before + buffered)
+        self.assertEqual(brain.flushLog(), 0)
+        brain.log_buffer_size = 3
+        brain.addNeuron()
+        self.assertTrue(len(brain._logBuffer) < 3)
+        brain.addNamedNeuron('n1')
+        brain.disconnectBrain()
+        brain = brainopy(self.brainDB)
+        brain.cur.execute("SELECT function FROM log ORDER BY ID DESC LIMIT 1")
+        self.assertEqual(brain.cur.fetchone()[0], 'disconnectBrain')
+        brain.disconnectBrain()
+
+    def testClearCache(self):
+        brain = self.newBrain()
+        brain.addNamedNeuron('n1')
+        brain.addNamedNeuron('n2')
+        first = brain.getStateIDFromNeuronName('n1', 'axon_state_ID')
+        second = brain.getStateIDFromNeuronName('n2', 'axon_state_ID')
+        brain.cur.execute("UPDATE name_ID SET name = CASE name WHEN 'n1' THEN 'n2' ELSE 'n1' END")
+        brain.con.commit()
+        self.assertEqual(brain.getStateIDFromNeuronName('n1', 'axon_state_ID'),
+                         first)
+        brain.clearCache()
+        self.assertEqual(brain.getStateIDFromNeuronName('n1', 'axon_state_ID'),
+                         second)
+        self.assertEqual(brain.getStateIDFromNeuronName('n2', 'axon_state_ID'),
+                         first)
+        brain.disconnectBrain()
+
+    def testMigrateIDs(self):
+        brain = self.newBrain()
+        brain.addNamedNeuron('n1')
+        brain.addNamedNeuron('n2')
+        brain.addNeuron(1)
+        brain.stapleNeurons('n1', 'n2')
+        # convert the brain to text IDs, as created by earlier versions
+        columns = [('ID_table', 'ID'), ('name_ID', 'ID'),
+                   ('neuron_state', 'ID'), ('dendrite_state', 'ID'),
+                   ('axon_state', 'ID'), ('synapse_state', 'ID'),
+                   ('neuron_body', 'ID'), ('neuron_body', 'neuron_state_ID'),
+                   ('neuron_body', 'axon_state_ID'),
+                   ('neuron_dendrite', 'ID'),
+                   ('neuron_dendrite', 'dendrite_state_ID'),
+                   ('axon_synapse_link', 'axon_state_ID'),
+                   ('axon_synapse_link', 'synapse_state_ID'),
+                   ('synapse_dendrite_link', 'synapse_state_ID'),
+                   ('synapse_dendrite_link', 'dendrite_state_ID')]
+        for (table, column) in columns:
+            brain.cur.execute("UPDATE %s SET %s = 'old-' || %s" % (table, column, column))
+        brain.con.commit()
+        brain.clearCache()
+        old = brain.getIDs('neuron_body')
+        mapping = brain.migrateIDs()
+        brain.cur.execute("SELECT alias, ID FROM ID_alias")
+        self.assertEqual(dict(brain.cur.fetchall()), mapping)
+        self.assertEqual(brain.getIDs('neuron_body'), [mapping[ID] for ID in old])
+        for ID in old:
+            for state_type in ['neuron_state_ID', 'axon_state_ID', 'dendrite_state_ID']:
+                self.assertEqual(brain.getStateIDFromNeuronID(ID, state_type),
+                                 brain.getStateIDFromNeuronID(mapping[ID], state_type))
+            self.assertEqual(brain.readNeurotransmitters(ID, 'ID'),
+                             brain.readNeurotransmitters(mapping[ID], 'ID'))
+        # old IDs of named neurons are kept as aliases
+        self.assertEqual(brain.readNeurotransmitters(old[0]),
+                         brain.readNeurotransmitters('n1'))
+        self.assertEqual(brain.getStateIDFromNeuronName(old[1], 'dendrite_state_ID'),
+                         brain.getStateIDFromNeuronName('n2', 'dendrite_state_ID'))
+        self.assertRaises(ValueError, brain.readNeurotransmitters, 'unknown')
+        self.assertRaises(ValueError, brain.readNeurotransmitters, 'unknown', 'ID')
+        self.assertRaises(ValueError, brain.getStateIDFromNeuronID, 'unknown')
+        brain.disconnectBrain()
+
+    def topology(self, brain):
+        counts = []
+        for table in ['neuron_body', 'neuron_dendrite', 'axon_synapse_link',
+                      'synapse_dendrite_link', 'synapse_dendrite',
+                      'axon_synapse']:
+            brain.cur.execute("SELECT count(*) FROM %s" % table)
+            counts.append(brain.cur.fetchone()[0])
+        return counts
+
+    def testImportTopology(self):
+        brain = self.newBrain()
+        for name in ['n1', 'n2', 'n3']: brain.addNamedNeuron(name)
+        brain.addDendrite(brain.getIDs('neuron_body')[2])
+        brain.stapleNeurons('n1', 'n2')
+        brain.stapleNeurons('n2', 'n3')
+        brain.inputSignal(brain.getIDs('synapse_state')[0], {'NT1': 0.5})
+        brain.runBrain()
+        edgefile = os.path.join(self.directory, 'edges.csv')
+        statefile = os.path.join(self.directory, 'states.csv')
+        brain.exportTopology(edgefile, statefile)
+        expected = self.topology(brain)
+        IDs = brain.getIDs('neuron_body')
+        neurotransmitters = [brain.readNeurotransmitters(ID, 'ID')
+                             for ID in IDs]
+        brain.disconnectBrain()
+        os.remove(self.brainDB)
+        brain = self.newBrain()
+        labels = brain.importTopology(edgefile, statefile)
+        self.assertEqual(self.topology(brain), expected)
+        self.assertEqual([brain.readNeurotransmitters(labels['neuron'][ID], 'ID')
+                          for ID in IDs],
+                         neurotransmitters)
+        brain.disconnectBrain()
+
+    def testImportTopologyFanOut(self):
+        brain = self.newBrain()
+        edgefile = os.path.join(self.directory, 'edges.csv')
+        edges = open(edgefile, 'w')
+        edges.write('source,synapse,target,dendrite\n')
+        edges.write('n1,s1,n2,\n')
+        edges.write('n1,s2,n3,\n')
+        edges.close()
+        before = self.topology(brain)
+        self.assertRaises(ValueError, brain.importTopology, edgefile)
+        self.assertEqual(self.topology(brain), before)
+        brain.disconnectBrain()
+
+    def network(self, brain):
+        for name in ['n1', 'n2', 'n3', 'n4']: brain.addNamedNeuron(name)
+        brain.addDendrite(brain.getIDs('neuron_body')[3])
+        brain.stapleNeurons('n1', 'n2')
+        brain.stapleNeurons('n1', 'n3')
+        brain.stapleNeurons('n2', 'n4')
+        brain.stapleNeurons('n3', 'n4')
+        synapse = brain.addSynapse()[0]
+        brain.linkSynapseDendrite(synapse,
+            brain.getStateIDFromNeuronName('n1', 'dendrite_state_ID')[0])
+        # no random variation, for the engine to give the same states
+        brain.neurotransmitter_axon_variation = 0
+        brain.neurotransmitter_dendrite_variation = 0
+        brain.neurotransmitter_neuron_variation = 0
+        brain.neurotransmitter_synapse_variation = 0
+        return synapse
+
+    def states(self, brain):
+        return dict([(statetype, sorted(brain._readStates(statetype)))
+                     for statetype in ['synapse_state', 'dendrite_state',
+                                       'neuron_state', 'axon_state']])
+
+    def testStateLayout(self):
+        results = []
+        for layout in ['long', 'wide']:
+            brain = self.newBrain(layout=layout)
+            synapse = self.network(brain)
+            brain.inputSignal(synapse, {'NT1': 0.5, 'NT2': 0.25})
+            for cycle in range(2): brain.runBrain()
+            results.append(self.states(brain))
+            if layout == 'wide':
+                self.assertEqual(brain.migrateStateLayout('long'),
+                                 sum([len(results[-1][statetype])
+                                      for statetype in results[-1]]))
+                self.assertEqual(self.states(brain), results[-1])
+                brain.disconnectBrain()
+                brain = brainopy(self.brainDB)
+                self.assertEqual(brain.layout, 'long')
+                self.assertEqual(self.states(brain), results[-1])
+                self.assertRaises(ValueError, brain.migrateStateLayout, 'tall')
+            brain.disconnectBrain()
+            os.remove(self.brainDB)
+        self.assertEqual(results[0], results[1])
+
+    def testProfiling(self):
+        brain = self.newBrain()
+        self.network(brain)
+        brain.startProfiling()
+        for cycle in range(2): brain.runBrain()
+        profile = brain.stopProfiling()
+        self.assertEqual(profile['runBrain']['calls'], 2)
+        self.assertEqual(profile['neuronFunction']['calls'], 8)
+        self.assertEqual(profile['mfSynapse']['calls'],
+                         2 * len(brain.getIDs('synapse_state')))
+        self.assertTrue(profile['runBrain']['sql'] >=
+                        profile['neuronFunction']['sql'] > 0)
+        self.assertEqual(len(brain.profileCycles), 2)
+        brain.runBrain()
+        self.assertEqual(profile['runBrain']['calls'], 2)
+        profilefile = os.path.join(self.directory, 'profile.csv')
+        count = brain.writeProfile(profilefile)
+        rows = open(profilefile).read().splitlines()
+        self.assertEqual(rows[0], 'cycle,function,calls,time,sql')
+        self.assertEqual(len(rows), count + 1)
+        self.assertEqual(brain.writeProfile(), count)
+        brain.cur.execute("SELECT count(*) FROM log WHERE function = 'profile'")
+        self.assertEqual(brain.cur.fetchone()[0], count)
+        brain.disconnectBrain()
+
+    def testSparseScheduler(self):
+        results = []
+        for scheduler in ['full', 'sparse']:
+            brain = self.newBrain()
+            synapse = self.network(brain)
+            brain.scheduler = scheduler
+            if scheduler == 'sparse':
+                self.assertEqual(brain._activeNeurons()[:2], ([], []))
+            brain.inputSignal(synapse, {'NT1': 0.5, 'NT2': 0.25})
+            if scheduler == 'sparse':
+                (neurons, synapses, changed) = brain._activeNeurons()
+                self.assertEqual(neurons, [brain.getIDs('neuron_body')[0]])
+                self.assertEqual(sorted(synapses), sorted([synapse] + changed))
+            for cycle in range(4): brain.runBrain()
+            results.append(self.states(brain))
+            brain.disconnectBrain()
+            os.remove(self.brainDB)
+        self.assertEqual(results[0], results[1])
+
+    def fileStates(self):
+        brain = brainopy(self.brainDB)
+        states = self.states(brain)
+        brain.disconnectBrain()
+        return states
+
+    def testMemoryMode(self):
+        brain = self.newBrain(mode='memory', backup_interval=2)
+        synapse = self.network(brain)
+        brain.backupBrain()
+        brain.inputSignal(synapse, {'NT1': 0.5, 'NT2': 0.25})
+        before = self.fileStates()
+        brain.runBrain()
+        self.assertEqual(self.fileStates(), before)
+        brain.runBrain()
+        self.assertEqual(self.fileStates(), self.states(brain))
+        brain.inputSignal(synapse, {'NT1': 1.0, 'NT2': 1.0})
+        brain.runBrain()
+        expected = self.states(brain)
+        self.assertNotEqual(self.fileStates(), expected)
+        backupfile = os.path.join(self.directory, 'backup.db')
+        brain.backupBrain(backupfile)
+        brain.disconnectBrain()
+        self.assertEqual(self.fileStates(), expected)
+        self.brainDB = backupfile
+        self.assertEqual(self.fileStates(), expected)
+
+    def testRandomizeStates(self):
+        results = []
+        for engine in [False, False, True]:
+            brain = self.newBrain()
+            synapse = self.network(brain)
+            brain.inputSignal(synapse, {'NT1': 0.5, 'NT2': 0.25})
+            brain.runBrain()
+            before = self.states(brain)['neuron_state']
+            if engine: brain.startEngine()
+            self.assertEqual(brain.randomizeStates('neuron_state',
+                                                   variation=0.1, seed=3),
+                             len(before))
+            if engine: brain.stopEngine()
+            after = self.states(brain)['neuron_state']
+            self.assertEqual([state[:2] for state in after],
+                             [state[:2] for state in before])
+            for (old, new) in zip(before, after):
+                self.assertTrue(abs(new[2] - old[2]) <= 0.1 * old[2] + 1e-12)
+            results.append(after)
+            brain.disconnectBrain()
+            os.remove(self.brainDB)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+        self.assertNotEqual(results[0], before)
+        brain = self.newBrain()
+        self.assertRaises(ValueError, brain.randomizeStates, 'neuron_body')
+        brain.disconnectBrain()
+
+    def testEngine(self):
+        results = []
+        for engine in [False, True]:
+            brain = self.newBrain()
+            synapse = self.network(brain)
+            if engine: brain.startEngine(seed=1)
+            brain.inputSignal(synapse, {'NT1': 0.5, 'NT2': 0.25})
+            for cycle in range(3): brain.runBrain()
+            if engine: brain.stopEngine()
+            results.append(self.states(brain))
+            brain.disconnectBrain()
+            os.remove(self.brainDB)
+        self.assertEqual(results[0].keys(), results[1].keys())
+        for statetype in results[0]:
+            self.assertEqual([state[:2] for state in results[0][statetype]],
+                             [state[:2] for state in results[1][statetype]])
+            for (expected, result) in zip(results[0][statetype],
+                                          results[1][statetype]):
+                self.assertAlmostEqual(float(expected[2]), float(result[2]))
+
+    def testSnapshotRestore(self):
+        brain = self.newBrain()
+        synapse = self.network(brain)
+        brain.inputSignal(synapse, {'NT1': 0.5, 'NT2': 0.25})
+        brain.runBrain()
+        snapshotfile = os.path.join(self.directory, 'brain.npz')
+        expected = self.states(brain)
+        topology = self.topology(brain)
+        count = brain.snapshot(snapshotfile)
+        self.assertEqual(count, sum([len(expected[statetype])
+                                     for statetype in expected]))
+        brain.inputSignal(synapse, {'NT1': 1.0, 'NT2': 1.0})
+        brain.runBrain()
+        self.assertNotEqual(self.states(brain), expected)
+        brain.startEngine()
+        brain.inputSignal(synapse, {'NT1': 2.0, 'NT2': 2.0})
+        brain.runBrain()
+        self.assertEqual(brain.restore(snapshotfile, 'engine'), count)
+        brain.stopEngine()
+        self.assertEqual(self.states(brain), expected)
+        self.assertRaises(ValueError, brain.restore, snapshotfile, 'file')
+        brain.disconnectBrain()
+        os.remove(self.brainDB)
+        brain = brainopy(self.brainDB)
+        self.assertEqual(brain.restore(snapshotfile), count)
+        self.assertEqual(self.states(brain), expected)
+        self.assertEqual(self.topology(brain), topology)
+        brain.cur.execute("SELECT dendrite_state_ID FROM synapse_dendrite_link WHERE synapse_state_ID = ?", (synapse,))
+        dendrite_state_ID = brain.cur.fetchone()[0]
+        self.assertEqual(brain.getStateIDFromNeuronName('n1', 'dendrite_state_ID'),
+                         [dendrite_state_ID])
+        IDs = brain.getIDs('neuron_body')
+        self.assertTrue(int(brain.addNeuron()[0][0]) > max([int(ID) for ID in IDs]))
+        brain.disconnectBrain()
+
+    def testEngineWorkers(self):
+        results = []
+        for workers in [1, 2]:
+            brain = self.newBrain()
+            synapse = self.network(brain)
+            brain.neurotransmitter_neuron_variation = 0.1
+            brain.neurotransmitter_synapse_variation = 0.1
+            brain.startEngine(seed=7, workers=workers)
+            brain.inputSignal(synapse, {'NT1': 0.5, 'NT2': 0.25})
+            for cycle in range(3): brain.runBrain()
+            brain.stopEngine()
+            results.append(self.states(brain))
+            brain.disconnectBrain()
+            os.remove(self.brainDB)
+        self.assertEqual(results[0], results[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Test script for brainopy_benchmark.py
+
+Date created: 18th October 2026
+
+Licence: GNU General Public License version 3 for academic or
+not-for-profit use only.
+"""
+
+import contextlib
+import io
+import json
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import brainopy_benchmark
+
+class testBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def run_benchmark(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return brainopy_benchmark.benchmark(**kwargs)
+
+    def testBenchmark(self):
+        outputfile = os.path.join(self.directory, 'results.json')
+        results = self.run_benchmark(neurons=20, dendrites=2,
+                                     neurotransmitters=2, cycles=3, seed=5,
+                                     outputfile=outputfile)
+        self.assertEqual(json.load(open(outputfile)), results)
+        self.assertEqual(results['counts']['neuron_body'], 20)
+        self.assertEqual(results['counts']['dendrite_state'], 40)
+        self.assertEqual(results['counts']['synapse_state'], 40)
+        self.assertTrue(0 < results['counts']['axon_synapse_link'] <= 10)
+        self.assertTrue(0 < results['counts']['synapse_dendrite_link'] <= 30)
+        self.assertTrue(results['cycle_time']['min'] <=
+                        results['cycle_time']['p50'] <=
+                        results['cycle_time']['max'])
+        self.assertTrue(results['rows_touched']['cycles'] > 0)
+        engine = self.run_benchmark(neurons=20, dendrites=2,
+                                    neurotransmitters=2, cycles=3, seed=5,
+                                    backend='engine')
+        self.assertEqual(engine['counts'], results['counts'])
+
+    def testDatabase(self):
+        database = os.path.join(self.directory, 'brain.db')
+        self.run_benchmark(neurons=5, cycles=1, database=database)
+        self.assertTrue(os.path.exists(database))
+        self.assertRaises(ValueError, self.run_benchmark, neurons=5,
+                          database=database)
+        self.assertRaises(ValueError, self.run_benchmark, neurons=5,
+                          backend='numpy')
+        self.assertRaises(ValueError, self.run_benchmark, neurons=5,
+                          dendrites=0)
+
+    def testPercentile(self):
+        self.assertEqual(brainopy_benchmark._percentile([], 50), None)
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(brainopy_benchmark._percentile(values, 0), 1)
+        self.assertEqual(brainopy_benchmark._percentile(values, 50), 3)
+        self.assertEqual(brainopy_benchmark._percentile(values, 90), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Test script for island.py
+
+Date created: 18th October 2026
+
+Licence: GNU General Public License version 3 for academic or
+not-for-profit use only.
+"""
+
+import contextlib
+import io
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import island
+
+parameterfile = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'island_parameter.csv')
+
+class testIsland(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def generate(self, filename, population_size=20, ploidy=2,
+                 output_format='text'):
+        island.generate_population(parameterfile, self.path(filename),
+                                   population_size, ploidy, 0, 1,
+                                   output_format)
+        return self.path(filename)
+
+    def testGenerateSeeded(self):
+        parameterfile = self.path('parameter.csv')
+        parameters = open(parameterfile, 'w')
+        parameters.write('Gene Name,AF1,AF2,AF3\n')
+        parameters.write('G1,0.5,0,0.5\n')
+        parameters.write('G2,0.2,0.8,\n')
+        parameters.close()
+        for (filename, seed) in [('pop1', 1), ('pop2', 1), ('pop3', 2)]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                island.generate_population(parameterfile, self.path(filename),
+                                           2000, 2, 0, seed)
+        self.assertEqual(open(self.path('pop1')).read(),
+                         open(self.path('pop2')).read())
+        self.assertNotEqual(open(self.path('pop1')).read(),
+                            open(self.path('pop3')).read())
+        genome = island.read_population_array(self.path('pop1'))[3]
+        self.assertEqual(genome.shape, (2000, 2, 2))
+        self.assertEqual(sorted(set(genome[:, :, 0].ravel().tolist())),
+                         [1, 3])
+        self.assertEqual(sorted(set(genome[:, :, 1].ravel().tolist())),
+                         [1, 2])
+        self.assertAlmostEqual(float((genome[:, :, 0] == 1).mean()), 0.5,
+                               delta=0.05)
+        self.assertAlmostEqual(float((genome[:, :, 1] == 1).mean()), 0.2,
+                               delta=0.05)
+
+    def testWriteArray(self):
+        populationfile = self.generate('pop')
+        (geneData, alleleData, metadata, genome) = \
+            island.read_population_array(populationfile)
+        island._simulation_writeout_array(self.path('pop.copy'), metadata,
+                                          genome, [geneData] + alleleData)
+        self.assertEqual(open(self.path('pop.copy')).read(),
+                         open(populationfile).read())
+        genome = np.array([[[0, 12], [305, 7]], [[9, 10], [1, 100]]],
+                          dtype=np.uint16)
+        self.assertEqual(island._genome_text(genome),
+                         ['0|12;305|7', '9|10;1|100'])
+
+    def testSimulateMixedPloidy(self):
+        diploid = self.generate('diploid', ploidy=2)
+        triploid = self.generate('triploid', ploidy=3)
+        island.combine_populations(diploid, triploid, self.path('mixed'))
+        self.assertRaises(ValueError, island.read_population_array,
+                          self.path('mixed'))
+        genome = island.read_population_array(self.path('mixed'), 2)[3]
+        self.assertEqual(genome.shape[:2], (40, 2))
+        island.simulate_population(self.path('mixed'), 30, 'simple', 2,
+                                   'array', 1)
+        genome = island.read_population_array(self.path('mixed.2'))[3]
+        self.assertEqual(genome.shape[:2], (30, 2))
+
+    def testBinaryRoundTrip(self):
+        text = self.generate('pop')
+        binary = self.generate('pop.bin', output_format='binary')
+        self.assertFalse(island.is_binary_population(text))
+        self.assertTrue(island.is_binary_population(binary))
+        expected = island.read_population_array(text)
+        result = island.read_population_array(binary)
+        self.assertEqual(result[:3], expected[:3])
+        self.assertTrue(np.array_equal(result[3], expected[3]))
+        island.convert_population(text, self.path('converted.bin'), 'binary')
+        island.convert_population(self.path('converted.bin'),
+                                  self.path('converted'), 'text')
+        self.assertEqual(open(self.path('converted.bin'), 'rb').read(),
+                         open(binary, 'rb').read())
+        self.assertEqual(open(self.path('converted')).read(),
+                         open(text).read())
+
+    def testCombineDifferentPloidy(self):
+        diploid = self.generate('diploid.bin', ploidy=2,
+                                output_format='binary')
+        triploid = self.generate('triploid.bin', ploidy=3,
+                                 output_format='binary')
+        self.assertRaises(ValueError, island.combine_populations,
+                          diploid, triploid, self.path('combined'))
+        self.assertFalse(os.path.exists(self.path('combined.map')))
+
+    def testOutputFormat(self):
+        self.assertRaises(ValueError, self.generate, 'pop',
+                          output_format='csv')
+        populationfile = self.generate('pop')
+        self.assertRaises(ValueError, island.simulate_population,
+                          populationfile, 10, 'simple', 1, 'array', 1, 'csv')
+
+    def replicates(self, populationfile, generations, workers):
+        outputfile = self.path('replicates.%s.csv' % str(workers))
+        with contextlib.redirect_stdout(io.StringIO()):
+            island.simulate_replicates(populationfile, 30, 4, 'simple',
+                                       generations, 7, workers, outputfile)
+        return [row.split(',') for row in
+                open(outputfile).read().splitlines()[1:]]
+
+    def testReplicatesWorkers(self):
+        populationfile = self.generate('pop', population_size=40)
+        self.assertEqual(self.replicates(populationfile, 3, 1),
+                         self.replicates(populationfile, 3, 2))
+
+    def testReplicatesChiSquare(self):
+        parameterfile = self.path('parameter.csv')
+        parameters = open(parameterfile, 'w')
+        parameters.write('Gene Name,AF1,AF2,AF3\n')
+        parameters.write('G1,0.5,0,0.5\n')
+        parameters.write('G2,0.2,0.8,\n')
+        parameters.close()
+        populationfile = self.path('pop')
+        with contextlib.redirect_stdout(io.StringIO()):
+            island.generate_population(parameterfile, populationfile, 30,
+                                       2, 0, 1)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            island.tabulate_allelic_counts(populationfile)
+        chisq = float(output.getvalue().splitlines()[-1].split(':')[1])
+        summary = self.replicates(populationfile, 0, 1)[0]
+        self.assertAlmostEqual(float(summary[-1]), chisq)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Test script for seqproperties.py
+
+Date created: 18th October 2026
+
+Licence: GNU General Public License version 3 for academic or
+not-for-profit use only.
+"""
+
+import contextlib
+import io
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Bio.Seq import Seq
+
+import seqproperties as s
+
+sequence = 'ACGTTGCAnnnACGRYacgtACGTACGTTTGA'
+complement = {'A': 'T', 'C': 'G', 'G': 'C', 'T': 'A', 'N': 'N',
+              'R': 'Y', 'Y': 'R', 'a': 't', 'c': 'g', 'g': 'c',
+              't': 'a', 'n': 'n'}
+
+def reverseComplement(seq):
+    return ''.join([complement[base] for base in reversed(seq)])
+
+def run(function, *args, **kwargs):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        function(*args, **kwargs)
+    return output.getvalue()
+
+class testFileFunctions(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, filename, data):
+        path = os.path.join(self.directory, filename)
+        f = open(path, 'w')
+        f.write(data)
+        f.close()
+        return path
+
+    def testComplement(self):
+        records = [('seq1', sequence * 5), ('seq2', 'ACGT'), ('seq3', '')]
+        fastafile = self.write('seq.fasta',
+            ''.join(['>%s description\n%s\n' % \
+                     (ID, '\n'.join([seq[i:i+17]
+                                     for i in range(0, len(seq), 17)]))
+                     for (ID, seq) in records]))
+        for width in [0, 7, 60]:
+            for chunksize in [5, 1048576]:
+                output = run(s.complement, fastafile, width, chunksize)
+                output = output.split('>')[1:]
+                self.assertEqual(len(output), len(records))
+                for (result, (ID, seq)) in zip(output, records):
+                    lines = result.splitlines()
+                    self.assertEqual(lines[0], ' ' + ID)
+                    if width > 0:
+                        self.assertTrue(all([len(line) <= width
+                                             for line in lines[1:]]))
+                    self.assertEqual(''.join(lines[1:]),
+                                     str(Seq(seq).reverse_complement()))
+
+    def testCheckCSV(self):
+        csvfile = self.write('data.csv',
+                             'gene,a,b\n'
+                             'g1,1,2.5\n'
+                             'g2,1\n'
+                             'g3,x,2\n'
+                             'g4,3,4\n')
+        for chunksize in [1, 100000]:
+            output = run(s.checkCSV, csvfile,
+                         chunksize=chunksize).splitlines()
+            self.assertEqual(output,
+                             ['Line 3 : Column count mismatch : 3 : 2',
+                              'Line 4 : Non-numeric cell : a : x',
+                              'Number of data rows checked = 4',
+                              'Number of errors = 2'])
+        output = run(s.checkCSV, csvfile, max_errors=1).splitlines()
+        self.assertEqual(output,
+                         ['Line 3 : Column count mismatch : 3 : 2',
+                          'Check stopped after 1 errors',
+                          'Number of data rows checked = 2',
+                          'Number of errors = 1'])
+        output = run(s.checkCSV, csvfile, header=False,
+                     numeric=False).splitlines()
+        self.assertEqual(output[-2:], ['Number of data rows checked = 5',
+                                       'Number of errors = 1'])
+
+    def testClusterLabelMinibatch(self):
+        import pandas as pd
+        rows = ['%s,%s' % (str(0.1 * (i % 5)), str(0.2 * (i % 3)))
+                for i in range(40)] + \
+               ['%s,%s' % (str(10 + 0.1 * (i % 5)), str(10 + 0.2 * (i % 3)))
+                for i in range(40)]
+        csvfile = self.write('data.csv', 'a,b\n' + '\n'.join(rows) + '\n')
+        for mode in ['minibatch', 'batch']:
+            resultfile = os.path.join(self.directory, mode + '.csv')
+            run(s.sample_ClusterLabel, csvfile, 'csv', clusters=2,
+                resultfile=resultfile, mode=mode, chunksize=15, passes=2)
+            labels = list(pd.read_csv(resultfile)['cluster'])
+            self.assertEqual(len(labels), 80)
+            self.assertEqual(len(set(labels[:40])), 1)
+            self.assertEqual(len(set(labels[40:])), 1)
+            self.assertNotEqual(labels[0], labels[40])
+        self.assertRaises(ValueError, run, s.sample_ClusterLabel, csvfile,
+                          'csv', clusters=100,
+                          resultfile=os.path.join(self.directory, 'r.csv'),
+                          mode='minibatch')
+
+    def testSeededReplicates(self):
+        self.assertEqual(s._randomSeeds(5, 4), s._randomSeeds(5, 4))
+        self.assertEqual(len(set(s._randomSeeds(5, 4))), 4)
+        file1 = self.write('list1.txt',
+                           '\n'.join(['a%s:x' % i for i in range(30)]) + '\n')
+        file2 = self.write('list2.txt',
+                           '\n'.join(['a%s:y' % i for i in range(0, 60, 2)]) + '\n')
+        expected = run(s.overlap_statistics, file1, file2, ':', 1, 'null',
+                       8, seed=3)
+        self.assertEqual(run(s.overlap_statistics, file1, file2, ':', 1,
+                             'null', 8, seed=3, workers=2), expected)
+        self.assertEqual(len(expected.splitlines()), 9)
+        fastafile = self.write('seq.fasta',
+                               ''.join(['>seq%s\n%s\n' % (i, sequence[i:])
+                                        for i in range(20)]))
+        expected = run(s.random_selection, fastafile, 5, 'True', 'linear', 9)
+        self.assertEqual(run(s.random_selection, fastafile, 5, 'True',
+                             'linear', 9), expected)
+        self.assertEqual(len(expected.splitlines()), 5)
+
+class testPackedSequence(unittest.TestCase):
+    def testRoundTrip(self):
+        for seq in ['', 'A', 'ACG', 'ACGT', sequence, sequence[1:]]:
+            packed = s.PackedSequence(seq)
+            self.assertEqual(str(packed), seq)
+            self.assertEqual(len(packed), len(seq))
+
+    def testSlice(self):
+        packed = s.PackedSequence(sequence)
+        self.assertEqual(packed[5:17], sequence[5:17])
+        self.assertEqual(packed[::3], sequence[::3])
+        self.assertEqual(packed[-1], sequence[-1])
+
+    def testReverseComplement(self):
+        for seq in ['A', 'ACG', 'ACGT', sequence, sequence[1:]]:
+            packed = s.PackedSequence(seq)
+            self.assertEqual(str(packed.reverse_complement()),
+                             reverseComplement(seq))
+
+    def testKmers(self):
+        packed = s.PackedSequence(sequence)
+        (positions, kmers) = packed.kmers(4)
+        expected = [i for i in range(len(sequence) - 3)
+                    if all([base in 'ACGTacgt'
+                            for base in sequence[i:i+4]])]
+        self.assertEqual(list(positions), expected)
+        self.assertEqual([s.PackedSequence.decodeKmer(kmer, 4)
+                          for kmer in kmers],
+                         [sequence[i:i+4].upper() for i in expected])
+
+    def testKmersBlocks(self):
+        packed = s.PackedSequence(sequence)
+        expected = packed.kmers(5)
+        packed._kmerBlock = 3
+        result = packed.kmers(5)
+        self.assertEqual(list(result[0]), list(expected[0]))
+        self.assertEqual(list(result[1]), list(expected[1]))
+
+if __name__ == '__main__':
+    unittest.main()